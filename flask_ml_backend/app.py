@@ -1,39 +1,123 @@
-import pandas as pd
-import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+# pandas, joblib and scikit-learn are imported lazily by the CSV loader only,
+# so snapshot serving (MODEL_SNAPSHOT) starts with NumPy/SciPy alone.
 import numpy as np
+from scipy import sparse
+import atexit
 import os
+import time
 import logging
 import warnings
 from datetime import datetime
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
+from genre_index import build_genre_matrix, content_type_codes, top_genres, type_breakdown
+from ratings_index import WEIGHTING_SCHEMES, build_ratings_index, profile_weights, user_slice
+from cold_start import ALL_TYPES, build_cold_start_pools, build_cold_start_remainders, cold_start_rows, remainder_rows
+from diversity import mmr_rerank, parse_diversity
+from interest_profiles import build_interest_index, interest_scores, match_interests
+from embeddings import (
+    CONTENT_EMBEDDINGS_PATH, QUANTIZATION_MODES, build_embeddings, embedding_profile, embedding_scores,
+    load_embeddings, quantize_embeddings, quantized_scores, rerank_candidates
+)
+from explanations import attribute_latent_scores, attribute_scores, explain_items
+from inverted_index import SCORING_ENGINES, build_inverted_index, choose_engine, inverted_top_k
+from hashing_features import hashed_terms, load_hashing_features, transform_parallel
+from sharded_scoring import ShardedScorer
+from top_k import top_k_positions
+from snapshot import load_snapshot
+from filter_engine import (
+    FILTER_OPERATORS, GENRE_MATCH_MODES, build_filter_index, build_filter_mask, choose_strategy,
+    count_selected, intersect, parse_release_years, rows_selected, unpack_mask
+)
+from async_logging import configure_logging
+from metrics import METRIC_PREFIX, instrument_app, record_count, record_stage, register_gauge, trace_summary
+from memory_report import register_memory_endpoint
+from sampling_profiler import register_profiler_endpoint
+from pagination import PageCache, decode_cursor, encode_cursor, parse_page_size, ranked_page, request_key
+from serialization import JSON_MIMETYPE, FragmentCache, json_response
 
 # Suppress scikit-learn version compatibility warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="sklearn")
 
-# --- Configure logging ---
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('recommendation_api.log'),
-        logging.StreamHandler()
-    ]
-)
+# --- Configure logging (queued, written by a background thread) ---
+configure_logging('recommendation_api.log')
 logger = logging.getLogger(__name__)
 
 # --- Paths to your dataset files ---
 TFIDF_VECTORIZER_PATH = 'tfidf_vectorizer.pkl'
 PROCESSED_MOVIES_PATH = 'processed_movies.csv'
 RATINGS_DATA_PATH = 'rating.csv'
+HASHING_FEATURES_PATH = 'hashing_features.npz'
+HASHED_CONTENT_MATRIX_PATH = 'hashed_content_matrix.npz'
+
+# --- Feature extraction mode: 'tfidf' (pickled vectorizer) or 'hashing' (see hashing_features.py) ---
+FEATURE_MODE = os.environ.get('FEATURE_MODE', 'tfidf')
+
+# --- Fast-start serving: load a precompiled snapshot directory (see build_snapshot.py) instead of CSVs ---
+MODEL_SNAPSHOT_PATH = os.environ.get('MODEL_SNAPSHOT', '')
+
+# --- User profile settings (compare alternatives with sweep_profiles.py) ---
+PROFILE_MIN_RATING = float(os.environ.get('PROFILE_MIN_RATING', '4.0'))
+PROFILE_WEIGHTING = os.environ.get('PROFILE_WEIGHTING', 'rating')
+PROFILE_HALF_LIFE_DAYS = float(os.environ.get('PROFILE_HALF_LIFE_DAYS', '0')) or None
+if PROFILE_WEIGHTING not in WEIGHTING_SCHEMES:
+    raise ValueError(f"PROFILE_WEIGHTING must be one of {WEIGHTING_SCHEMES}, got '{PROFILE_WEIGHTING}'")
+
+# --- Sharded scoring: worker processes scoring row shards of the catalog (see sharded_scoring.py), 0 = in-process ---
+SCORING_WORKERS = int(os.environ.get('SCORING_WORKERS', '0'))
+
+# --- Scoring engine: 'inverted' adds posting lists scored with MaxScore pruning (see inverted_index.py) ---
+SCORING_ENGINE = os.environ.get('SCORING_ENGINE', 'matrix')
+if SCORING_ENGINE not in SCORING_ENGINES:
+    raise ValueError(f"SCORING_ENGINE must be one of {SCORING_ENGINES}, got '{SCORING_ENGINE}'")
+
+# --- Latent scoring: dense float32 SVD embeddings of this many dimensions (see embeddings.py), 0 = exact sparse ---
+LATENT_DIM = int(os.environ.get('LATENT_DIM', '0'))
+# int8 codes scored first, with the top candidates re-scored from the float32 vectors
+LATENT_QUANTIZATION = os.environ.get('LATENT_QUANTIZATION', 'none')
+if LATENT_QUANTIZATION not in QUANTIZATION_MODES:
+    raise ValueError(f"LATENT_QUANTIZATION must be one of {QUANTIZATION_MODES}, got '{LATENT_QUANTIZATION}'")
+
+# Minimum number of ratings for an item to appear in /content/popular
+POPULAR_MIN_RATINGS = 10
 
 # --- Global variables for loaded data and model components ---
 tfidf_vectorizer = None
+hashing_features = None
 movies_df = None
 ratings_df = None
 content_tfidf_matrix = None
+model_version = None       # snapshot version, or 'csv' when loaded from the CSV files
+model_load_seconds = None
+
+# --- Catalog arrays (filled by the CSV or the snapshot loader) ---
+item_movie_ids = None      # movieId per catalog row
+item_titles = None
+item_genres = None         # raw '|' separated genres
+item_years = None          # release year parsed from the title, 0 when unknown
+feature_names = None       # TF-IDF term per matrix column, when a vocabulary is available
+
+# --- Precomputed indexes (built at load time) ---
+genre_matrix = None        # sparse items x genres multi-hot matrix
+genre_names = None         # genre name for each genre_matrix column
+item_type_codes = None     # content type code for each catalog row
+ratings_index = None       # ratings grouped by user, see ratings_index.py
+filter_index = None        # packed filter bitsets, see filter_engine.py
+item_ids = None            # display fields per catalog row, used when formatting results
+item_genre_labels = None
+item_titles_lower = None   # lowercased titles for /content/search
+item_rating_counts = None  # number of ratings per catalog row
+item_rating_means = None   # average rating per catalog row
+popular_rows = None        # rows with enough ratings, best average first
+item_fragments = None      # cached JSON per catalog row for /recommend responses, see serialization.py
+interest_index = None      # genre centroids and candidates for interest profiles, see interest_profiles.py
+genre_lookup = None        # lowercased genre name -> genre_matrix column
+cold_start_pools = None    # popular / top rated / recent rows per content type, see cold_start.py
+cold_start_remainders = None  # the other rows of each type in a fixed shuffled order, to fill filtered pools
+sharded_scorer = None      # process pool over catalog row shards when SCORING_WORKERS > 0
+posting_index = None       # per-term posting lists of the catalog when SCORING_ENGINE=inverted, see inverted_index.py
+content_embeddings = None  # unit float32 item vectors, norms and int8 codes when LATENT_DIM > 0, see embeddings.py
+page_cache = PageCache('recommend_pages')  # ranked heads for cursor pagination, see pagination.py
 
 # --- Content type mappings ---
 CONTENT_TYPES = {
@@ -42,19 +126,49 @@ CONTENT_TYPES = {
     'podcasts': 'Podcasts',
     'books': 'Books'
 }
+CONTENT_TYPE_CODES = list(CONTENT_TYPES.keys())
+CATEGORY_TO_CONTENT_TYPE = {category: content_type for content_type, category in CONTENT_TYPES.items()}
+
+# Genre keyword rules used to classify catalog items, checked in order
+CONTENT_TYPE_KEYWORDS = [
+    ('tv_shows', ['documentary', 'reality-tv']),
+    ('podcasts', ['news', 'talk-show']),
+    ('books', ['biography', 'history']),
+]
 
 app = Flask(__name__)
 CORS(app) # Enable CORS for all routes
 
+# --- Metrics (/metrics), admin-only profiling (/debug/profile) and memory report (/debug/memory) ---
+instrument_app(app)
+register_profiler_endpoint(app)
+register_memory_endpoint(app, lambda: model_structures())
+register_gauge(METRIC_PREFIX + 'model_load_seconds', 'Time taken to load the model', lambda: model_load_seconds)
+register_gauge(METRIC_PREFIX + 'page_cache_entries', 'Rankings cached for cursor pagination', lambda: len(page_cache))
+register_gauge(METRIC_PREFIX + 'model_info', 'Loaded model version and feature mode',
+               lambda: {(('version', model_version), ('feature_mode', FEATURE_MODE)): 1} if model_version else None)
+
 # --- Model Loading Function (to be called once at startup) ---
 def load_model_artifacts():
-    global tfidf_vectorizer, movies_df, ratings_df, content_tfidf_matrix
-    if tfidf_vectorizer is not None and movies_df is not None and ratings_df is not None:
+    """Load the model from MODEL_SNAPSHOT when set, otherwise from the CSV files"""
+    global model_load_seconds
+    if content_tfidf_matrix is not None and ratings_index is not None:
         # Already loaded
         return True
+
+    start = time.perf_counter()
+    loaded = load_snapshot_artifacts(MODEL_SNAPSHOT_PATH) if MODEL_SNAPSHOT_PATH else load_csv_artifacts()
+    if loaded:
+        model_load_seconds = time.perf_counter() - start
+        logger.info(f"Model {model_version} loaded in {model_load_seconds:.2f}s")
+    return loaded
+
+def load_csv_artifacts():
+    """Load the CSV files and vectorizer (imports pandas and joblib)"""
+    global tfidf_vectorizer, movies_df, ratings_df, content_tfidf_matrix, model_version
+    import pandas as pd
     try:
-        logger.info("Loading model artifacts...")
-        tfidf_vectorizer = joblib.load(TFIDF_VECTORIZER_PATH)
+        logger.info(f"Loading model artifacts ({FEATURE_MODE} features)...")
         movies_df = pd.read_csv(PROCESSED_MOVIES_PATH)
         ratings_df = pd.read_csv(RATINGS_DATA_PATH)
 
@@ -62,8 +176,19 @@ def load_model_artifacts():
         ratings_df['movieId'] = ratings_df['movieId'].astype(int)
         movies_df['movieId'] = movies_df['movieId'].astype(int)
 
-        # Re-generate the content TF-IDF matrix from the loaded movies_df
-        content_tfidf_matrix = tfidf_vectorizer.transform(movies_df['combined_features'])
+        if FEATURE_MODE == 'hashing':
+            content_tfidf_matrix = load_hashed_content_matrix()
+        else:
+            # Re-generate the content TF-IDF matrix from the loaded movies_df
+            import joblib
+            tfidf_vectorizer = joblib.load(TFIDF_VECTORIZER_PATH)
+            if not hasattr(tfidf_vectorizer, 'idf_'):
+                logger.warning("The pickled vectorizer lost its IDF weights to a scikit-learn version mismatch. "
+                               "Consider FEATURE_MODE=hashing (see build_hashed_matrices.py).")
+            content_tfidf_matrix = tfidf_vectorizer.transform(movies_df['combined_features'])
+
+        build_catalog_indexes()
+        model_version = 'csv'
 
         logger.info("Model artifacts and data loaded successfully.")
         logger.info(f"Loaded movies_df shape: {movies_df.shape}")
@@ -73,113 +198,482 @@ def load_model_artifacts():
     except FileNotFoundError as e:
         logger.error(f"Error loading model artifacts: {e.filename}. Make sure they are in the correct directory.")
         logger.error("Please ensure 'tfidf_vectorizer.pkl', 'processed_movies.csv', and 'ratings.csv' are present.")
+        logger.error("In hashing mode 'hashing_features.npz' is required instead of the vectorizer (see build_hashed_matrices.py).")
         return False
     except Exception as e:
         logger.error(f"An unexpected error occurred during model loading: {e}")
         return False
 
+def load_hashed_content_matrix():
+    """Load the prebuilt hashed catalog matrix, transforming the catalog if it is missing or stale"""
+    global hashing_features
+    hashing_features = load_hashing_features(HASHING_FEATURES_PATH)
+
+    if os.path.exists(HASHED_CONTENT_MATRIX_PATH):
+        matrix = sparse.load_npz(HASHED_CONTENT_MATRIX_PATH).tocsr()
+        if matrix.shape == (len(movies_df), hashing_features['n_features']):
+            return matrix
+        logger.warning(f"{HASHED_CONTENT_MATRIX_PATH} does not match the catalog, re-transforming")
+
+    return transform_parallel(movies_df['combined_features'], hashing_features)
+
+def load_snapshot_artifacts(path):
+    """Load a precompiled snapshot written by build_snapshot.py (NumPy/SciPy only)"""
+    global content_tfidf_matrix, genre_matrix, genre_names, item_type_codes, ratings_index
+    global item_movie_ids, item_titles, item_genres, item_years, feature_names, model_version
+    try:
+        logger.info(f"Loading model snapshot from {path}...")
+        snapshot = load_snapshot(path)
+        arrays, strings = snapshot['arrays'], snapshot['strings']
+
+        content_tfidf_matrix = snapshot['matrices']['content']
+        genre_matrix = snapshot['matrices']['genre']
+        genre_names = np.asarray(strings['genre_names'], dtype=object)
+        item_movie_ids = arrays['item_movie_ids']
+        item_titles = np.asarray(strings['item_titles'], dtype=object)
+        item_genres = np.asarray(strings['item_genres'], dtype=object)
+        item_years = arrays['item_years']
+        item_type_codes = arrays['item_type_codes']
+        feature_names = np.asarray(strings['feature_names'], dtype=object) if 'feature_names' in strings else None
+        ratings_index = {name[len('ratings_'):]: array for name, array in arrays.items() if name.startswith('ratings_')}
+
+        build_serving_indexes()
+        model_version = snapshot['manifest']['version']
+        logger.info(f"Loaded snapshot {model_version}: {content_tfidf_matrix.shape[0]} items, "
+                    f"{len(ratings_index['ratings'])} ratings")
+        return True
+    except FileNotFoundError as e:
+        logger.error(f"Error loading model snapshot: {e.filename}. Build one with build_snapshot.py.")
+        return False
+    except Exception as e:
+        logger.error(f"An unexpected error occurred during snapshot loading: {e}")
+        return False
+
+# --- Catalog Index Construction ---
+def build_catalog_indexes():
+    """Build the catalog arrays, genre matrix, content type codes and per-user ratings index from the DataFrames"""
+    global genre_matrix, genre_names, item_type_codes, ratings_index
+    global item_movie_ids, item_titles, item_genres, item_years, feature_names
+    import pandas as pd
+
+    item_movie_ids = movies_df['movieId'].to_numpy(dtype=np.int64)
+    item_titles = movies_df['title'].to_numpy(dtype=object)
+    item_genres = movies_df['genres'].fillna('').to_numpy(dtype=object)
+    item_years = parse_release_years(item_titles)
+    feature_names = tfidf_vectorizer.get_feature_names_out() if tfidf_vectorizer is not None else None
+
+    genre_matrix, genre_names = build_genre_matrix(item_genres)
+    item_type_codes = content_type_codes(item_genres, CONTENT_TYPE_CODES, CONTENT_TYPE_KEYWORDS)
+
+    timestamps = None
+    if 'timestamp' in ratings_df.columns:
+        timestamps = ratings_df['timestamp']
+        if not pd.api.types.is_numeric_dtype(timestamps):
+            timestamps = pd.to_datetime(timestamps).astype('int64') // 10 ** 9
+
+    item_rows = pd.Index(movies_df['movieId']).get_indexer(ratings_df['movieId'])
+    ratings_index = build_ratings_index(
+        ratings_df['userId'].values,
+        item_rows,
+        ratings_df['rating'].values,
+        timestamps=timestamps.values if timestamps is not None else None
+    )
+    logger.info(f"Built genre matrix {genre_matrix.shape} and ratings index for {len(ratings_index['user_ids'])} users")
+
+    build_serving_indexes()
+
+def build_serving_indexes():
+    """Structures derived from the catalog arrays, shared by the CSV and snapshot loaders"""
+    global filter_index, item_ids, item_genre_labels, item_titles_lower
+    global item_rating_counts, item_rating_means, popular_rows, item_fragments
+    global interest_index, genre_lookup, cold_start_pools, cold_start_remainders, sharded_scorer
+    global content_embeddings, posting_index
+
+    # Sorted column indices, as snapshots store them, so in-process and sharded scoring sum in the same order
+    content_tfidf_matrix.sort_indices()
+    filter_index = build_filter_index(item_type_codes, CONTENT_TYPE_CODES, genre_matrix, genre_names, item_years)
+
+    item_ids = np.array([str(movie_id) for movie_id in item_movie_ids.tolist()], dtype=object)
+    item_genre_labels = np.array([genres.replace('|', ', ') for genres in item_genres], dtype=object)
+    item_titles_lower = [title.lower() if isinstance(title, str) else '' for title in item_titles]
+    item_fragments = FragmentCache(len(item_ids), item_fields)
+
+    # Per-item rating statistics and the popular list, from the ratings index
+    rated = ratings_index['item_rows'] >= 0
+    rows = ratings_index['item_rows'][rated]
+    n_items = len(item_ids)
+    item_rating_counts = np.bincount(rows, minlength=n_items)
+    rating_sums = np.bincount(rows, weights=ratings_index['ratings'][rated], minlength=n_items)
+    item_rating_means = rating_sums / np.maximum(item_rating_counts, 1)
+
+    eligible = np.flatnonzero(item_rating_counts >= POPULAR_MIN_RATINGS)
+    popular_rows = eligible[np.lexsort((eligible, -item_rating_means[eligible]))]
+    cold_start_pools = build_cold_start_pools(item_type_codes, CONTENT_TYPE_CODES, item_rating_counts,
+                                              item_rating_means, item_years, min_ratings=POPULAR_MIN_RATINGS)
+    cold_start_remainders = build_cold_start_remainders(cold_start_pools, item_type_codes, CONTENT_TYPE_CODES)
+
+    # Genre centroids and their candidate lists for interest-only (cold-start) profiles
+    interest_index = build_interest_index(content_tfidf_matrix, genre_matrix)
+    genre_lookup = {name.lower(): column for column, name in enumerate(genre_names.tolist())}
+
+    if LATENT_DIM > 0:
+        content_embeddings = load_content_embeddings()
+    elif LATENT_QUANTIZATION != 'none':
+        logger.warning(f"LATENT_QUANTIZATION={LATENT_QUANTIZATION} is ignored without LATENT_DIM: "
+                       "there are no embeddings to quantize")
+
+    # Posting lists for profiles with few, selective terms; other profiles still score every row
+    if SCORING_ENGINE == 'inverted' and content_embeddings is not None:
+        logger.warning("SCORING_ENGINE=inverted is ignored with LATENT_DIM: latent profiles are dense")
+    elif SCORING_ENGINE == 'inverted':
+        posting_index = build_inverted_index(content_tfidf_matrix)
+
+    # Scatter-gather scoring for catalogs too large for one core; workers map the snapshot when
+    # serving from one, otherwise a copy of the matrix in shared memory
+    if SCORING_WORKERS > 0 and content_embeddings is not None:
+        logger.warning("SCORING_WORKERS is ignored with LATENT_DIM: latent scoring is dense and in-process")
+    elif SCORING_WORKERS > 0:
+        sharded_scorer = ShardedScorer(content_tfidf_matrix, SCORING_WORKERS, snapshot_path=MODEL_SNAPSHOT_PATH)
+        atexit.register(sharded_scorer.close)
+        logger.info(f"Scoring {len(sharded_scorer.bounds) - 1} catalog shards across {SCORING_WORKERS} processes")
+
+def load_content_embeddings():
+    """Load the cached latent embeddings (memory-mapped), fitting them in memory if missing or stale"""
+    if os.path.exists(CONTENT_EMBEDDINGS_PATH):
+        embeddings = load_embeddings(CONTENT_EMBEDDINGS_PATH, content_tfidf_matrix, LATENT_DIM)
+        if embeddings is not None:
+            return embeddings
+        logger.warning(f"{CONTENT_EMBEDDINGS_PATH} does not match the catalog or LATENT_DIM, refitting")
+
+    start = time.perf_counter()
+    embeddings = build_embeddings(content_tfidf_matrix, LATENT_DIM)
+    logger.info(f"Fit {LATENT_DIM}-dim embeddings in {time.perf_counter() - start:.1f}s "
+                f"(energy kept {float(embeddings['energy']):.3f}); save them with embeddings.py --build")
+    return quantize_embeddings(embeddings) if LATENT_QUANTIZATION == 'int8' else embeddings
+
+def model_structures():
+    """Loaded model structures by name, for /debug/memory and memory_report.py"""
+    return {
+        'movies_df': movies_df,
+        'ratings_df': ratings_df,
+        'content_tfidf_matrix': content_tfidf_matrix,
+        'tfidf_vectorizer': tfidf_vectorizer,
+        'hashing_features': hashing_features,
+        'feature_names': feature_names,
+        'genre_matrix': genre_matrix,
+        'ratings_index': ratings_index,
+        'filter_index': filter_index,
+        'item_catalog': {'item_movie_ids': item_movie_ids, 'item_titles': item_titles, 'item_genres': item_genres,
+                         'item_years': item_years, 'item_type_codes': item_type_codes, 'item_ids': item_ids,
+                         'item_genre_labels': item_genre_labels, 'item_titles_lower': item_titles_lower},
+        'item_rating_stats': {'item_rating_counts': item_rating_counts, 'item_rating_means': item_rating_means,
+                              'popular_rows': popular_rows},
+        'interest_index': interest_index,
+        'content_embeddings': content_embeddings,
+        'posting_index': posting_index,
+        'cold_start_pools': cold_start_pools,
+        'cold_start_remainders': cold_start_remainders,
+        'item_fragments': item_fragments,
+        'page_cache': page_cache,
+    }
+
 # --- User Profile Representation Function ---
-def get_user_profile_vector(user_id, min_rating_threshold=4.0):
-    if ratings_df is None or movies_df is None or tfidf_vectorizer is None:
+def get_user_liked_items(user_id, min_rating_threshold=None):
+    """Catalog rows the user rated at or above the threshold (PROFILE_MIN_RATING by default), their
+    ratings and normalized profile weights (PROFILE_WEIGHTING with optional recency decay), or None"""
+    if min_rating_threshold is None:
+        min_rating_threshold = PROFILE_MIN_RATING
+    if ratings_index is None or content_tfidf_matrix is None:
         logger.error("Error: Data or vectorizer not loaded for user profile generation.")
         return None
 
-    user_highly_rated_movies = ratings_df[
-        (ratings_df['userId'] == user_id) &
-        (ratings_df['rating'] >= min_rating_threshold)
-    ]
+    rows = user_slice(ratings_index, user_id)
+    ratings = ratings_index['ratings'][rows]
+    high = ratings >= min_rating_threshold
 
-    if user_highly_rated_movies.empty:
+    if not high.any():
         logger.info(f"User {user_id} has no movies rated {min_rating_threshold} or higher.")
         return None
 
-    highly_rated_movie_ids = user_highly_rated_movies['movieId'].tolist()
-    liked_movies_data = movies_df[movies_df['movieId'].isin(highly_rated_movie_ids)]
+    liked_rows = ratings_index['item_rows'][rows][high]
+    in_catalog = liked_rows >= 0
+    timestamps = ratings_index['timestamps'][rows][high][in_catalog] if 'timestamps' in ratings_index else None
+    weights = profile_weights(ratings[high][in_catalog], timestamps,
+                              scheme=PROFILE_WEIGHTING, half_life_days=PROFILE_HALF_LIFE_DAYS)
+    liked_rows = liked_rows[in_catalog]
+    liked_ratings = ratings[high][in_catalog]
 
-    if liked_movies_data.empty:
+    if liked_rows.size == 0:
         logger.warning(f"No content data found for highly-rated movies of user {user_id}.")
         return None
 
-    liked_movie_indices = liked_movies_data.index.tolist()
-    liked_content_vectors = content_tfidf_matrix[liked_movie_indices]
-
-    ratings_map = user_highly_rated_movies.set_index('movieId')['rating'].to_dict()
-    weights = np.array([ratings_map[mid] for mid in liked_movies_data['movieId']])
-
     if weights.sum() > 0:
         weights = weights / weights.sum()
     else:
         weights = np.ones_like(weights) / len(weights)
+    return liked_rows, liked_ratings, weights
+
+def get_profile_terms(user_id, min_rating_threshold=None):
+    """Nonzero TF-IDF columns of the user's profile, from the liked rows instead of a vocabulary scan"""
+    liked = get_user_liked_items(user_id, min_rating_threshold)
+    if liked is None:
+        return None
+    block = content_tfidf_matrix[liked[0]]
+    indices = np.sort(block.indices)
+    return indices[np.r_[True, indices[1:] != indices[:-1]]] if len(indices) else indices
+
+def get_user_profile_vector(user_id, min_rating_threshold=None):
+    """Weighted average of the TF-IDF rows the user liked, see get_user_liked_items (of their
+    latent projections with LATENT_DIM)"""
+    liked = get_user_liked_items(user_id, min_rating_threshold)
+    if liked is None:
+        return None
+    liked_rows, _, weights = liked
+    if content_embeddings is not None:
+        return embedding_profile(content_embeddings, liked_rows, weights)
+    # (liked x terms)^T @ weights -> dense profile over the TF-IDF terms
+    return content_tfidf_matrix[liked_rows].T @ weights
+
+# --- Scoring and Top-K Selection ---
+def score_items(user_profile_vector, rows=None):
+    """Cosine similarity between the profile and all catalog rows, or only the given rows.
+
+    Catalog rows are L2-normalized by the vectorizer, so only the profile norm is divided out.
+    With LATENT_DIM the profile is latent and scoring is a dense GEMV over the item embeddings
+    (approximate, over their int8 codes, with LATENT_QUANTIZATION=int8; see select_top_k).
+    """
+    if content_embeddings is not None and LATENT_QUANTIZATION == 'int8':
+        return quantized_scores(content_embeddings, user_profile_vector, rows)
+    if content_embeddings is not None:
+        return embedding_scores(content_embeddings, user_profile_vector, rows)
+    matrix = content_tfidf_matrix if rows is None else content_tfidf_matrix[rows]
+    scores = matrix @ user_profile_vector
+    norm = np.linalg.norm(user_profile_vector)
+    return scores / norm if norm > 0 else scores
+
+def select_top_k(user_profile_vector, similarity_scores, k, rows=None):
+    """Positions and scores of the top k masked scores. Int8 latent scores only pick candidates:
+    the best are re-scored from the float32 vectors (rows maps positions to catalog rows)."""
+    if content_embeddings is None or LATENT_QUANTIZATION != 'int8':
+        top = top_k_positions(similarity_scores, k)
+        return top, similarity_scores[top]
+    positions, exact = rerank_candidates(content_embeddings, user_profile_vector, similarity_scores, k, rows)
+    record_count('reranked', len(positions))
+    order = top_k_positions(exact, k)
+    return positions[order], exact[order]
 
-    weighted_vectors = liked_content_vectors.multiply(weights[:, np.newaxis])
-    user_profile_vector = weighted_vectors.sum(axis=0)
-    return user_profile_vector
+def get_selection_bits(content_type=None, category_filter=None, filters=None):
+    """Packed catalog selection for a request, or None when nothing is filtered"""
+    bits = build_filter_mask(filter_index, **(filters or {}))
+    for requested_type in (content_type, CATEGORY_TO_CONTENT_TYPE.get(category_filter, category_filter)):
+        if not requested_type:
+            continue
+        if requested_type not in filter_index['content_type']:
+            # Unknown categories match nothing
+            return np.zeros_like(filter_index['content_type'][CONTENT_TYPE_CODES[0]])
+        bits = intersect(bits, filter_index['content_type'][requested_type])
+    return bits
+
+def format_recommendation(row, score):
+    """Response dict for one catalog row"""
+    item_content_type = CONTENT_TYPE_CODES[item_type_codes[row]]
+    return {
+        'id': item_ids[row],
+        'title': item_titles[row],
+        'category': CONTENT_TYPES[item_content_type],
+        'content_type': item_content_type,
+        'genre': item_genre_labels[row],
+        'description': f"Genres: {item_genre_labels[row]}",
+        'similarity_score': float(score)
+    }
+
+def item_fields(row):
+    """Response fields of a catalog row without its score, for the fragment cache"""
+    item = format_recommendation(row, 0.0)
+    del item['similarity_score']
+    return item
 
 # --- Enhanced Recommendation Generation Function ---
-def get_recommendations_ml(user_id, content_type=None, category_filter=None, num_recommendations=5):
+def rank_recommendations(user_id, content_type=None, category_filter=None, num_recommendations=5, filters=None,
+                         diversity=None):
+    """Catalog rows and scores of a user's top recommendations, with content type, category and
+    request filters pushed down. diversity=(lambda, candidates) re-ranks the head by MMR."""
+    if diversity is not None:
+        lam, candidates = diversity
+        rows, scores = rank_recommendations(user_id, content_type, category_filter,
+                                            max(num_recommendations, candidates), filters)
+        start = time.perf_counter()
+        rows, scores = mmr_rerank(content_tfidf_matrix, rows, scores, num_recommendations, lam, candidates)
+        record_stage('diversity', start)
+        return rows, scores
+
+    start = time.perf_counter()
+    bits = get_selection_bits(content_type, category_filter, filters)
+    start = record_stage('filtering', start)
     user_profile_vector = get_user_profile_vector(user_id)
+    start = record_stage('profile', start)
 
     if user_profile_vector is None:
-        logger.info(f"No specific profile for user {user_id} (no high ratings), returning a random sample of content.")
-        random_sample_df = movies_df.sample(n=num_recommendations)
-        formatted_sample = []
-        for idx, item in random_sample_df.iterrows():
-            formatted_sample.append({
-                'id': str(item['movieId']),
-                'title': item['title'],
-                'category': 'Movies',
-                'content_type': 'movies',
-                'genre': item['genres'].replace('|', ', '),
-                'description': f"Genres: {item['genres'].replace('|', ', ')}",
-                'similarity_score': 0.0
-            })
-        return formatted_sample
+        logger.info(f"No specific profile for user {user_id} (no high ratings), returning cold-start content.")
+        top_rows = cold_start_recommendations(user_id, content_type, category_filter, bits,
+                                              num_recommendations)
+        record_stage('cold_start', start)
+        record_count('returned', len(top_rows))
+        return top_rows, np.zeros(len(top_rows))
+
+    rated_rows = ratings_index['item_rows'][user_slice(ratings_index, user_id)]
+    rated_rows = rated_rows[rated_rows >= 0]
 
-    # --- CRITICAL FIX: Convert user_profile_vector to numpy array ---
-    user_profile_vector_np = user_profile_vector.toarray() if hasattr(user_profile_vector, 'toarray') else np.asarray(user_profile_vector)
+    selected = filter_index['n_items'] if bits is None else count_selected(bits)
+    strategy = 'mask' if bits is None else choose_strategy(selected, filter_index['n_items'])
+    record_count('candidates', selected)
+    record_count('excluded_rated', len(rated_rows))
+    engine, terms = 'matrix', None
+    if posting_index is not None and strategy == 'mask':
+        terms = get_profile_terms(user_id)
+        engine = choose_engine(posting_index, terms)
+    if strategy == 'subset':
+        # Narrow filter: score only the selected rows
+        rows = np.flatnonzero(unpack_mask(filter_index, bits))
+        similarity_scores = score_items(user_profile_vector, rows)
+        similarity_scores[np.isin(rows, rated_rows)] = -np.inf
+        start = record_stage('scoring', start)
+        record_count('scored', len(rows))
+        positions, top_scores = select_top_k(user_profile_vector, similarity_scores, num_recommendations, rows)
+        top_rows = rows[positions]
+    elif engine == 'inverted':
+        # Broad or no filter, few selective terms: read only their posting lists (exact top-K)
+        top_rows, top_scores, read = inverted_top_k(posting_index, content_tfidf_matrix, user_profile_vector,
+                                                    num_recommendations, rated_rows, bits, terms)
+        start = record_stage('scoring', start)
+        record_count('postings_read', read)
+    elif sharded_scorer is not None:
+        # Broad or no filter, scored and masked per shard by the worker processes
+        top_rows, top_scores = sharded_scorer.top_k(user_profile_vector, num_recommendations, rated_rows, bits)
+        start = record_stage('scoring', start)
+        record_count('scored', filter_index['n_items'])
+    else:
+        # Broad or no filter: mask the full score vector before top-K
+        similarity_scores = score_items(user_profile_vector)
+        if bits is not None:
+            similarity_scores[~unpack_mask(filter_index, bits)] = -np.inf
+        similarity_scores[rated_rows] = -np.inf
+        start = record_stage('scoring', start)
+        record_count('scored', len(similarity_scores))
+        top_rows, top_scores = select_top_k(user_profile_vector, similarity_scores, num_recommendations)
+    record_stage('top_k', start)
 
-    similarity_scores = cosine_similarity(user_profile_vector_np, content_tfidf_matrix).flatten()
-    sorted_indices = similarity_scores.argsort()[::-1]
+    logger.debug(f"Scored user {user_id} with '{strategy}' strategy and the {engine} engine")
+    record_count('returned', len(top_rows))
+    return top_rows, top_scores
 
-    recommended_items = []
-    seen_movie_ids = set()
-    user_rated_movie_ids = set(ratings_df[ratings_df['userId'] == user_id]['movieId'].tolist())
+def cold_start_recommendations(user_id, content_type, category_filter, bits, num_recommendations, offset=0):
+    """Rows for a request without a profile, from the precomputed cold-start pool of the requested
+    type in a per-user order (pool order when user_id is None).
 
-    for idx in sorted_indices:
-        movie_id = movies_df.iloc[idx]['movieId']
+    Extra filters are checked on the pool rows only. When they leave too few, the page is filled
+    from the type's remaining rows, read in a per-user order only until the page is full; the
+    selection's popcount bounds that read (see remainder_rows).
+    """
+    pool_type = content_type or CATEGORY_TO_CONTENT_TYPE.get(category_filter, category_filter)
+    selected = None if bits is None else (lambda rows: rows_selected(bits, rows))
+    rows = cold_start_rows(cold_start_pools, user_id, pool_type, num_recommendations, offset, selected)
+    if len(rows) == num_recommendations or bits is None or (pool_type or ALL_TYPES) not in cold_start_pools:
+        return rows
 
-        if movie_id in seen_movie_ids or movie_id in user_rated_movie_ids:
-            continue
+    # The selection is within the pool's type, so its popcount less the pool's matches is
+    # what the remainder holds
+    in_pool = int(selected(cold_start_pools[pool_type or ALL_TYPES]).sum())
+    rest = remainder_rows(cold_start_remainders, user_id, pool_type, num_recommendations - len(rows),
+                          max(offset - in_pool, 0), selected, available=count_selected(bits) - in_pool,
+                          selected_rows=lambda: np.flatnonzero(unpack_mask(filter_index, bits)))
+    return np.concatenate([rows, rest])
 
-        item = movies_df.iloc[idx].to_dict()
+def explain_recommendations(user_id, top_rows):
+    """"Because you liked" explanation per returned row, or None per row when the user has no
+    profile; only the returned and liked rows are touched (see explanations.py)"""
+    liked = get_user_liked_items(user_id)
+    if liked is None:
+        return [None] * len(top_rows)
+    liked_rows, liked_ratings, weights = liked
 
-        # Determine content type based on genre or other criteria
-        item_content_type = determine_content_type(item['genres'])
-        
-        # Apply content type filter if specified
-        if content_type and item_content_type != content_type:
-            continue
+    def liked_item(position):
+        row = liked_rows[position]
+        return {'id': item_ids[row], 'title': item_titles[row], 'rating': float(liked_ratings[position])}
 
-        # Apply category filter if specified
-        item_category = 'Movies'  # Default for now
-        if category_filter and item_category != category_filter:
-            continue
+    # Explain in the space that ranked the items
+    if content_embeddings is not None:
+        by_liked = attribute_latent_scores(content_embeddings['vectors'], content_embeddings['norms'],
+                                           top_rows, liked_rows, weights)
+        return explain_items(by_liked, None, liked_item, None)
 
-        recommended_items.append({
-            'id': str(item['movieId']),
-            'title': item['title'],
-            'category': item_category,
-            'content_type': item_content_type,
-            'genre': item['genres'].replace('|', ', '),
-            'description': f"Genres: {item['genres'].replace('|', ', ')}",
-            'similarity_score': float(similarity_scores[idx])
-        })
-        seen_movie_ids.add(movie_id)
+    by_liked, by_term = attribute_scores(content_tfidf_matrix, top_rows, liked_rows, weights)
+    if feature_names is not None:
+        def term_name(item, column):
+            return str(feature_names[column])
+    else:
+        # Hashed columns have no vocabulary: name them from each item's own title and genres
+        n_features = content_tfidf_matrix.shape[1]
+        names = [hashed_terms([f"{item_titles[row]} {item_genres[row].replace('|', ' ')}"], n_features)
+                 for row in top_rows.tolist()]
+
+        def term_name(item, column):
+            return names[item].get(column)
+
+    return explain_items(by_liked, by_term, liked_item, term_name)
 
-        if len(recommended_items) >= num_recommendations:
-            break
+def get_recommendations_ml(user_id, content_type=None, category_filter=None, num_recommendations=5, filters=None,
+                           diversity=None):
+    """Top recommendations for a user as response dicts"""
+    top_rows, top_scores = rank_recommendations(user_id, content_type, category_filter, num_recommendations, filters,
+                                                diversity)
+    start = time.perf_counter()
+    recommendations = [format_recommendation(row, score) for row, score in zip(top_rows, top_scores)]
+    record_stage('format', start)
+    return recommendations
 
-    return recommended_items
+def rank_interest_recommendations(genres, content_type=None, category_filter=None, num_recommendations=5,
+                                  filters=None):
+    """Catalog rows and scores for a profile built from genre interests (genre_matrix columns).
+
+    A single genre is served from its precomputed candidate list when enough
+    candidates pass the filters; otherwise the catalog is scored with one
+    sparse mat-vec against the mean of the genre centroids. Without genres
+    the cold-start pool is returned in its ranked order.
+    """
+    start = time.perf_counter()
+    bits = get_selection_bits(content_type, category_filter, filters)
+    start = record_stage('filtering', start)
+
+    if len(genres) == 0:
+        top_rows = cold_start_recommendations(None, content_type, category_filter, bits,
+                                              num_recommendations)
+        record_stage('cold_start', start)
+        record_count('returned', len(top_rows))
+        return top_rows, np.zeros(len(top_rows))
+
+    if len(genres) == 1 and num_recommendations <= interest_index['candidate_rows'].shape[1]:
+        rows = interest_index['candidate_rows'][genres[0]]
+        scores = interest_index['candidate_scores'][genres[0]]
+        complete = len(rows) == len(item_ids)
+        if bits is not None:
+            keep = rows_selected(bits, rows)
+            rows, scores = rows[keep], scores[keep]
+        # The list is the head of the full ranking, so its first survivors are the answer
+        if len(rows) >= num_recommendations or complete:
+            record_stage('candidates', start)
+            record_count('returned', min(len(rows), num_recommendations))
+            return rows[:num_recommendations], scores[:num_recommendations]
+
+    similarity_scores = interest_scores(interest_index, content_tfidf_matrix, genres)
+    if bits is not None:
+        similarity_scores[~unpack_mask(filter_index, bits)] = -np.inf
+    start = record_stage('scoring', start)
+    record_count('scored', len(similarity_scores))
+    top_rows = top_k_positions(similarity_scores, num_recommendations)
+    record_stage('top_k', start)
+    record_count('returned', len(top_rows))
+    return top_rows, similarity_scores[top_rows]
 
 # --- Content Type Determination Function ---
 def determine_content_type(genres):
@@ -187,67 +681,89 @@ def determine_content_type(genres):
     genres_lower = genres.lower()
     
     # This is a simple heuristic - in a real system, you'd have separate datasets
-    if any(genre in genres_lower for genre in ['documentary', 'reality-tv']):
-        return 'tv_shows'
-    elif any(genre in genres_lower for genre in ['news', 'talk-show']):
-        return 'podcasts'
-    elif any(genre in genres_lower for genre in ['biography', 'history']):
-        return 'books'
-    else:
-        return 'movies'  # Default to movies
+    for content_type, keywords in CONTENT_TYPE_KEYWORDS:
+        if any(genre in genres_lower for genre in keywords):
+            return content_type
+    return 'movies'  # Default to movies
 
 # --- Get user statistics with content type breakdown ---
 def get_user_stats(user_id):
-    if ratings_df is None:
+    """User statistics computed from the ratings index in O(user ratings)"""
+    if ratings_index is None:
         return None
     
-    user_ratings = ratings_df[ratings_df['userId'] == user_id]
-    if user_ratings.empty:
+    rows = user_slice(ratings_index, user_id)
+    user_ratings = ratings_index['ratings'][rows]
+    if user_ratings.size == 0:
         return {
             'total_ratings': 0,
             'average_rating': 0,
             'high_ratings': 0,
             'favorite_genres': [],
-            'content_type_breakdown': {
-                'movies': 0,
-                'tv_shows': 0,
-                'podcasts': 0,
-                'books': 0
-            }
+            'content_type_breakdown': type_breakdown([], CONTENT_TYPE_CODES)
         }
     
-    total_ratings = len(user_ratings)
-    average_rating = user_ratings['rating'].mean()
-    high_ratings = len(user_ratings[user_ratings['rating'] >= 4.0])
+    high = user_ratings >= 4.0
     
-    # Get favorite genres
-    highly_rated_movies = user_ratings[user_ratings['rating'] >= 4.0]['movieId'].tolist()
-    if highly_rated_movies:
-        liked_movies = movies_df[movies_df['movieId'].isin(highly_rated_movies)]
-        if not liked_movies.empty:
-            all_genres = []
-            content_type_counts = {'movies': 0, 'tv_shows': 0, 'podcasts': 0, 'books': 0}
-            
-            for idx, movie in liked_movies.iterrows():
-                all_genres.extend(movie['genres'].split('|'))
-                content_type = determine_content_type(movie['genres'])
-                content_type_counts[content_type] += 1
-            
-            genre_counts = pd.Series(all_genres).value_counts()
-            favorite_genres = genre_counts.head(5).index.tolist()
-        else:
-            favorite_genres = []
-            content_type_counts = {'movies': 0, 'tv_shows': 0, 'podcasts': 0, 'books': 0}
-    else:
-        favorite_genres = []
-        content_type_counts = {'movies': 0, 'tv_shows': 0, 'podcasts': 0, 'books': 0}
+    # Favorite genres and type breakdown over the distinct highly rated catalog items
+    liked_rows = ratings_index['item_rows'][rows][high]
+    liked_rows = np.unique(liked_rows[liked_rows >= 0])
     
     return {
-        'total_ratings': int(total_ratings),
-        'average_rating': float(average_rating),
-        'high_ratings': int(high_ratings),
-        'favorite_genres': favorite_genres,
-        'content_type_breakdown': content_type_counts
+        'total_ratings': int(user_ratings.size),
+        'average_rating': float(user_ratings.mean(dtype=np.float64)),
+        'high_ratings': int(high.sum()),
+        'favorite_genres': top_genres(genre_matrix, liked_rows, genre_names),
+        'content_type_breakdown': type_breakdown(item_type_codes[liked_rows], CONTENT_TYPE_CODES)
+    }
+
+# --- Request Filter Parsing ---
+def string_list(value, name):
+    """A string or list of strings as a list (None when absent); raises ValueError for anything else"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f"{name} must be a string or a list of strings")
+    return value
+
+def parse_request_filters(filters):
+    """Translate the optional 'filters' object of a /recommend request into build_filter_mask arguments"""
+    if not filters:
+        return {}
+    if not isinstance(filters, dict):
+        raise ValueError("filters must be an object")
+
+    content_types = string_list(filters.get('contentType'), 'contentType')
+    invalid_types = [ct for ct in content_types or [] if ct not in CONTENT_TYPES]
+    if invalid_types:
+        raise ValueError(f"unsupported content types {invalid_types}. Supported types: {list(CONTENT_TYPES.keys())}")
+
+    genres = string_list(filters.get('genres'), 'genres')
+
+    genre_match = str(filters.get('genreMatch', 'any')).lower()
+    if genre_match not in GENRE_MATCH_MODES:
+        raise ValueError(f"genreMatch must be one of {list(GENRE_MATCH_MODES)}")
+    operator = str(filters.get('operator', 'and')).lower()
+    if operator not in FILTER_OPERATORS:
+        raise ValueError(f"operator must be one of {list(FILTER_OPERATORS)}")
+
+    year_from = filters.get('yearFrom')
+    year_to = filters.get('yearTo')
+    try:
+        year_from = int(year_from) if year_from is not None else None
+        year_to = int(year_to) if year_to is not None else None
+    except (ValueError, TypeError, OverflowError):
+        raise ValueError("yearFrom and yearTo must be integers")
+
+    return {
+        'content_types': content_types,
+        'genres': genres,
+        'genre_match': genre_match,
+        'year_from': year_from,
+        'year_to': year_to,
+        'operator': operator
     }
 
 # --- Flask API Endpoints ---
@@ -258,7 +774,9 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "model_loaded": tfidf_vectorizer is not None and movies_df is not None,
+        "model_loaded": content_tfidf_matrix is not None and ratings_index is not None,
+        "feature_mode": FEATURE_MODE,
+        "model_version": model_version,
         "supported_content_types": list(CONTENT_TYPES.keys())
     })
 
@@ -270,12 +788,50 @@ def recommend():
         if not data:
             return jsonify({"error": "No JSON data provided"}), 400
         
+        # Follow-up pages repeat the first request's parameters from its cursor
+        offset = 0
+        if data.get('cursor') is not None:
+            try:
+                cursor = decode_cursor(data['cursor'])
+                offset = int(cursor['offset'])
+                if offset < 0:
+                    raise ValueError("negative offset")
+                # A ranking is never longer than the catalog, so deeper pages cannot exist
+                if offset >= len(item_ids):
+                    raise ValueError("offset past the end of the catalog")
+                data = dict(data, **cursor['request'])
+            except (ValueError, KeyError, TypeError, OverflowError) as e:
+                return jsonify({"error": f"Invalid cursor: {e}"}), 400
+
         user_id = data.get('userId')
         content_type = data.get('contentType', None)  # New parameter
         category_filter = data.get('categoryFilter', None)
-        num_recommendations = data.get('numRecommendations', 5)
+        # Opt-in stage breakdown in the response body and a Server-Timing header
+        g.debug_timings = bool(data.get('debug'))
+        # Optional per-item attributions to liked items and shared terms, see explanations.py
+        explain = bool(data.get('explain'))
+
+        # The page size also bounds how deep a ranking one request can put in the page cache
+        try:
+            num_recommendations = parse_page_size(data.get('numRecommendations'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        try:
+            filters = parse_request_filters(data.get('filters'))
+        except ValueError as e:
+            return jsonify({"error": f"Invalid filters: {e}"}), 400
+
+        # Optional MMR re-ranking of the top candidates, see diversity.py
+        try:
+            diversity = parse_diversity(data.get('diversity'))
+        except ValueError as e:
+            return jsonify({"error": f"Invalid diversity: {e}"}), 400
 
         if user_id is None:
+            if 'userInterests' in data:
+                # Interest-only payload from the Spring backend (MlRecommendationService)
+                return interest_recommendations_response(data)
             return jsonify({"error": "userId is required"}), 400
 
         # Validate content type if provided
@@ -291,20 +847,98 @@ def recommend():
         if not load_model_artifacts():
             return jsonify({"error": "Model not loaded. Server might be initializing."}), 500
 
-        logger.info(f"Generating recommendations for user {user_id}, content type: {content_type}")
-        recommendations = get_recommendations_ml(user_id, content_type, category_filter, num_recommendations)
-        
-        return jsonify({
-            "recommendations": recommendations,
+        g.log_fields = {"user_id": user_id, "content_type": content_type, "offset": offset}
+        logger.debug(f"Generating recommendations for user {user_id}, content type: {content_type}")
+        # Pages come from a cached ranking head, ranked a few pages deep on a miss
+        request_params = {"userId": user_id, "contentType": content_type, "categoryFilter": category_filter,
+                          "filters": data.get('filters'), "diversity": data.get('diversity')}
+        top_rows, top_scores, more = ranked_page(
+            page_cache, request_key(model_version, request_params),
+            lambda depth: rank_recommendations(user_id, content_type, category_filter, depth, filters, diversity),
+            offset, num_recommendations)
+
+        extras = None
+        if explain:
+            start = time.perf_counter()
+            extras = [{"explanation": explanation} for explanation in explain_recommendations(user_id, top_rows)]
+            record_stage('explain', start)
+
+        # Recommendations are joined from cached per-item JSON instead of building dicts
+        start = time.perf_counter()
+        recommendations = item_fragments.array(top_rows, top_scores, extras)
+        start = record_stage('format', start)
+        body = {
             "user_id": user_id,
             "content_type": content_type,
-            "count": len(recommendations)
-        })
+            "count": len(top_rows),
+            "offset": offset,
+            "next_cursor": encode_cursor({"request": request_params, "offset": offset + len(top_rows)})
+            if more and len(top_rows) else None
+        }
+        if g.debug_timings:
+            timings = trace_summary()
+            body["debug"] = {"timings": timings, "page_cache": timings['caches'].get(page_cache.name)}
+        response = json_response(body, raw={"recommendations": recommendations})
+        record_stage('serialization', start)
+        return response
     
     except Exception as e:
         logger.error(f"Error in recommend endpoint: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
+@app.route('/recommend/interests', methods=['POST'])
+def recommend_by_interests():
+    """Recommendations for a user known only by category/genre interests"""
+    try:
+        data = request.json
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+        return interest_recommendations_response(data)
+
+    except Exception as e:
+        logger.error(f"Error in recommend_by_interests endpoint: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+def interest_recommendations_response(data):
+    """Response for a {userInterests, categoryFilter} payload: a plain JSON list of items,
+    which is what the Spring backend deserializes"""
+    content_type = data.get('contentType', None)
+    category_filter = data.get('categoryFilter', None)
+    g.debug_timings = bool(data.get('debug'))
+
+    try:
+        num_recommendations = parse_page_size(data.get('numRecommendations'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        filters = parse_request_filters(data.get('filters'))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid filters: {e}"}), 400
+
+    if content_type and content_type not in CONTENT_TYPES:
+        return jsonify({"error": f"Invalid content type. Supported types: {list(CONTENT_TYPES.keys())}"}), 400
+
+    if not load_model_artifacts():
+        return jsonify({"error": "Model not loaded. Server might be initializing."}), 500
+
+    try:
+        genres, unmatched = match_interests(data.get('userInterests') or [], genre_lookup)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid userInterests: {e}"}), 400
+
+    g.log_fields = {"genres": genre_names[genres].tolist(), "unmatched_genres": unmatched,
+                    "category_filter": category_filter}
+    if unmatched:
+        logger.debug(f"Interests not in the catalog genres: {unmatched}")
+    top_rows, top_scores = rank_interest_recommendations(genres, content_type, category_filter,
+                                                         num_recommendations, filters)
+
+    start = time.perf_counter()
+    response = Response(item_fragments.array(top_rows, top_scores), mimetype=JSON_MIMETYPE)
+    record_stage('format', start)
+    return response
+
 @app.route('/user/<int:user_id>/stats', methods=['GET'])
 def user_stats(user_id):
     """Get user statistics with content type breakdown"""
@@ -347,24 +981,26 @@ def search_content():
         if not load_model_artifacts():
             return jsonify({"error": "Model not loaded"}), 500
         
-        # Search in movies data (extend this for other content types)
-        matching_content = movies_df[movies_df['title'].str.lower().str.contains(query, na=False)]
-        
+        # Substring match over the precomputed lowercase titles, stopping at the limit
+        type_code = CONTENT_TYPE_CODES.index(content_type) if content_type in CONTENT_TYPES else None
         results = []
-        for idx, item in matching_content.head(limit).iterrows():
-            content_type_detected = determine_content_type(item['genres'])
+        for row, title in enumerate(item_titles_lower):
+            if query not in title:
+                continue
             
             # Apply content type filter if specified
-            if content_type and content_type_detected != content_type:
+            if content_type and item_type_codes[row] != type_code:
                 continue
             
             results.append({
-                'id': str(item['movieId']),
-                'title': item['title'],
-                'content_type': content_type_detected,
-                'genre': item['genres'].replace('|', ', '),
-                'description': f"Genres: {item['genres'].replace('|', ', ')}"
+                'id': item_ids[row],
+                'title': item_titles[row],
+                'content_type': CONTENT_TYPE_CODES[item_type_codes[row]],
+                'genre': item_genre_labels[row],
+                'description': f"Genres: {item_genre_labels[row]}"
             })
+            if len(results) >= limit:
+                break
         
         return jsonify({
             "query": query,
@@ -387,40 +1023,22 @@ def get_popular_content():
         if not load_model_artifacts():
             return jsonify({"error": "Model not loaded"}), 500
         
-        # Calculate average rating and count for each item
-        content_stats = ratings_df.groupby('movieId').agg({
-            'rating': ['mean', 'count']
-        }).reset_index()
-        content_stats.columns = ['movieId', 'avg_rating', 'rating_count']
-        
-        # Filter content with minimum ratings and sort by average rating
-        popular_content = content_stats[content_stats['rating_count'] >= 10].sort_values('avg_rating', ascending=False)
-        
-        # Get content details
-        popular_content_ids = popular_content.head(limit)['movieId'].tolist()
-        popular_content_data = movies_df[movies_df['movieId'].isin(popular_content_ids)]
+        # Popular rows are precomputed at load time (best average first)
+        rows = popular_rows
+        if content_type:
+            type_code = CONTENT_TYPE_CODES.index(content_type) if content_type in CONTENT_TYPES else -1
+            rows = rows[item_type_codes[rows] == type_code]
         
         results = []
-        for content_id in popular_content_ids:
-            content_data = popular_content_data[popular_content_data['movieId'] == content_id]
-            if not content_data.empty:
-                content_row = content_data.iloc[0]
-                stats_row = popular_content[popular_content['movieId'] == content_id].iloc[0]
-                
-                content_type_detected = determine_content_type(content_row['genres'])
-                
-                # Apply content type filter if specified
-                if content_type and content_type_detected != content_type:
-                    continue
-                
-                results.append({
-                    'id': str(content_row['movieId']),
-                    'title': content_row['title'],
-                    'content_type': content_type_detected,
-                    'genre': content_row['genres'].replace('|', ', '),
-                    'avg_rating': float(stats_row['avg_rating']),
-                    'rating_count': int(stats_row['rating_count'])
-                })
+        for row in rows[:limit]:
+            results.append({
+                'id': item_ids[row],
+                'title': item_titles[row],
+                'content_type': CONTENT_TYPE_CODES[item_type_codes[row]],
+                'genre': item_genre_labels[row],
+                'avg_rating': float(item_rating_means[row]),
+                'rating_count': int(item_rating_counts[row])
+            })
         
         return jsonify({
             "content_type_filter": content_type,
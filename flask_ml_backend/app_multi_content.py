@@ -7,27 +7,34 @@ Handles real datasets for movies, TV shows, podcasts, and books
 import pandas as pd
 import joblib
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
+import heapq
+import itertools
 import os
+import time
 import logging
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify
 from flask_cors import CORS
+from genre_index import build_genre_matrix, top_genres, type_breakdown
+from ratings_index import build_ratings_index, user_slice
+from cold_start import build_cold_start_pools, cold_start_rows
+from filter_engine import parse_release_years
+from hashing_features import load_hashing_features, transform_parallel
+from async_logging import configure_logging
+from metrics import METRIC_PREFIX, instrument_app, record_count, record_stage, register_gauge, trace_summary
+from memory_report import register_memory_endpoint
+from sampling_profiler import register_profiler_endpoint
+from serialization import json_response
+from top_k import top_k_positions
 
 # Suppress scikit-learn version compatibility warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="sklearn")
 
-# --- Configure logging ---
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('multi_content_api.log'),
-        logging.StreamHandler()
-    ]
-)
+# --- Configure logging (queued, written by a background thread) ---
+configure_logging('multi_content_api.log')
 logger = logging.getLogger(__name__)
 
 # --- Paths to dataset files ---
@@ -38,13 +45,31 @@ PODCASTS_PATH = 'podcasts.csv'
 BOOKS_PATH = 'books.csv'
 COMBINED_CONTENT_PATH = 'combined_content.csv'
 MULTI_CONTENT_RATINGS_PATH = 'multi_content_ratings.csv'
+HASHING_FEATURES_PATH = 'hashing_features.npz'
+
+# --- Feature extraction mode: 'tfidf' (pickled vectorizer) or 'hashing' (see hashing_features.py) ---
+FEATURE_MODE = os.environ.get('FEATURE_MODE', 'tfidf')
+
+# --- Per-type scoring threads: one pool shared by all requests, so the thread count stays within budget ---
+SCORING_THREADS = int(os.environ.get('SCORING_THREADS', str(min(4, os.cpu_count() or 1))))
 
 # --- Global variables for loaded data and model components ---
 tfidf_vectorizer = None
+hashing_features = None
 content_dfs = {}  # Dictionary to store different content type dataframes
 ratings_df = None
 content_tfidf_matrices = {}  # Dictionary to store TF-IDF matrices for each content type
 
+# --- Precomputed indexes (built at load time) ---
+genre_matrix = None        # sparse items x genres matrix over all content types, stacked in content_dfs order
+genre_names = None         # genre name for each genre_matrix column
+type_row_offsets = {}      # first genre_matrix row of each content type
+ratings_index = None       # ratings grouped by user, see ratings_index.py
+cold_start_pools = None    # popular / top rated / recent stacked rows per content type, see cold_start.py
+content_row_scales = {}    # 1 / L2 norm of every content row per type (0 for empty rows), for cosine scores
+scoring_pool = ThreadPoolExecutor(SCORING_THREADS, thread_name_prefix='scoring') if SCORING_THREADS > 1 else None
+model_load_seconds = None
+
 # --- Content type mappings ---
 CONTENT_TYPES = {
     'movies': 'Movies',
@@ -52,20 +77,37 @@ CONTENT_TYPES = {
     'podcasts': 'Podcasts',
     'books': 'Books'
 }
+CONTENT_TYPE_CODES = list(CONTENT_TYPES.keys())
 
 app = Flask(__name__)
 CORS(app)
 
+# --- Metrics (/metrics) and admin-only profiling (/debug/profile) ---
+instrument_app(app)
+register_profiler_endpoint(app)
+register_memory_endpoint(app, lambda: model_structures())
+register_gauge(METRIC_PREFIX + 'model_load_seconds', 'Time taken to load the model', lambda: model_load_seconds)
+register_gauge(METRIC_PREFIX + 'model_info', 'Loaded content types and feature mode',
+               lambda: {(('content_types', ','.join(content_dfs)), ('feature_mode', FEATURE_MODE)): 1}
+               if content_dfs else None)
+
 # --- Model Loading Function ---
 def load_multi_content_artifacts():
     """Load all multi-content datasets and models"""
-    global tfidf_vectorizer, content_dfs, ratings_df, content_tfidf_matrices
+    global tfidf_vectorizer, hashing_features, content_dfs, ratings_df, content_tfidf_matrices, model_load_seconds
     
+    if content_dfs and content_tfidf_matrices:
+        # Already loaded
+        return True
+    
+    start = time.perf_counter()
     try:
-        logger.info("Loading multi-content model artifacts...")
+        logger.info(f"Loading multi-content model artifacts ({FEATURE_MODE} features)...")
         
-        # Load TF-IDF vectorizer
-        if os.path.exists(TFIDF_VECTORIZER_PATH):
+        # Load hashing features or the TF-IDF vectorizer
+        if FEATURE_MODE == 'hashing':
+            hashing_features = load_hashing_features(HASHING_FEATURES_PATH)
+        elif os.path.exists(TFIDF_VECTORIZER_PATH):
             tfidf_vectorizer = joblib.load(TFIDF_VECTORIZER_PATH)
         else:
             logger.warning("TF-IDF vectorizer not found, will create new one")
@@ -78,6 +120,8 @@ def load_multi_content_artifacts():
         if os.path.exists(MOVIES_PATH):
             movies_df = pd.read_csv(MOVIES_PATH)
             movies_df['content_type'] = 'movies'
+            if 'id' not in movies_df.columns:
+                movies_df['id'] = movies_df['movieId']
             content_dfs['movies'] = movies_df
             logger.info(f"Loaded movies: {len(movies_df)} items")
         
@@ -116,17 +160,106 @@ def load_multi_content_artifacts():
         content_tfidf_matrices = {}
         for content_type, df in content_dfs.items():
             if 'combined_features' in df.columns:
-                if tfidf_vectorizer is not None:
+                if hashing_features is not None:
+                    content_tfidf_matrices[content_type] = transform_parallel(df['combined_features'], hashing_features)
+                    logger.info(f"Created hashed TF-IDF matrix for {content_type}: {content_tfidf_matrices[content_type].shape}")
+                elif tfidf_vectorizer is not None:
                     content_tfidf_matrices[content_type] = tfidf_vectorizer.transform(df['combined_features'])
                     logger.info(f"Created TF-IDF matrix for {content_type}: {content_tfidf_matrices[content_type].shape}")
         
-        logger.info("Multi-content model artifacts loaded successfully!")
+        build_multi_content_indexes()
+        
+        model_load_seconds = time.perf_counter() - start
+        logger.info(f"Multi-content model artifacts loaded successfully in {model_load_seconds:.2f}s!")
         return True
         
     except Exception as e:
         logger.error(f"Error loading multi-content artifacts: {e}")
         return False
 
+# --- Index Construction ---
+def build_multi_content_indexes():
+    """Build the stacked genre matrix, the per-user ratings index, the cold-start pools and the
+    content row norms"""
+    global genre_matrix, genre_names, type_row_offsets, ratings_index, content_row_scales
+    
+    all_genres = []
+    type_row_offsets = {}
+    for content_type, df in content_dfs.items():
+        type_row_offsets[content_type] = len(all_genres)
+        all_genres.extend(df['genres'] if 'genres' in df.columns else [''] * len(df))
+    genre_matrix, genre_names = build_genre_matrix(all_genres)
+    
+    ratings_index = None
+    if ratings_df is not None:
+        build_multi_content_ratings_index()
+    build_cold_start_index()
+
+    content_row_scales = {}
+    for content_type, matrix in content_tfidf_matrices.items():
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        content_row_scales[content_type] = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+
+def build_multi_content_ratings_index():
+    """Per-user ratings index over the stacked catalog rows"""
+    global ratings_index
+    
+    # Map every rating to its stacked catalog row (-1 when the item is unknown)
+    id_column = 'contentId' if 'contentId' in ratings_df.columns else 'movieId'
+    rating_types = ratings_df['contentType'].values
+    item_rows = np.full(len(ratings_df), -1, dtype=np.int64)
+    for content_type, df in content_dfs.items():
+        in_type = rating_types == content_type
+        rows = pd.Index(df['id']).get_indexer(ratings_df.loc[in_type, id_column])
+        item_rows[in_type] = np.where(rows >= 0, rows + type_row_offsets[content_type], -1)
+    
+    ratings_index = build_ratings_index(
+        ratings_df['userId'].values,
+        item_rows,
+        ratings_df['rating'].values,
+        type_codes=pd.Categorical(rating_types, categories=CONTENT_TYPE_CODES).codes
+    )
+    logger.info(f"Built genre matrix {genre_matrix.shape} and ratings index for {len(ratings_index['user_ids'])} users")
+
+def build_cold_start_index():
+    """Cold-start pools over the stacked catalog from per-item rating counts, averages and release years"""
+    global cold_start_pools
+    n_items = genre_matrix.shape[0]
+    type_codes = np.zeros(n_items, dtype=np.int8)
+    titles = []
+    for content_type, df in content_dfs.items():
+        start = type_row_offsets[content_type]
+        type_codes[start:start + len(df)] = CONTENT_TYPE_CODES.index(content_type)
+        titles.extend(df['title'] if 'title' in df.columns else [''] * len(df))
+
+    rating_counts = np.zeros(n_items, dtype=np.int64)
+    rating_means = np.zeros(n_items)
+    if ratings_index is not None:
+        rated = ratings_index['item_rows'] >= 0
+        rows = ratings_index['item_rows'][rated]
+        rating_counts = np.bincount(rows, minlength=n_items)
+        rating_sums = np.bincount(rows, weights=ratings_index['ratings'][rated], minlength=n_items)
+        rating_means = rating_sums / np.maximum(rating_counts, 1)
+
+    cold_start_pools = build_cold_start_pools(type_codes, CONTENT_TYPE_CODES, rating_counts, rating_means,
+                                              parse_release_years(titles))
+
+def model_structures():
+    """Loaded model structures by name, for /debug/memory"""
+    structures = {f'content_dfs.{content_type}': df for content_type, df in content_dfs.items()}
+    structures.update({f'content_tfidf_matrices.{content_type}': matrix
+                       for content_type, matrix in content_tfidf_matrices.items()})
+    structures.update({
+        'ratings_df': ratings_df,
+        'tfidf_vectorizer': tfidf_vectorizer,
+        'hashing_features': hashing_features,
+        'genre_matrix': genre_matrix,
+        'ratings_index': ratings_index,
+        'cold_start_pools': cold_start_pools,
+        'content_row_scales': content_row_scales,
+    })
+    return structures
+
 # --- User Profile Generation for Multi-Content ---
 def get_user_profile_vector_multi_content(user_id, content_type=None, min_rating_threshold=4.0):
     """Generate user profile vector for specific content type or all content"""
@@ -197,20 +330,22 @@ def get_user_profile_vector_multi_content(user_id, content_type=None, min_rating
 # --- Enhanced Recommendation Generation ---
 def get_recommendations_multi_content(user_id, content_type=None, num_recommendations=5):
     """Get recommendations from multi-content system"""
+    start = time.perf_counter()
     user_profile_vector = get_user_profile_vector_multi_content(user_id, content_type)
+    start = record_stage('profile', start)
     
     if user_profile_vector is None:
-        logger.info(f"No specific profile for user {user_id}, returning random content.")
-        # Return random content from specified type or all types
-        if content_type and content_type in content_dfs:
-            random_sample = content_dfs[content_type].sample(n=min(num_recommendations, len(content_dfs[content_type])))
-        else:
-            # Combine all content types
-            all_content = pd.concat(content_dfs.values(), ignore_index=True)
-            random_sample = all_content.sample(n=min(num_recommendations, len(all_content)))
+        logger.info(f"No specific profile for user {user_id}, returning cold-start content.")
+        # Precomputed pool of the requested type (or all types) in a per-user order
+        pool_type = content_type if content_type in content_dfs else None
+        rows = cold_start_rows(cold_start_pools, user_id, pool_type, num_recommendations)
+        start = record_stage('cold_start', start)
         
         recommendations = []
-        for _, item in random_sample.iterrows():
+        for row in rows.tolist():
+            # Stacked row -> (content type, row within its DataFrame)
+            item_type = max((t for t in type_row_offsets if type_row_offsets[t] <= row), key=type_row_offsets.get)
+            item = content_dfs[item_type].iloc[row - type_row_offsets[item_type]]
             recommendations.append({
                 'id': str(item['id']),
                 'title': item['title'],
@@ -219,64 +354,76 @@ def get_recommendations_multi_content(user_id, content_type=None, num_recommenda
                 'description': item.get('description', ''),
                 'similarity_score': 0.0
             })
+        record_stage('format', start)
+        record_count('returned', len(recommendations))
         return recommendations
     
-    # Get recommendations using similarity
+    # Rated items are excluded by their stacked rows, see build_multi_content_ratings_index
+    rated_rows = ratings_index['item_rows'][user_slice(ratings_index, user_id)]
+    rated_rows = rated_rows[rated_rows >= 0]
+    start = record_stage('filtering', start)
+    record_count('excluded_rated', len(rated_rows))
+
+    # Requested type only, otherwise every type; each is scored and cut to its own top-K in
+    # parallel on the shared pool, so a cross-type request takes about as long as its slowest type
+    user_profile_np = np.asarray(user_profile_vector.toarray() if hasattr(user_profile_vector, 'toarray')
+                                 else user_profile_vector).ravel()
+    scored_types = [t for t in content_dfs if t in content_tfidf_matrices and (not content_type or t == content_type)]
+    tasks = [(t, user_profile_np, type_rated_rows(t, rated_rows), num_recommendations) for t in scored_types]
+    if scoring_pool is not None and len(tasks) > 1:
+        heads = [future.result() for future in [scoring_pool.submit(score_content_type, *task) for task in tasks]]
+    else:
+        heads = [score_content_type(*task) for task in tasks]
+    start = record_stage('scoring', start)
+    record_count('scored', sum(content_tfidf_matrices[t].shape[0] for t in scored_types))
+
+    # Heads are sorted best first, so a heap merge yields the cross-type top-K (ties keep type order)
+    merged = heapq.merge(*[[(t, row, score) for row, score in zip(rows.tolist(), scores.tolist())]
+                           for t, (rows, scores) in zip(scored_types, heads)], key=lambda item: -item[2])
+    top = list(itertools.islice(merged, num_recommendations))
+    start = record_stage('top_k', start)
+
     recommendations = []
-    user_rated_content = set()
-    
-    # Get user's rated content IDs
-    user_ratings = ratings_df[ratings_df['userId'] == user_id]
-    for _, rating in user_ratings.iterrows():
-        user_rated_content.add((rating['contentType'], rating['contentId']))
-    
-    # Calculate similarities for each content type
-    for content_type, df in content_dfs.items():
-        if content_type in content_tfidf_matrices:
-            # Convert user profile to numpy array
-            user_profile_np = user_profile_vector.toarray() if hasattr(user_profile_vector, 'toarray') else np.asarray(user_profile_vector)
-            
-            # Calculate similarities
-            similarities = cosine_similarity(user_profile_np, content_tfidf_matrices[content_type]).flatten()
-            
-            # Get top similar items
-            sorted_indices = similarities.argsort()[::-1]
-            
-            for idx in sorted_indices:
-                content_id = df.iloc[idx]['id']
-                
-                # Skip if user already rated this content
-                if (content_type, content_id) in user_rated_content:
-                    continue
-                
-                item = df.iloc[idx]
-                recommendations.append({
-                    'id': str(item['id']),
-                    'title': item['title'],
-                    'content_type': item['content_type'],
-                    'genre': item.get('genres', '').replace('|', ', '),
-                    'description': item.get('description', ''),
-                    'similarity_score': float(similarities[idx])
-                })
-                
-                if len(recommendations) >= num_recommendations:
-                    break
-            
-            if len(recommendations) >= num_recommendations:
-                break
-    
-    # Sort by similarity score and return top recommendations
-    recommendations.sort(key=lambda x: x['similarity_score'], reverse=True)
-    return recommendations[:num_recommendations]
+    for item_type, row, score in top:
+        item = content_dfs[item_type].iloc[row]
+        recommendations.append({
+            'id': str(item['id']),
+            'title': item['title'],
+            'content_type': item['content_type'],
+            'genre': item.get('genres', '').replace('|', ', '),
+            'description': item.get('description', ''),
+            'similarity_score': float(score)
+        })
+    record_stage('format', start)
+    record_count('returned', len(recommendations))
+    return recommendations
+
+def type_rated_rows(content_type, rated_rows):
+    """Rows within one content type's matrix among stacked catalog rows"""
+    rows = rated_rows - type_row_offsets[content_type]
+    return rows[(rows >= 0) & (rows < len(content_dfs[content_type]))]
+
+def score_content_type(content_type, user_profile, rated_rows, k):
+    """Top-k rows of one content type by cosine similarity to the profile, rated rows excluded.
+
+    The sparse product and the partition release the GIL, so types run in parallel threads.
+    """
+    norm = np.linalg.norm(user_profile)
+    scores = content_tfidf_matrices[content_type] @ user_profile
+    scores *= content_row_scales[content_type] / (norm if norm > 0 else 1.0)
+    scores[rated_rows] = -np.inf
+    top = top_k_positions(scores, k)
+    return top, scores[top]
 
 # --- User Statistics with Multi-Content Breakdown ---
 def get_user_stats_multi_content(user_id):
-    """Get comprehensive user statistics with content type breakdown"""
-    if ratings_df is None:
+    """Get comprehensive user statistics with content type breakdown in O(user ratings)"""
+    if ratings_index is None:
         return None
     
-    user_ratings = ratings_df[ratings_df['userId'] == user_id]
-    if user_ratings.empty:
+    rows = user_slice(ratings_index, user_id)
+    user_ratings = ratings_index['ratings'][rows]
+    if user_ratings.size == 0:
         return {
             'total_ratings': 0,
             'average_rating': 0,
@@ -285,34 +432,20 @@ def get_user_stats_multi_content(user_id):
             'content_type_breakdown': {content_type: 0 for content_type in CONTENT_TYPES.keys()}
         }
     
-    total_ratings = len(user_ratings)
-    average_rating = user_ratings['rating'].mean()
-    high_ratings = len(user_ratings[user_ratings['rating'] >= 4.0])
+    high = user_ratings >= 4.0
     
-    # Content type breakdown
-    content_breakdown = user_ratings['contentType'].value_counts().to_dict()
+    # Content type breakdown over all ratings of known content types
+    type_codes = ratings_index['type_codes'][rows]
+    content_breakdown = type_breakdown(type_codes[type_codes >= 0], CONTENT_TYPE_CODES)
     
-    # Get favorite genres from highly-rated content
-    highly_rated = user_ratings[user_ratings['rating'] >= 4.0]
-    all_genres = []
-    
-    for _, rating in highly_rated.iterrows():
-        content_id = rating['contentId']
-        content_type = rating['contentType']
-        
-        if content_type in content_dfs:
-            content_data = content_dfs[content_type][content_dfs[content_type]['id'] == content_id]
-            if not content_data.empty:
-                genres = content_data.iloc[0].get('genres', '')
-                if genres:
-                    all_genres.extend(genres.split('|'))
-    
-    favorite_genres = pd.Series(all_genres).value_counts().head(5).index.tolist()
+    # Favorite genres from highly-rated content found in the catalogs
+    liked_rows = ratings_index['item_rows'][rows][high]
+    favorite_genres = top_genres(genre_matrix, liked_rows[liked_rows >= 0], genre_names)
     
     return {
-        'total_ratings': int(total_ratings),
-        'average_rating': float(average_rating),
-        'high_ratings': int(high_ratings),
+        'total_ratings': int(user_ratings.size),
+        'average_rating': float(user_ratings.mean(dtype=np.float64)),
+        'high_ratings': int(high.sum()),
         'favorite_genres': favorite_genres,
         'content_type_breakdown': content_breakdown
     }
@@ -325,7 +458,8 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "model_loaded": tfidf_vectorizer is not None and bool(content_dfs),
+        "model_loaded": bool(content_tfidf_matrices) and bool(content_dfs),
+        "feature_mode": FEATURE_MODE,
         "supported_content_types": list(CONTENT_TYPES.keys()),
         "loaded_content_types": list(content_dfs.keys()),
         "total_content_items": sum(len(df) for df in content_dfs.values())
@@ -342,6 +476,8 @@ def recommend():
         user_id = data.get('userId')
         content_type = data.get('contentType', None)
         num_recommendations = data.get('numRecommendations', 5)
+        # Opt-in stage breakdown in the response body and a Server-Timing header
+        g.debug_timings = bool(data.get('debug'))
 
         if user_id is None:
             return jsonify({"error": "userId is required"}), 400
@@ -359,15 +495,22 @@ def recommend():
         if not load_multi_content_artifacts():
             return jsonify({"error": "Model not loaded. Server might be initializing."}), 500
 
-        logger.info(f"Generating multi-content recommendations for user {user_id}, content type: {content_type}")
+        g.log_fields = {"user_id": user_id, "content_type": content_type}
+        logger.debug(f"Generating multi-content recommendations for user {user_id}, content type: {content_type}")
         recommendations = get_recommendations_multi_content(user_id, content_type, num_recommendations)
         
-        return jsonify({
+        start = time.perf_counter()
+        body = {
             "recommendations": recommendations,
             "user_id": user_id,
             "content_type": content_type,
             "count": len(recommendations)
-        })
+        }
+        if g.debug_timings:
+            body["debug"] = {"timings": trace_summary()}
+        response = json_response(body)
+        record_stage('serialization', start)
+        return response
     
     except Exception as e:
         logger.error(f"Error in recommend endpoint: {str(e)}")
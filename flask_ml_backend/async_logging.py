@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Async Logging
+Request threads hand log records to an in-memory queue and a background
+listener thread writes them to the log file and stderr, flushing once per
+batch, so a slow disk never blocks a request. When LOG_QUEUE_SIZE records
+are waiting, new ones are dropped and counted instead.
+
+Per-request logs are structured (one JSON object per line) and sampled at
+REQUEST_LOG_SAMPLE_RATE; errors are always logged.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+REQUEST_LOG_SAMPLE_RATE = float(os.environ.get('REQUEST_LOG_SAMPLE_RATE', '0.01'))
+
+request_logger = logging.getLogger('recommender.requests')
+
+_handler = None
+_listener = None
+
+# --- Request Side ---
+class DroppingQueueHandler(QueueHandler):
+    """Enqueues records without taking the handler lock and drops (counts) them when the bounded queue is full"""
+
+    def __init__(self, records):
+        super().__init__(records)
+        self.dropped = 0
+        self._drop_lock = threading.Lock()
+
+    def handle(self, record):
+        # The queue is thread-safe, so the per-handler lock of Handler.handle is not needed
+        if self.filter(record):
+            self.emit(record)
+            return True
+        return False
+
+    def prepare(self, record):
+        # Records logged without args (the f-string style used here) are already final,
+        # so skip the base class format-and-copy
+        if record.args or record.exc_info or record.stack_info:
+            return super().prepare(record)
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+
+# --- Writer Side ---
+class _DeferredFlush:
+    """Handler mixin: write on emit, flush only when the listener has drained the queue"""
+
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+class DeferredFileHandler(_DeferredFlush, logging.FileHandler):
+    pass
+
+class DeferredStreamHandler(_DeferredFlush, logging.StreamHandler):
+    pass
+
+class BatchingQueueListener(QueueListener):
+    """Flushes its handlers whenever the queue runs empty instead of after every record"""
+
+    def dequeue(self, block):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            for handler in self.handlers:
+                handler.flush()
+            return self.queue.get(block)
+
+    def enqueue_sentinel(self):
+        # Wait for room rather than lose the stop signal to a full queue
+        self.queue.put(self._sentinel)
+
+def configure_logging(log_file, level=logging.INFO):
+    """Route the root logger through the queue; like basicConfig, later calls are no-ops"""
+    global _handler, _listener
+    if _listener is not None:
+        return _handler
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [DeferredFileHandler(log_file), DeferredStreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # LOG_FORMAT does not use the process name
+    logging.logMultiprocessing = False
+
+    records = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _handler = DroppingQueueHandler(records)
+    _listener = BatchingQueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_handler)
+    return _handler
+
+def shutdown_logging():
+    """Write out queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.flush()
+        _listener = None
+
+def dropped_records():
+    """Records dropped because the queue was full"""
+    return _handler.dropped if _handler is not None else 0
+
+def queued_records():
+    return _handler.queue.qsize() if _handler is not None else 0
+
+# --- Structured Request Logs ---
+def sample_request():
+    """True for the fraction of requests that get a request log line"""
+    return REQUEST_LOG_SAMPLE_RATE > 0 and random.random() < REQUEST_LOG_SAMPLE_RATE
+
+def log_request(fields, sample_rate=REQUEST_LOG_SAMPLE_RATE, level=logging.INFO):
+    """One JSON line per request; sample_rate lets aggregators scale counts back up"""
+    fields['sample_rate'] = sample_rate
+    request_logger.log(level, json.dumps(fields, default=str))
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+In-process micro-benchmarks for the recommendation core (profile vectors,
+recommendations with and without MMR diversity, user stats, 1k-item
+/recommend responses, search and popular content) in app.py and
+app_multi_content.py, run against generated datasets of several sizes.
+Latency percentiles and throughput are printed and saved as JSON so runs
+can be compared across commits.
+
+Datasets are generated with multi_content_data_generator.py into
+benchmark_data/<scale> on first use and reused afterwards. Both apps run in
+hashing feature mode, since the pickled vectorizer only knows the movie
+vocabulary.
+
+Usage:
+    python benchmark_suite.py [--scales 10k,100k,1m] [--iterations 200] [--max-seconds 10]
+                              [--json results.json] [--compare previous.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+
+# Items in the catalog and users with ratings, per scale
+SCALES = {
+    '10k': {'items': 10_000, 'users': 5_000},
+    '100k': {'items': 100_000, 'users': 20_000},
+    '1m': {'items': 1_000_000, 'users': 50_000},
+}
+RATINGS_PER_USER = 40
+DATA_DIR = 'benchmark_data'
+SEED = 42
+
+# Timed calls per case are capped by both limits
+DEFAULT_ITERATIONS = 200
+DEFAULT_MAX_SECONDS = 10.0
+WARMUP_ITERATIONS = 3
+SAMPLED_USERS = 500
+
+# Page size of the endpoint case; MAX_PAGE_SIZE is raised to it unless set in the environment
+ENDPOINT_K = 1000
+
+# --- Datasets ---
+def prepare_dataset(scale, regenerate=False):
+    """Generate the catalogs, ratings and hashing features for a scale unless already on disk"""
+    import pandas as pd
+    import multi_content_data_generator as generator
+    from hashing_features import fit_idf, load_hashing_features, save_hashing_features, transform_parallel
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+    config = SCALES[scale]
+    path = os.path.join(DATA_DIR, scale)
+    if os.path.exists(os.path.join(path, 'hashed_content_matrix.npz')) and not regenerate:
+        return path
+
+    print(f"\nGenerating {scale} dataset in {path}...")
+    density = RATINGS_PER_USER / config['items']
+    datasets = generator.create_multi_content_datasets(
+        config['users'], config['items'] // len(generator.CONTENT_TYPES), density=density, seed=SEED, output_dir=path
+    )
+
+    # Single-content app: the combined catalog as processed_movies.csv plus rating.csv
+    combined = datasets['combined']
+    movies_df = pd.DataFrame({
+        'movieId': combined['id'], 'title': combined['title'],
+        'genres': combined['genres'], 'combined_features': combined['combined_features']
+    })
+    movies_df.to_csv(os.path.join(path, 'processed_movies.csv'), index=False)
+    generator.create_movie_ratings(os.path.join(path, 'processed_movies.csv'), config['users'],
+                                   density=density, seed=SEED, output_dir=path)
+
+    texts = movies_df['combined_features'].tolist()
+    save_hashing_features(os.path.join(path, 'hashing_features.npz'), fit_idf(texts, stop_words=ENGLISH_STOP_WORDS),
+                          ENGLISH_STOP_WORDS)
+    features = load_hashing_features(os.path.join(path, 'hashing_features.npz'))
+    sparse.save_npz(os.path.join(path, 'hashed_content_matrix.npz'), transform_parallel(texts, features))
+    return path
+
+def load_apps(path):
+    """Point both apps at a dataset directory and load them"""
+    # Read by pagination at import time
+    os.environ.setdefault('MAX_PAGE_SIZE', str(ENDPOINT_K))
+    import app
+    import app_multi_content
+
+    app.FEATURE_MODE = 'hashing'
+    app.PROCESSED_MOVIES_PATH = os.path.join(path, 'processed_movies.csv')
+    app.RATINGS_DATA_PATH = os.path.join(path, 'rating.csv')
+    app.HASHING_FEATURES_PATH = os.path.join(path, 'hashing_features.npz')
+    app.HASHED_CONTENT_MATRIX_PATH = os.path.join(path, 'hashed_content_matrix.npz')
+    if not app.load_csv_artifacts():
+        raise RuntimeError(f"app.py failed to load {path}")
+
+    app_multi_content.FEATURE_MODE = 'hashing'
+    app_multi_content.MOVIES_PATH = os.path.join(path, 'no_movies.csv')
+    app_multi_content.TV_SHOWS_PATH = os.path.join(path, 'tv_shows.csv')
+    app_multi_content.PODCASTS_PATH = os.path.join(path, 'podcasts.csv')
+    app_multi_content.BOOKS_PATH = os.path.join(path, 'books.csv')
+    app_multi_content.MULTI_CONTENT_RATINGS_PATH = os.path.join(path, 'multi_content_ratings.csv')
+    app_multi_content.HASHING_FEATURES_PATH = os.path.join(path, 'hashing_features.npz')
+    app_multi_content.content_dfs = {}
+    if not app_multi_content.load_multi_content_artifacts():
+        raise RuntimeError(f"app_multi_content.py failed to load {path}")
+    return app, app_multi_content
+
+# --- Timing ---
+def post_ok(client, path, body):
+    """POST body and raise on anything but a 200, so an error response is never timed as a result"""
+    response = client.post(path, json=body)
+    if response.status_code != 200:
+        raise RuntimeError(f"{path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return response
+
+def time_case(func, args_list, iterations, max_seconds):
+    """Call func over args_list (cycling) and return latency percentiles and throughput"""
+    for args in args_list[:WARMUP_ITERATIONS]:
+        func(*args)
+
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        args = args_list[i % len(args_list)]
+        call_start = time.perf_counter_ns()
+        func(*args)
+        latencies.append(time.perf_counter_ns() - call_start)
+        if time.perf_counter() - started > max_seconds:
+            break
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) / 1e6
+    return {
+        'calls': len(latencies),
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'mean_ms': float(latencies_ms.mean()),
+        'ops_per_sec': len(latencies) / elapsed,
+    }
+
+def benchmark_cases(app, app_multi_content, rng):
+    """(name, function, argument tuples) for every benchmarked operation"""
+    from pagination import MAX_PAGE_SIZE
+    endpoint_k = min(ENDPOINT_K, MAX_PAGE_SIZE)
+    users = [(int(u),) for u in rng.choice(app.ratings_index['user_ids'], size=SAMPLED_USERS)]
+    multi_users = [(int(u),) for u in rng.choice(app_multi_content.ratings_index['user_ids'], size=SAMPLED_USERS)]
+    words = sorted({title.split()[0].lower() for title in app.item_titles[:1000]})
+    client = app.app.test_client()
+
+    return [
+        ('get_user_profile_vector', app.get_user_profile_vector, users),
+        ('get_recommendations_ml', lambda u: app.get_recommendations_ml(u, num_recommendations=10), users),
+        ('get_recommendations_ml[tv_shows]',
+         lambda u: app.get_recommendations_ml(u, content_type='tv_shows', num_recommendations=10), users),
+        ('get_recommendations_ml[mmr]',
+         lambda u: app.get_recommendations_ml(u, num_recommendations=10, diversity=(0.7, 300)), users),
+        ('get_user_stats', app.get_user_stats, users),
+        # The page cache would answer repeated users without scoring
+        (f'recommend endpoint[k={endpoint_k}]',
+         lambda u: (app.page_cache.clear(),
+                    post_ok(client, '/recommend', {'userId': u, 'numRecommendations': endpoint_k})),
+         users),
+        ('search endpoint', lambda q: client.get(f'/content/search?q={q}&limit=10'), [(w,) for w in words]),
+        ('popular endpoint', lambda t: client.get(f'/content/popular?type={t}&limit=10'),
+         [(t,) for t in app.CONTENT_TYPE_CODES]),
+        ('get_recommendations_multi_content',
+         lambda u: app_multi_content.get_recommendations_multi_content(u, None, 10), multi_users),
+        ('get_user_stats_multi_content', app_multi_content.get_user_stats_multi_content, multi_users),
+    ]
+
+def run_scale(scale, iterations, max_seconds, regenerate):
+    path = prepare_dataset(scale, regenerate)
+    start = time.perf_counter()
+    app, app_multi_content = load_apps(path)
+    load_seconds = time.perf_counter() - start
+
+    print(f"\n=== {scale}: {app.content_tfidf_matrix.shape[0]} items, loaded in {load_seconds:.1f}s ===")
+    print(f"  {'case':36}{'p50 ms':>10}{'p99 ms':>10}{'ops/sec':>12}{'calls':>8}")
+    rng = np.random.default_rng(SEED)
+    results = {}
+    for name, func, args_list in benchmark_cases(app, app_multi_content, rng):
+        results[name] = time_case(func, args_list, iterations, max_seconds)
+        r = results[name]
+        print(f"  {name:36}{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}{r['ops_per_sec']:>12.1f}{r['calls']:>8}")
+
+    return {
+        'items': int(app.content_tfidf_matrix.shape[0]),
+        'users': int(len(app.ratings_index['user_ids'])),
+        'ratings': int(len(app.ratings_index['ratings'])),
+        'load_seconds': load_seconds,
+        'results': results,
+    }
+
+# --- Reporting ---
+def environment_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+def print_comparison(report, previous):
+    print(f"\n=== Comparison with {previous['environment'].get('commit')} (p50 ratio, lower is faster) ===")
+    for scale, scale_report in report['scales'].items():
+        before = previous['scales'].get(scale)
+        if not before:
+            continue
+        print(f"{scale}:")
+        for name, r in scale_report['results'].items():
+            old = before['results'].get(name)
+            if old:
+                print(f"  {name:36}{old['p50_ms']:>10.3f} -> {r['p50_ms']:>10.3f} ms  x{r['p50_ms'] / old['p50_ms']:.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', default='10k,100k,1m', help=f"comma separated, from {', '.join(SCALES)}")
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS, help='timed calls per case')
+    parser.add_argument('--max-seconds', type=float, default=DEFAULT_MAX_SECONDS, help='time budget per case')
+    parser.add_argument('--json', help='write results to this JSON file')
+    parser.add_argument('--compare', help='previous JSON results to compare against')
+    parser.add_argument('--regenerate', action='store_true', help='regenerate datasets even when present')
+    parser.add_argument('--with-logging', action='store_true', help='keep INFO logging enabled while timing')
+    args = parser.parse_args()
+
+    scales = [s.strip() for s in args.scales.split(',') if s.strip()]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        parser.error(f"unknown scales: {', '.join(unknown)}")
+    if not args.with_logging:
+        logging.disable(logging.INFO)
+
+    report = {'environment': environment_info(), 'scales': {}}
+    for scale in scales:
+        report['scales'][scale] = run_scale(scale, args.iterations, args.max_seconds, args.regenerate)
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(report, json.load(f))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    return True
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Hashed Matrix Builder
+Regenerates the catalog matrices for FEATURE_MODE=hashing and benchmarks the
+hashing features against the pickled TF-IDF vectorizer (load time, memory
+and recommendation overlap).
+
+Usage:
+    python build_hashed_matrices.py [--n-features N] [--workers N] [--benchmark]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from hashing_features import (
+    HASHING_N_FEATURES, fit_idf, load_hashing_features, save_hashing_features, transform, transform_parallel
+)
+
+TFIDF_VECTORIZER_PATH = 'tfidf_vectorizer.pkl'
+PROCESSED_MOVIES_PATH = 'processed_movies.csv'
+RATINGS_DATA_PATH = 'rating.csv'
+HASHING_FEATURES_PATH = 'hashing_features.npz'
+HASHED_CONTENT_MATRIX_PATH = 'hashed_content_matrix.npz'
+
+def build(n_features, workers):
+    """Fit IDF weights on the catalog and write the features and catalog matrix"""
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+    movies_df = pd.read_csv(PROCESSED_MOVIES_PATH)
+    texts = movies_df['combined_features'].tolist()
+
+    start = time.perf_counter()
+    idf = fit_idf(texts, n_features, ENGLISH_STOP_WORDS)
+    save_hashing_features(HASHING_FEATURES_PATH, idf, ENGLISH_STOP_WORDS)
+    print(f"Fitted IDF over {len(texts)} items in {time.perf_counter() - start:.2f}s -> {HASHING_FEATURES_PATH}")
+
+    features = load_hashing_features(HASHING_FEATURES_PATH)
+    start = time.perf_counter()
+    matrix = transform_parallel(texts, features, workers=workers)
+    sparse.save_npz(HASHED_CONTENT_MATRIX_PATH, matrix)
+    print(f"Transformed catalog {matrix.shape} ({matrix.nnz} non-zeros) in "
+          f"{time.perf_counter() - start:.2f}s -> {HASHED_CONTENT_MATRIX_PATH}")
+
+def _measure(load):
+    """Wall time and traced Python allocations of a loading function"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, allocated
+
+def _top_k(matrix, liked_rows, weights, k):
+    profile = matrix[liked_rows].T @ weights
+    scores = matrix @ profile
+    scores[liked_rows] = -np.inf
+    top = np.argpartition(-scores, k)[:k]
+    return set(top.tolist())
+
+def _sample_profiles(n_items, n_users, rng):
+    """(liked rows, weights) per sampled user, from rating.csv when present"""
+    if os.path.exists(RATINGS_DATA_PATH):
+        movies_df = pd.read_csv(PROCESSED_MOVIES_PATH, usecols=['movieId'])
+        ratings_df = pd.read_csv(RATINGS_DATA_PATH)
+        ratings_df = ratings_df[ratings_df['rating'] >= 4.0]
+        ratings_df = ratings_df.assign(row=pd.Index(movies_df['movieId']).get_indexer(ratings_df['movieId']))
+        ratings_df = ratings_df[ratings_df['row'] >= 0]
+        users = ratings_df['userId'].unique()
+        chosen = rng.choice(users, size=min(n_users, len(users)), replace=False)
+        grouped = ratings_df[ratings_df['userId'].isin(chosen)].groupby('userId')
+        return [(g['row'].to_numpy(), g['rating'].to_numpy(dtype=np.float64)) for _, g in grouped]
+
+    # No ratings available: users who liked a handful of random items
+    return [(rng.choice(n_items, size=5, replace=False), np.ones(5)) for _ in range(n_users)]
+
+def benchmark(n_users, k, workers):
+    """Compare the pickled vectorizer with the hashing features"""
+    import joblib
+    warnings.filterwarnings("ignore", category=UserWarning, module="sklearn")
+
+    movies_df = pd.read_csv(PROCESSED_MOVIES_PATH)
+    texts = movies_df['combined_features'].tolist()
+
+    vectorizer, vectorizer_load, vectorizer_bytes = _measure(lambda: joblib.load(TFIDF_VECTORIZER_PATH))
+    start = time.perf_counter()
+    tfidf_matrix = vectorizer.transform(texts)
+    vectorizer_transform = time.perf_counter() - start
+
+    features, features_load, features_bytes = _measure(lambda: load_hashing_features(HASHING_FEATURES_PATH))
+    hashed_matrix, matrix_load, _ = _measure(lambda: sparse.load_npz(HASHED_CONTENT_MATRIX_PATH).tocsr())
+    start = time.perf_counter()
+    transform(texts, features)
+    hashing_transform = time.perf_counter() - start
+    start = time.perf_counter()
+    transform_parallel(texts, features, workers=workers, chunk_size=max(1, len(texts) // (workers or os.cpu_count() or 1)))
+    hashing_parallel = time.perf_counter() - start
+
+    rng = np.random.default_rng(42)
+    overlaps = [
+        len(_top_k(tfidf_matrix, rows, weights, k) & _top_k(hashed_matrix, rows, weights, k)) / k
+        for rows, weights in _sample_profiles(len(texts), n_users, rng)
+    ]
+
+    print("\n=== Hashing vs TF-IDF vectorizer ===")
+    if not hasattr(vectorizer, 'idf_'):
+        print("WARNING: the pickled vectorizer was saved with a different scikit-learn version and")
+        print("         transforms without its IDF weights; the overlap below is against that output.")
+    print(f"{'':32}{'tfidf':>14}{'hashing':>14}")
+    print(f"{'load model (s)':32}{vectorizer_load:>14.3f}{features_load:>14.3f}")
+    print(f"{'model memory (MB)':32}{vectorizer_bytes / 2**20:>14.2f}{features_bytes / 2**20:>14.2f}")
+    print(f"{'vocabulary entries':32}{len(vectorizer.vocabulary_):>14}{'-':>14}")
+    print(f"{'transform catalog (s)':32}{vectorizer_transform:>14.3f}{hashing_transform:>14.3f}")
+    print(f"{'transform catalog, parallel (s)':32}{'-':>14}{hashing_parallel:>14.3f}")
+    print(f"{'load prebuilt matrix (s)':32}{'-':>14}{matrix_load:>14.3f}")
+    print(f"{'matrix memory (MB)':32}{_csr_bytes(tfidf_matrix) / 2**20:>14.2f}{_csr_bytes(hashed_matrix) / 2**20:>14.2f}")
+    print(f"\nTop-{k} recommendation overlap over {len(overlaps)} users: "
+          f"mean {np.mean(overlaps):.3f}, min {np.min(overlaps):.3f}")
+
+def _csr_bytes(matrix):
+    return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n-features', type=int, default=HASHING_N_FEATURES, help='number of hashed columns')
+    parser.add_argument('--workers', type=int, default=None, help='transform processes (default: CPU count)')
+    parser.add_argument('--benchmark', action='store_true', help='compare against the pickled vectorizer after building')
+    parser.add_argument('--users', type=int, default=200, help='users sampled for the overlap benchmark')
+    parser.add_argument('--k', type=int, default=10, help='recommendations compared per user')
+    args = parser.parse_args()
+
+    if not os.path.exists(PROCESSED_MOVIES_PATH):
+        print(f"{PROCESSED_MOVIES_PATH} not found. Run this script from the flask_ml_backend directory.")
+        return False
+
+    build(args.n_features, args.workers)
+    if args.benchmark:
+        benchmark(args.users, args.k, args.workers)
+    return True
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
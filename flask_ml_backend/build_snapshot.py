@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Snapshot Builder
+Offline tool that loads the CSV files and vectorizer the usual way (pandas,
+joblib, scikit-learn) and writes everything the server needs into a snapshot
+directory. Serve it with MODEL_SNAPSHOT=<dir> python app.py.
+
+Usage:
+    python build_snapshot.py [--output model_snapshot] [--feature-mode tfidf|hashing]
+"""
+
+import argparse
+import os
+import sys
+
+def build_snapshot(output, version=None):
+    """Write the currently configured CSV model into a snapshot directory"""
+    import app
+    from snapshot import SnapshotWriter
+
+    if not app.load_csv_artifacts():
+        return False
+
+    metadata = {
+        'feature_mode': app.FEATURE_MODE,
+        'n_items': int(app.content_tfidf_matrix.shape[0]),
+        'n_features': int(app.content_tfidf_matrix.shape[1]),
+        'n_ratings': int(len(app.ratings_index['ratings'])),
+        'n_users': int(len(app.ratings_index['user_ids'])),
+    }
+    with SnapshotWriter(output, version=version, metadata=metadata) as writer:
+        writer.add_matrix('content', app.content_tfidf_matrix)
+        writer.add_matrix('genre', app.genre_matrix)
+        writer.add_strings('genre_names', app.genre_names)
+        writer.add_array('item_movie_ids', app.item_movie_ids)
+        writer.add_strings('item_titles', app.item_titles)
+        writer.add_strings('item_genres', app.item_genres)
+        writer.add_array('item_years', app.item_years)
+        writer.add_array('item_type_codes', app.item_type_codes)
+        if app.feature_names is not None:
+            writer.add_strings('feature_names', app.feature_names)
+        for name, array in app.ratings_index.items():
+            writer.add_array(f'ratings_{name}', array)
+
+    print(f"Wrote snapshot {writer.version} to {output}: {metadata}")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='model_snapshot', help='snapshot directory to write')
+    parser.add_argument('--feature-mode', choices=['tfidf', 'hashing'], default=None,
+                        help='feature extraction mode (default: FEATURE_MODE or tfidf)')
+    parser.add_argument('--version', default=None, help='model version label (default: build timestamp)')
+    args = parser.parse_args()
+
+    if args.feature_mode:
+        # Read by app at import time
+        os.environ['FEATURE_MODE'] = args.feature_mode
+    os.environ.pop('MODEL_SNAPSHOT', None)
+
+    return build_snapshot(args.output, args.version)
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
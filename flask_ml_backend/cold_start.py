@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Cold Start Pools
+Precomputed candidate pools for users without a profile. Each content type
+(and the whole catalog, under ALL_TYPES) gets one pool built at load time by
+interleaving its most rated, best rated and most recent items. A request
+shuffles the pool with a generator seeded by the user id, so the same user
+sees the same order on every page, and never touches anything
+catalog-sized.
+
+When filters leave a pool too few rows, the page is filled from the rest
+of the type's rows, kept in one fixed shuffled order. Each user reads it
+from their own starting point, in chunks, until the page is full, so the
+work follows the rows read, not the catalog size. A selection's popcount
+says how many remainder rows can match: none means nothing is read, and
+a sparse selection is placed in the same order from each row's stored
+position instead of being searched for.
+"""
+
+import numpy as np
+
+POOL_SIZE = 500            # rows per pool
+TOP_RATED_MIN_RATINGS = 10 # items with fewer ratings are not ranked by their average
+ALL_TYPES = 'all'
+SHUFFLE_SEED = 1009        # mixed with the user id so pools do not follow other seeded streams
+REMAINDER_CHUNK = 4096     # remainder rows checked against the filters at a time
+SPARSE_REMAINDER_FRACTION = 1 / 16  # selections matching fewer remainder rows are placed, not scanned
+
+def _interleave(lists, size):
+    """Round-robin merge of ranked row lists without duplicates, truncated to size"""
+    depth = max((len(rows) for rows in lists), default=0)
+    merged = np.full((depth, len(lists)), -1, dtype=np.int64)
+    for i, rows in enumerate(lists):
+        merged[:len(rows), i] = rows
+    merged = merged.ravel()
+    merged = merged[merged >= 0]
+    _, first = np.unique(merged, return_index=True)
+    return merged[np.sort(first)][:size]
+
+def _ranked_pool(rows, rating_counts, rating_means, years, size, min_ratings):
+    """Interleaved popular / top rated / recent rows among the given rows"""
+    counts = rating_counts[rows]
+    popular = rows[np.lexsort((rows, -counts))]
+    popular = popular[rating_counts[popular] > 0][:size]
+
+    rated = rows[counts >= min_ratings]
+    top_rated = rated[np.lexsort((rated, -rating_counts[rated], -rating_means[rated]))][:size]
+
+    dated = rows[years[rows] > 0]
+    recent = dated[np.lexsort((dated, -rating_counts[dated], -years[dated]))][:size]
+
+    # Unrated catalogs without release years still get a pool, in catalog order
+    pool = _interleave([popular, top_rated, recent], size)
+    return pool if len(pool) else rows[:size]
+
+def build_cold_start_pools(type_codes, content_types, rating_counts, rating_means, years,
+                           size=POOL_SIZE, min_ratings=TOP_RATED_MIN_RATINGS):
+    """Pool of catalog rows per content type name and for ALL_TYPES"""
+    years = np.asarray(years, dtype=np.int64)
+    pools = {ALL_TYPES: _ranked_pool(np.arange(len(type_codes)), rating_counts, rating_means, years,
+                                     size, min_ratings)}
+    for code, content_type in enumerate(content_types):
+        rows = np.flatnonzero(type_codes == code)
+        pools[content_type] = _ranked_pool(rows, rating_counts, rating_means, years, size, min_ratings)
+    return pools
+
+def build_cold_start_remainders(pools, type_codes, content_types, seed=SHUFFLE_SEED):
+    """Rows of each content type (and of ALL_TYPES) outside its pool in a fixed shuffled order,
+    and every catalog row's position in that list (-1 outside it)"""
+    rng = np.random.default_rng(seed)
+    n_items = len(type_codes)
+    # Types do not overlap, so they share one positions array
+    type_positions = np.full(n_items, -1, dtype=np.int64)
+    remainders = {'rows': {}, 'positions': {}}
+    for content_type, pool in pools.items():
+        if content_type == ALL_TYPES:
+            rows = np.arange(n_items)
+            positions = np.full(n_items, -1, dtype=np.int64)
+        else:
+            rows = np.flatnonzero(type_codes == content_types.index(content_type))
+            positions = type_positions
+        rest = np.setdiff1d(rows, pool)
+        rest = rest[rng.permutation(len(rest))]
+        positions[rest] = np.arange(len(rest))
+        remainders['rows'][content_type] = rest
+        remainders['positions'][content_type] = positions
+    return remainders
+
+def user_rng(user_id):
+    """Generator seeded by the user id, the same on every request"""
+    return np.random.default_rng((SHUFFLE_SEED, int(user_id) & 0xFFFFFFFFFFFFFFFF))
+
+def cold_start_rows(pools, user_id=None, content_type=None, count=5, offset=0, selected=None):
+    """count rows of the pool for content_type (ALL_TYPES when None) starting at offset.
+
+    The order is a shuffle seeded by user_id, stable across requests and
+    pages; without a user id the pool order is kept. selected(rows) may
+    return a boolean keep-mask for extra filters.
+    """
+    pool = pools.get(content_type or ALL_TYPES)
+    if pool is None:
+        return np.empty(0, dtype=np.int64)
+    if user_id is not None:
+        pool = pool[user_rng(user_id).permutation(len(pool))]
+    if selected is not None:
+        pool = pool[selected(pool)]
+    return pool[offset:offset + count]
+
+def remainder_rows(remainders, user_id=None, content_type=None, count=5, offset=0, selected=None,
+                   available=None, selected_rows=None):
+    """count rows of the remainder for content_type that pass selected(rows), skipping the first
+    offset of them, read from a start seeded by user_id (the list start without a user id).
+
+    available is the number of remainder rows that pass selected, when known (a popcount).
+    Nothing is read when the offset skips them all, reading stops once all have been seen,
+    and a sparse selection is ordered from selected_rows() (every selected catalog row) and
+    the stored positions instead of being scanned for.
+    """
+    key = content_type or ALL_TYPES
+    rest = remainders['rows'].get(key)
+    if rest is None or not len(rest) or count <= 0 or (available is not None and available <= offset):
+        return np.empty(0, dtype=np.int64)
+    start = int(user_rng(user_id).integers(len(rest))) if user_id is not None else 0
+
+    if available is not None and selected_rows is not None and available < SPARSE_REMAINDER_FRACTION * len(rest):
+        positions = remainders['positions'][key][selected_rows()]
+        # Distance from the user's start, in reading order
+        order = np.sort((positions[positions >= 0] - start) % len(rest))
+        return rest[(order[offset:offset + count] + start) % len(rest)]
+
+    found, skip, read, seen = [], offset, 0, 0
+    while count > 0 and read < len(rest) and (available is None or seen < available):
+        chunk = rest[(start + np.arange(read, min(read + REMAINDER_CHUNK, len(rest)))) % len(rest)]
+        read += len(chunk)
+        if selected is not None:
+            chunk = chunk[selected(chunk)]
+        seen += len(chunk)
+        taken = chunk[skip:skip + count]
+        skip = max(skip - len(chunk), 0)
+        found.append(taken)
+        count -= len(taken)
+    return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
@@ -58,7 +58,7 @@ def test_user_stats():
 def test_movie_search():
     print("\nTesting movie search...")
     try:
-        response = requests.get(f"{BASE_URL}/movies/search?q=batman&limit=3")
+        response = requests.get(f"{BASE_URL}/content/search?q=batman&type=movies&limit=3")
         print(f"Status: {response.status_code}")
         if response.status_code == 200:
             data = response.json()
@@ -74,7 +74,7 @@ def test_movie_search():
 def test_popular_movies():
     print("\nTesting popular movies...")
     try:
-        response = requests.get(f"{BASE_URL}/movies/popular?limit=3")
+        response = requests.get(f"{BASE_URL}/content/popular?type=movies&limit=3")
         print(f"Status: {response.status_code}")
         if response.status_code == 200:
             data = response.json()
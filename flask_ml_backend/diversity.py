@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Diversity Re-ranking
+Maximal Marginal Relevance over the head of a ranking: each pick maximizes
+lambda * relevance - (1 - lambda) * (highest similarity to the items
+already picked), which pushes down near-duplicates such as titles of one
+franchise or items sharing a genre tuple.
+
+Greedy MMR only reads the similarity rows of the items it picks, so
+instead of a full pool x pool block the candidates' L2-normalized content
+rows are copied once into a small matrix over just the terms they use, and
+each pick computes its row of the similarity block with one sparse
+mat-vec. The cost is O(k * pool nonzeros) rather than O(pool^2), and the
+selection keeps one max-similarity vector updated per pick. Rows past the
+pool keep their relevance order. Greedy picks do not depend on how many
+are taken, so every page of a paginated ranking agrees.
+
+Usage (added latency and effect as lambda and the pool size vary):
+    python diversity.py [--candidates 100,300,1000] [--lambdas 0.3,0.5,0.7,0.9] [--k 10] [--users 200]
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+
+DEFAULT_LAMBDA = 0.7
+DEFAULT_CANDIDATES = 300
+MAX_CANDIDATES = 2000
+
+# --- Request Option ---
+def parse_diversity(value):
+    """(lambda, candidates) for a request's diversity option, or None when it is off.
+
+    true selects the defaults; an object may set "lambda" (0 to 1, 1 keeps the
+    relevance order) and "candidates" (rows re-ranked). Raises ValueError.
+    """
+    if value is None or value is False:
+        return None
+    if value is True:
+        return DEFAULT_LAMBDA, DEFAULT_CANDIDATES
+    if not isinstance(value, dict):
+        raise ValueError("diversity must be true or an object with 'lambda' and 'candidates'")
+
+    unknown = set(value) - {'lambda', 'candidates'}
+    if unknown:
+        raise ValueError(f"unknown diversity options {sorted(unknown)}")
+    lam = value.get('lambda', DEFAULT_LAMBDA)
+    candidates = value.get('candidates', DEFAULT_CANDIDATES)
+    if isinstance(lam, bool) or not isinstance(lam, (int, float)) or not 0 <= lam <= 1:
+        raise ValueError("lambda must be a number between 0 and 1")
+    if isinstance(candidates, bool) or not isinstance(candidates, int) or not 1 <= candidates <= MAX_CANDIDATES:
+        raise ValueError(f"candidates must be an integer between 1 and {MAX_CANDIDATES}")
+    return float(lam), candidates
+
+# --- MMR ---
+def candidate_block(content_matrix, rows):
+    """Content rows of the candidates (L2-normalized) with columns compacted to the terms they use"""
+    block = content_matrix[rows]
+    terms, columns = np.unique(block.indices, return_inverse=True)
+    return sparse.csr_matrix((block.data, columns.ravel(), block.indptr), shape=(len(rows), len(terms)))
+
+def similarity_rows(block):
+    """Function returning the cosine similarity of one candidate to every candidate"""
+    dense = np.zeros(block.shape[1], dtype=block.dtype)
+
+    def similarity(position):
+        start, end = block.indptr[position], block.indptr[position + 1]
+        dense[block.indices[start:end]] = block.data[start:end]
+        row = block @ dense
+        dense[block.indices[start:end]] = 0
+        return row
+
+    return similarity
+
+def mmr_order(relevance, similarity, k, lam):
+    """Positions of the first k MMR picks from the pool (ties go to the better-ranked candidate).
+
+    similarity(position) returns one row of the pool's similarity matrix.
+    """
+    n = len(relevance)
+    k = min(k, n)
+    relevance = lam * np.asarray(relevance, dtype=np.float64)
+    penalty_weight = 1.0 - lam
+    max_similarity = np.zeros(n)
+    gain = np.empty(n)
+    picked = np.zeros(n, dtype=bool)
+    order = np.empty(k, dtype=np.int64)
+    for i in range(k):
+        np.multiply(max_similarity, -penalty_weight, out=gain)
+        gain += relevance
+        gain[picked] = -np.inf
+        pick = int(np.argmax(gain))
+        order[i] = pick
+        picked[pick] = True
+        np.maximum(max_similarity, similarity(pick), out=max_similarity)
+    return order
+
+def mmr_rerank(content_matrix, rows, scores, k, lam, candidates=DEFAULT_CANDIDATES):
+    """First k rows and scores of a ranking (best first) after re-ranking its first
+    `candidates` rows by MMR; scores stay the original relevance"""
+    head = min(candidates, len(rows))
+    if lam >= 1 or head < 2:
+        return rows[:k], scores[:k]
+    order = mmr_order(scores[:head], similarity_rows(candidate_block(content_matrix, rows[:head])), k, lam)
+    if k > head:
+        order = np.concatenate([order, np.arange(head, min(k, len(rows)))])
+    return rows[order], scores[order]
+
+def intra_list_similarity(content_matrix, rows):
+    """Mean pairwise cosine similarity within a recommendation list (lower is more diverse)"""
+    if len(rows) < 2:
+        return 0.0
+    block = content_matrix[rows]
+    similarity = (block @ block.T).toarray()
+    return float(similarity[np.triu_indices(len(rows), 1)].mean())
+
+# --- Benchmark ---
+def run_benchmark(candidate_sizes, lambdas, k, n_users, seed=42):
+    """Added latency, list similarity and relevance kept, per pool size and lambda"""
+    import app
+    if not app.load_model_artifacts():
+        print("Cannot benchmark: model artifacts failed to load.")
+        return False
+
+    rng = np.random.default_rng(seed)
+    users = rng.choice(app.ratings_index['user_ids'], size=min(n_users, len(app.ratings_index['user_ids'])),
+                       replace=False)
+    rankings = {}
+    for user in users.tolist():
+        rows, scores = app.rank_recommendations(user, num_recommendations=max(candidate_sizes))
+        if len(rows) > k and scores[0] > 0:
+            rankings[user] = (rows, scores)
+    if not rankings:
+        print("No users with profiles to re-rank.")
+        return False
+
+    baseline_ils = np.mean([intra_list_similarity(app.content_tfidf_matrix, r[:k]) for r, _ in rankings.values()])
+    print(f"=== MMR re-ranking, top {k} of {len(rankings)} users ({app.content_tfidf_matrix.shape[0]} items) ===")
+    print(f"  relevance order: list similarity {baseline_ils:.3f}")
+    print(f"  {'candidates':>10}{'lambda':>8}{'p50 ms':>9}{'p99 ms':>9}{'list sim':>10}{'relevance kept':>16}")
+    for candidates in candidate_sizes:
+        for lam in lambdas:
+            latencies, ils, kept = [], [], []
+            for rows, scores in rankings.values():
+                start = time.perf_counter()
+                top_rows, top_scores = mmr_rerank(app.content_tfidf_matrix, rows, scores, k, lam, candidates)
+                latencies.append((time.perf_counter() - start) * 1000)
+                ils.append(intra_list_similarity(app.content_tfidf_matrix, top_rows))
+                kept.append(top_scores.sum() / scores[:k].sum())
+            print(f"  {candidates:>10}{lam:>8.2f}{np.percentile(latencies, 50):>9.3f}{np.percentile(latencies, 99):>9.3f}"
+                  f"{np.mean(ils):>10.3f}{np.mean(kept):>16.3f}")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--candidates', default='100,300,1000', help='candidate pool sizes')
+    parser.add_argument('--lambdas', default='0.3,0.5,0.7,0.9', help='relevance weights')
+    parser.add_argument('--k', type=int, default=10, help='recommendations per list')
+    parser.add_argument('--users', type=int, default=200, help='sampled users with ratings')
+    args = parser.parse_args()
+    return run_benchmark([int(c) for c in args.candidates.split(',')],
+                         [float(lam) for lam in args.lambdas.split(',')], args.k, args.users)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Latent Embeddings
+Optional dense scoring mode (LATENT_DIM > 0 in app.py). The normalized
+catalog rows are projected onto their top LATENT_DIM right singular
+vectors, from a randomized truncated SVD fit over the terms the catalog
+uses, and stored as a contiguous float32 items x dim matrix with unit
+rows. A user profile is the same weighted sum of the liked rows'
+projections (the projection of the sparse profile), so scoring is one
+dense GEMV over items x dim instead of a sparse product over the
+vocabulary. Scores approximate the exact cosine; the comparison below
+shows how closely at each dimension.
+
+With LATENT_QUANTIZATION=int8 every row is also stored as int8 codes with
+a per-row scale (a quarter of the float32 bytes). The profile is quantized
+the same way, so a block of rows scores with exact integer dot products,
+run as one BLAS call on the codes widened to float32 (exact while
+127 * 127 * dim < 2 ** 24). The best RERANK_CANDIDATES rows are then
+re-scored with their float32 vectors, so returned scores are unchanged and
+only rows the int8 pass missed can differ.
+
+The fit is cached in the content_embeddings snapshot directory and
+memory-mapped at load, so with int8 scoring only the codes stay hot and
+the float32 rows are paged in for candidates. The server fits in memory
+when the cache is missing or does not match the catalog and dimension.
+
+Usage:
+    python embeddings.py --build 128               # fit and save the content_embeddings directory
+    python embeddings.py [--dims 64,128,256] [--k 10] [--users 200]   # quality vs speed
+    python embeddings.py --quantization [--dim 128] [--items 1000000]  # int8 vs float32
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+
+from snapshot import SnapshotWriter, load_snapshot
+from top_k import top_k_positions
+
+CONTENT_EMBEDDINGS_PATH = 'content_embeddings'
+DEFAULT_DIM = 128
+OVERSAMPLES = 10           # extra random directions for the range finder
+POWER_ITERATIONS = 4       # subspace iterations, for the slowly decaying spectra of TF-IDF
+SEED = 42
+
+QUANTIZATION_MODES = ('none', 'int8')
+RERANK_CANDIDATES = 200    # int8 winners re-scored with the float32 vectors
+QUANTIZED_BLOCK_ROWS = 1024  # code rows widened per BLAS call; the float32 block stays in L2
+INT8_MAX = 127
+
+# --- Fitting ---
+def randomized_svd(matrix, dim, oversamples=OVERSAMPLES, power_iterations=POWER_ITERATIONS, seed=SEED):
+    """Top dim singular values and right singular vectors (columns x dim) of a sparse matrix,
+    by a randomized range finder with subspace iterations (Halko, Martinsson and Tropp)"""
+    rng = np.random.default_rng(seed)
+    size = min(dim + oversamples, min(matrix.shape))
+    basis = matrix @ rng.standard_normal((matrix.shape[1], size))
+    for _ in range(power_iterations):
+        basis, _ = np.linalg.qr(basis)
+        basis, _ = np.linalg.qr(matrix.T @ basis)
+        basis = matrix @ basis
+    basis, _ = np.linalg.qr(basis)
+    _, singular_values, vt = np.linalg.svd((matrix.T @ basis).T, full_matrices=False)
+    return singular_values[:dim], vt[:dim].T
+
+def build_embeddings(content_matrix, dim=DEFAULT_DIM, seed=SEED):
+    """Unit-norm float32 item vectors (items x dim), each item's norm after projection, and the
+    share of the catalog's energy (squared Frobenius norm) the dimensions keep"""
+    content_matrix = sparse.csr_matrix(content_matrix)
+    # Fit over the columns in use only; hashed vocabularies are mostly empty
+    terms, columns = np.unique(content_matrix.indices, return_inverse=True)
+    compact = sparse.csr_matrix((content_matrix.data, columns.ravel(), content_matrix.indptr),
+                                shape=(content_matrix.shape[0], len(terms)))
+    singular_values, basis = randomized_svd(compact, dim, seed=seed)
+
+    projected = compact @ basis
+    norms = np.linalg.norm(projected, axis=1)
+    vectors = projected / np.where(norms > 0, norms, 1.0)[:, None]
+    return {
+        'vectors': np.ascontiguousarray(vectors, dtype=np.float32),
+        'norms': norms.astype(np.float32),
+        'energy': np.float64((singular_values ** 2).sum() / compact.multiply(compact).sum()),
+        'source': np.array([*content_matrix.shape, content_matrix.nnz], dtype=np.int64),
+    }
+
+def save_embeddings(path, embeddings):
+    """Write embeddings (and their int8 codes, quantized here if absent) as a snapshot directory"""
+    if 'codes' not in embeddings:
+        embeddings = quantize_embeddings(embeddings)
+    with SnapshotWriter(path, version='embeddings', metadata={'energy': float(embeddings['energy'])}) as writer:
+        for name in ('vectors', 'norms', 'codes', 'scales', 'source'):
+            writer.add_array(name, embeddings[name])
+
+def load_embeddings(path, content_matrix, dim, mmap=True):
+    """Embeddings saved at path (memory-mapped by default), or None when they were fit on another
+    matrix or dimension"""
+    snapshot = load_snapshot(path, mmap=mmap)
+    embeddings = dict(snapshot['arrays'], energy=np.float64(snapshot['manifest']['metadata']['energy']))
+    source = [*content_matrix.shape, content_matrix.nnz]
+    if embeddings['vectors'].shape[1] != dim or embeddings['source'].tolist() != source:
+        return None
+    return embeddings
+
+# --- Quantization ---
+def quantize_rows(vectors):
+    """Symmetric int8 codes and per-row float32 scales, vectors ~= codes * scales[:, None]"""
+    vectors = np.atleast_2d(vectors)
+    scales = (np.abs(vectors).max(axis=1) / INT8_MAX).astype(np.float32)
+    codes = np.rint(vectors / np.where(scales > 0, scales, 1)[:, None]).astype(np.int8)
+    return codes, scales
+
+def quantize_embeddings(embeddings):
+    """Embeddings with int8 'codes' and 'scales' for the unit vectors added"""
+    codes, scales = quantize_rows(embeddings['vectors'])
+    return dict(embeddings, codes=codes, scales=scales)
+
+# --- Scoring ---
+def embedding_profile(embeddings, liked_rows, weights):
+    """Latent profile of a user: the weighted sum of the liked rows' projections"""
+    return (weights * embeddings['norms'][liked_rows]).astype(np.float32) @ embeddings['vectors'][liked_rows]
+
+def embedding_scores(embeddings, profile, rows=None):
+    """Cosine similarity in the latent space of every catalog row, or only the given rows, to a profile"""
+    vectors = embeddings['vectors'] if rows is None else embeddings['vectors'][rows]
+    scores = (vectors @ profile).astype(np.float64)
+    norm = np.linalg.norm(profile)
+    return scores / norm if norm > 0 else scores
+
+def quantized_scores(embeddings, profile, rows=None, block_rows=QUANTIZED_BLOCK_ROWS):
+    """Approximate latent cosine of every row, or only the given rows, from the int8 codes.
+
+    Each block is widened to float32 and multiplied by the int8 profile codes:
+    the products and sums are small integers, so one BLAS call computes the
+    integer dot products exactly.
+    """
+    codes = embeddings['codes'] if rows is None else embeddings['codes'][rows]
+    scales = embeddings['scales'] if rows is None else embeddings['scales'][rows]
+    profile_codes, profile_scale = quantize_rows(profile)
+    profile_codes = profile_codes[0].astype(np.float32)
+
+    dots = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), block_rows):
+        np.matmul(codes[start:start + block_rows].astype(np.float32), profile_codes,
+                  out=dots[start:start + block_rows])
+    norm = np.linalg.norm(profile)
+    scale = profile_scale[0] / norm if norm > 0 else profile_scale[0]
+    return (dots * scales).astype(np.float64) * scale
+
+def rerank_candidates(embeddings, profile, scores, k, rows=None, candidates=RERANK_CANDIDATES):
+    """Positions (ascending) of the best max(k, candidates) finite quantized scores and their
+    float32 latent scores; rows maps score positions to catalog rows"""
+    size = min(max(k, candidates), len(scores))
+    if size <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    top = np.sort(np.argpartition(-scores, size - 1)[:size])
+    top = top[np.isfinite(scores[top])]
+    return top, embedding_scores(embeddings, profile, top if rows is None else rows[top])
+
+# --- Comparison ---
+def _percentiles(latencies):
+    return np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000
+
+def run_comparison(dims, k, n_users, seed=SEED):
+    """Fit time, memory, scoring latency and agreement with the exact sparse ranking per dimension"""
+    import app
+    app.LATENT_DIM = 0
+    if not app.load_model_artifacts():
+        print("Cannot compare: model artifacts failed to load.")
+        return False
+
+    rng = np.random.default_rng(seed)
+    users = rng.choice(app.ratings_index['user_ids'], size=min(n_users, len(app.ratings_index['user_ids'])),
+                       replace=False).tolist()
+    users = [user for user in users if app.get_user_liked_items(user) is not None]
+    if not users:
+        print("No users with profiles to compare.")
+        return False
+
+    def timed_rankings():
+        rankings, latencies = {}, []
+        for user in users:
+            start = time.perf_counter()
+            rankings[user] = app.rank_recommendations(user, num_recommendations=k)[0]
+            latencies.append(time.perf_counter() - start)
+        return rankings, latencies
+
+    exact, exact_latencies = timed_rankings()
+    # Exact cosine of every row per user, to value the latent picks
+    exact_scores = {user: app.score_items(app.get_user_profile_vector(user)) for user in users}
+    matrix_mb = sum(array.nbytes for array in (app.content_tfidf_matrix.data, app.content_tfidf_matrix.indices,
+                                               app.content_tfidf_matrix.indptr)) / 2 ** 20
+    p50, p99 = _percentiles(exact_latencies)
+
+    print(f"=== Latent scoring vs exact sparse, top {k} of {len(users)} users "
+          f"({app.content_tfidf_matrix.shape[0]} items x {app.content_tfidf_matrix.shape[1]} terms) ===")
+    print(f"  {'dim':>6}{'fit s':>8}{'energy':>8}{'MB':>8}{'p50 ms':>9}{'p99 ms':>9}{'overlap':>9}{'score kept':>12}")
+    print(f"  {'exact':>6}{'':>8}{1.0:>8.3f}{matrix_mb:>8.1f}{p50:>9.3f}{p99:>9.3f}{1.0:>9.3f}{1.0:>12.3f}")
+    try:
+        for dim in dims:
+            start = time.perf_counter()
+            app.content_embeddings = build_embeddings(app.content_tfidf_matrix, dim)
+            fit_seconds = time.perf_counter() - start
+
+            latent, latencies = timed_rankings()
+            overlap = np.mean([len(np.intersect1d(latent[user], exact[user])) / max(len(exact[user]), 1)
+                               for user in users])
+            kept = np.mean([exact_scores[user][latent[user]].sum() / exact_scores[user][exact[user]].sum()
+                            for user in users if exact_scores[user][exact[user]].sum() > 0])
+            p50, p99 = _percentiles(latencies)
+            vectors_mb = (app.content_embeddings['vectors'].nbytes + app.content_embeddings['norms'].nbytes) / 2 ** 20
+            print(f"  {dim:>6}{fit_seconds:>8.1f}{float(app.content_embeddings['energy']):>8.3f}{vectors_mb:>8.1f}"
+                  f"{p50:>9.3f}{p99:>9.3f}{overlap:>9.3f}{kept:>12.3f}")
+    finally:
+        app.content_embeddings = None
+    return True
+
+def build(dim, path=CONTENT_EMBEDDINGS_PATH):
+    """Fit embeddings for the model app.py loads and save them for LATENT_DIM=dim"""
+    import app
+    app.LATENT_DIM = 0
+    if not app.load_model_artifacts():
+        print("Cannot build: model artifacts failed to load.")
+        return False
+    start = time.perf_counter()
+    embeddings = build_embeddings(app.content_tfidf_matrix, dim)
+    save_embeddings(path, embeddings)
+    print(f"Wrote {path}/: {embeddings['vectors'].shape[0]} items x {dim} dims, "
+          f"energy kept {float(embeddings['energy']):.3f}, fit in {time.perf_counter() - start:.1f}s")
+    return True
+
+def random_embeddings(n_items, dim, clusters=256, seed=SEED):
+    """Unit float32 vectors scattered around random cluster centers, like fitted item embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=n_items)]
+    vectors += rng.standard_normal((n_items, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return {'vectors': vectors, 'norms': np.ones(n_items, dtype=np.float32), 'energy': np.float64(1.0),
+            'source': np.array([n_items, dim, n_items * dim], dtype=np.int64)}
+
+def app_queries(embeddings, n_users, seed=SEED):
+    """(profile, rated rows) of sampled users of the loaded app model"""
+    import app
+    rng = np.random.default_rng(seed)
+    user_ids = app.ratings_index['user_ids']
+    queries = []
+    for user in rng.choice(user_ids, size=min(n_users, len(user_ids)), replace=False).tolist():
+        liked = app.get_user_liked_items(user)
+        if liked is not None:
+            rated = app.ratings_index['item_rows'][app.user_slice(app.ratings_index, user)]
+            queries.append((embedding_profile(embeddings, liked[0], liked[2]), rated[rated >= 0]))
+    return queries
+
+def run_quantization(dim, k, n_queries, n_items=None, seed=SEED):
+    """Memory, latency and recall@k against float32 latent scoring of int8 scoring with and without
+    the float32 re-rank, on the app catalog or n_items synthetic vectors"""
+    if n_items:
+        embeddings = random_embeddings(n_items, dim, seed=seed)
+        rng = np.random.default_rng(seed + 1)
+        liked = [rng.choice(n_items, size=20, replace=False) for _ in range(n_queries)]
+        queries = [(embedding_profile(embeddings, rows, np.full(len(rows), 1.0 / len(rows))), rows) for rows in liked]
+        source = f"{n_items} synthetic items, {n_queries} queries"
+    else:
+        import app
+        app.LATENT_DIM = 0
+        if not app.load_model_artifacts():
+            print("Cannot compare: model artifacts failed to load.")
+            return False
+        embeddings = build_embeddings(app.content_tfidf_matrix, dim)
+        queries = app_queries(embeddings, n_queries, seed)
+        source = f"{app.content_tfidf_matrix.shape[0]} catalog items, {len(queries)} users"
+    embeddings = quantize_embeddings(embeddings)
+
+    def float32_top(profile, excluded):
+        scores = embedding_scores(embeddings, profile)
+        scores[excluded] = -np.inf
+        return top_k_positions(scores, k)
+
+    def int8_top(profile, excluded, rerank):
+        scores = quantized_scores(embeddings, profile)
+        scores[excluded] = -np.inf
+        if not rerank:
+            return top_k_positions(scores, k)
+        positions, exact = rerank_candidates(embeddings, profile, scores, k)
+        return positions[top_k_positions(exact, k)]
+
+    modes = [('float32', float32_top, ('vectors',)),
+             ('int8', lambda profile, excluded: int8_top(profile, excluded, False), ('codes', 'scales')),
+             ('int8+rerank', lambda profile, excluded: int8_top(profile, excluded, True), ('codes', 'scales'))]
+    print(f"=== Int8 latent scoring, {source}, {dim} dims, top {k}, "
+          f"re-rank of {max(k, RERANK_CANDIDATES)} candidates ===")
+    print(f"  {'mode':<13}{'MB':>8}{'saved':>8}{'p50 ms':>9}{'p99 ms':>9}{'q/s':>9}{'speedup':>9}{f'recall@{k}':>11}")
+    expected, base_p50, base_mb = None, None, None
+    for name, top, arrays in modes:
+        tops, latencies = [], []
+        for profile, excluded in queries:
+            start = time.perf_counter()
+            tops.append(top(profile, excluded))
+            latencies.append(time.perf_counter() - start)
+        p50, p99 = _percentiles(latencies)
+        megabytes = sum(embeddings[array].nbytes for array in arrays) / 2 ** 20
+        if expected is None:
+            expected, base_p50, base_mb = tops, p50, megabytes
+        recall = np.mean([len(np.intersect1d(got, want)) / max(len(want), 1) for got, want in zip(tops, expected)])
+        print(f"  {name:<13}{megabytes:>8.1f}{1 - megabytes / base_mb:>8.0%}{p50:>9.3f}{p99:>9.3f}"
+              f"{1 / np.mean(latencies):>9.0f}{base_p50 / p50:>9.2f}{recall:>11.3f}")
+    print("  MB is the data each query streams; the re-rank reads its candidates' float32 rows only")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--build', type=int, metavar='DIM', help=f'fit and save {CONTENT_EMBEDDINGS_PATH}')
+    parser.add_argument('--dims', default='64,128,256', help='dimensions to compare')
+    parser.add_argument('--k', type=int, default=10, help='recommendations per user')
+    parser.add_argument('--users', type=int, default=200, help='sampled users with ratings')
+    parser.add_argument('--quantization', action='store_true', help='compare int8 with float32 scoring')
+    parser.add_argument('--dim', type=int, default=DEFAULT_DIM, help='dimension for --quantization')
+    parser.add_argument('--items', type=int, help='synthetic items for --quantization (default: the app catalog)')
+    args = parser.parse_args()
+    if args.build:
+        return build(args.build)
+    if args.quantization:
+        return run_quantization(args.dim, args.k, args.users, args.items)
+    return run_comparison([int(dim) for dim in args.dims.split(',')], args.k, args.users)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
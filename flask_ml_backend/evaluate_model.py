@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Model Evaluation
+Offline evaluation of the content-based recommender on a per-user temporal
+holdout: each user's most recent ratings are hidden, profiles are built
+from the remaining ones the same way app.py builds them, and
+precision@K, recall@K, NDCG@K, catalog coverage and scoring latency are
+reported for the loaded model version.
+
+Users are scored in blocks (one sparse product per block instead of one
+per user) across a process pool. The content matrix and the split are
+written once as a snapshot in shared memory (/dev/shm when available) and
+memory-mapped by every worker.
+
+Usage:
+    python evaluate_model.py [--k 5,10] [--holdout 0.2] [--workers 4] [--block-size 16]
+                             [--max-users N] [--json evaluation.json]
+    MODEL_SNAPSHOT=model_snapshot python evaluate_model.py
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+from scipy import sparse
+
+from ratings_index import profile_weights
+from snapshot import SnapshotWriter, load_snapshot
+
+DEFAULT_K = 10
+HOLDOUT_FRACTION = 0.2       # most recent share of each user's ratings held out
+MIN_USER_RATINGS = 5         # users with fewer ratings are not split
+RELEVANT_RATING = 4.0        # held-out ratings at or above this count as relevant
+DEFAULT_BLOCK_SIZE = 16      # users per block; larger blocks spill the score matrix out of cache
+SEED = 42
+
+# Profile construction settings, defaults as in app.py (PROFILE_* environment variables)
+DEFAULT_PROFILE = {'min_rating': 4.0, 'weighting': 'rating', 'half_life_days': None}
+
+_workspace = None            # worker-side memory-mapped split and content matrix
+
+# --- Holdout Split ---
+def _ranges(starts, lengths):
+    """Concatenated np.arange(start, start + length) for every pair"""
+    total = int(lengths.sum())
+    shifts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.arange(total) - shifts + np.repeat(starts, lengths)
+
+def temporal_split(index, holdout_fraction=HOLDOUT_FRACTION, min_ratings=MIN_USER_RATINGS, seed=SEED):
+    """Split a ratings index into train and test parts, holding out each user's latest ratings.
+
+    Ratings of items missing from the catalog are dropped. Without timestamps the
+    held-out ratings are chosen at random (seeded).
+    """
+    valid = index['item_rows'] >= 0
+    counts = np.diff(index['offsets'])
+    user_pos = np.repeat(np.arange(len(counts)), counts)[valid]
+    item_rows = index['item_rows'][valid]
+    ratings = index['ratings'][valid]
+    if 'timestamps' in index:
+        times = index['timestamps'][valid]
+    else:
+        print("Ratings have no timestamps, holding out a random sample per user instead")
+        times = np.random.default_rng(seed).permutation(len(item_rows))
+
+    # Oldest first within each user; ties keep their original order
+    order = np.lexsort((np.arange(len(item_rows)), times, user_pos))
+    user_pos, item_rows, ratings, times = user_pos[order], item_rows[order], ratings[order], times[order]
+
+    counts = np.bincount(user_pos, minlength=len(index['user_ids']))
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    n_test = np.where(counts >= min_ratings, np.maximum(1, (counts * holdout_fraction).astype(np.int64)), 0)
+    rank = np.arange(len(user_pos)) - offsets[user_pos]
+    is_test = rank >= (counts - n_test)[user_pos]
+
+    split = {'user_ids': index['user_ids']}
+    for part, mask in (('train', ~is_test), ('test', is_test)):
+        part_counts = np.bincount(user_pos[mask], minlength=len(counts))
+        part_offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(part_counts, out=part_offsets[1:])
+        split[f'{part}_offsets'] = part_offsets
+        split[f'{part}_item_rows'] = item_rows[mask]
+        split[f'{part}_ratings'] = ratings[mask]
+        split[f'{part}_timestamps'] = times[mask]
+    return split
+
+def eligible_users(split, profile_min_rating=DEFAULT_PROFILE['min_rating'], relevant_rating=RELEVANT_RATING):
+    """Positions of users with at least one liked train rating and one relevant held-out rating"""
+    n_users = len(split['user_ids'])
+
+    def users_with(part, min_rating):
+        counts = np.diff(split[f'{part}_offsets'])
+        owners = np.repeat(np.arange(n_users), counts)
+        return np.bincount(owners[split[f'{part}_ratings'] >= min_rating], minlength=n_users) > 0
+
+    has_test = np.diff(split['test_offsets']) > 0
+    has_profile = users_with('train', profile_min_rating)
+    has_relevant = users_with('test', relevant_rating)
+    stats = {
+        'users': n_users,
+        'split_users': int(has_test.sum()),
+        'without_profile': int((has_test & ~has_profile).sum()),
+        'without_relevant': int((has_test & has_profile & ~has_relevant).sum()),
+    }
+    return np.flatnonzero(has_profile & has_relevant), stats
+
+# --- Shared Workspace ---
+def write_workspace(path, content_matrix, split):
+    """Snapshot of the split and the content matrix, item-major and term-major, in float32"""
+    content_matrix = sparse.csr_matrix(content_matrix, dtype=np.float32)
+    with SnapshotWriter(path, version='evaluation') as writer:
+        writer.add_matrix('content', content_matrix)
+        writer.add_matrix('content_t', content_matrix.T)
+        for name, array in split.items():
+            writer.add_array(name, array)
+
+@contextmanager
+def shared_workspace(content_matrix, split):
+    """Write the workspace to shared memory (/dev/shm when available) and remove it afterwards"""
+    root = '/dev/shm' if os.path.isdir('/dev/shm') else None
+    path = tempfile.mkdtemp(prefix='evaluation-', dir=root)
+    try:
+        write_workspace(path, content_matrix, split)
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+def _init_worker(path):
+    global _workspace
+    snapshot = load_snapshot(path, mmap=True)
+    _workspace = dict(snapshot['arrays'], **snapshot['matrices'])
+
+# --- Block Scoring ---
+def top_k_rows(scores, k):
+    """Column positions of the k best finite scores of every row (users x items), as k x users,
+    best first and -1 padded. Ties are ordered like top_k.top_k_positions (later rows first).
+    """
+    k = min(k, scores.shape[1])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k].T
+    top_scores = np.take_along_axis(scores.T, top, axis=0)
+    order = np.lexsort((-top, -top_scores), axis=0)
+    top = np.take_along_axis(top, order, axis=0)
+    top[~np.isfinite(np.take_along_axis(top_scores, order, axis=0))] = -1
+    return top
+
+def score_block(workspace, positions, k, profile=DEFAULT_PROFILE):
+    """Top-k catalog rows (k x users) for a block of user positions, train items excluded.
+    Users without liked train ratings get no recommendations (-1)."""
+    content = workspace['content']
+    n_items = content.shape[0]
+    offsets = workspace['train_offsets']
+    lengths = offsets[positions + 1] - offsets[positions]
+    rows = _ranges(offsets[positions], lengths)
+    owners = np.repeat(np.arange(len(positions)), lengths)
+    item_rows = workspace['train_item_rows'][rows]
+    ratings = workspace['train_ratings'][rows]
+
+    # Weighted average of liked rows, as in get_user_profile_vector
+    liked = ratings >= profile['min_rating']
+    liked_weights = profile_weights(ratings[liked], workspace['train_timestamps'][rows][liked], owners[liked],
+                                    scheme=profile['weighting'], half_life_days=profile['half_life_days'])
+    weights = sparse.csr_matrix((liked_weights, (owners[liked], item_rows[liked])), shape=(len(positions), n_items))
+    totals = np.asarray(weights.sum(axis=1)).ravel()
+    has_profile = totals > 0
+    weights = sparse.diags(np.divide(1.0, totals, out=np.zeros_like(totals), where=has_profile)) @ weights
+    profiles = weights @ content
+
+    # Only the terms used by the block's profiles contribute. Profile norms scale
+    # whole rows of scores, so they do not change the ranking.
+    terms = np.unique(profiles.indices)
+    block_profiles = profiles[:, terms].toarray().astype(np.float32)
+    scores = np.ascontiguousarray((workspace['content_t'][terms].T @ block_profiles.T).T)
+    scores[owners, item_rows] = -np.inf
+    scores[~has_profile] = -np.inf
+    return top_k_rows(scores, k)
+
+def evaluate_block(positions, ks, profile=DEFAULT_PROFILE, relevant_rating=RELEVANT_RATING, workspace=None):
+    """Per-user metrics and recommended rows at every k in ks (one ranking at max(ks)),
+    plus the elapsed scoring time, for one block"""
+    workspace = workspace if workspace is not None else _workspace
+    start = time.perf_counter()
+    top = score_block(workspace, positions, max(ks), profile)
+    elapsed = time.perf_counter() - start
+
+    offsets = workspace['test_offsets']
+    lengths = offsets[positions + 1] - offsets[positions]
+    rows = _ranges(offsets[positions], lengths)
+    owners = np.repeat(np.arange(len(positions)), lengths)
+    relevant = workspace['test_ratings'][rows] >= relevant_rating
+    n_items = workspace['content'].shape[0]
+    relevant_keys = owners[relevant] * n_items + workspace['test_item_rows'][rows][relevant]
+    n_relevant = np.bincount(owners[relevant], minlength=len(positions))
+
+    # hits[i, u]: the i-th recommendation of user u was a relevant held-out item
+    top_keys = np.arange(len(positions))[None, :] * n_items + top
+    hits = np.isin(top_keys, relevant_keys) & (top >= 0)
+    discounts = 1.0 / np.log2(np.arange(2, top.shape[0] + 2))
+
+    metrics = {}
+    for k in ks:
+        k_hits = hits[:k]
+        ideal = np.cumsum(discounts)[np.minimum(n_relevant, k) - 1]
+        recommended = top[:k]
+        metrics[k] = {
+            'precision': k_hits.sum(axis=0) / k,
+            'recall': k_hits.sum(axis=0) / n_relevant,
+            'ndcg': (k_hits * discounts[:k, None]).sum(axis=0) / ideal,
+            'recommended': np.unique(recommended[recommended >= 0]),
+        }
+    return {'positions': positions, 'metrics': metrics, 'seconds': elapsed}
+
+# --- Evaluation ---
+def blocks_of(positions, block_size):
+    return [positions[i:i + block_size] for i in range(0, len(positions), block_size)]
+
+def worker_pool(workspace_path, workers):
+    """Process pool whose workers memory-map the workspace"""
+    # Spawned workers start clean (no inherited threads or model state) and only map the workspace
+    context = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(workspace_path,))
+
+def run_blocks(workspace_path, blocks, ks, workers, profile=DEFAULT_PROFILE):
+    """Evaluate blocks in a process pool (or inline with one worker), in block order"""
+    if workers <= 1:
+        _init_worker(workspace_path)
+        return [evaluate_block(block, ks, profile) for block in blocks]
+    with worker_pool(workspace_path, workers) as pool:
+        return list(pool.map(evaluate_block, blocks, [ks] * len(blocks), [profile] * len(blocks)))
+
+def summarize(results, ks, n_items, wall_seconds=None):
+    """Mean metrics and coverage at every k, and the scoring latency per user"""
+    summary = {'users_evaluated': int(sum(len(r['positions']) for r in results))}
+    for k in ks:
+        for name in ('precision', 'recall', 'ndcg'):
+            summary[f'{name}@{k}'] = float(np.concatenate([r['metrics'][k][name] for r in results]).mean())
+        recommended = np.unique(np.concatenate([r['metrics'][k]['recommended'] for r in results]))
+        summary[f'coverage@{k}'] = len(recommended) / n_items
+
+    # Amortized scoring time per user, one value per block
+    per_user_ms = np.array([r['seconds'] * 1000 / len(r['positions']) for r in results])
+    sizes = np.array([len(r['positions']) for r in results])
+    summary['latency_ms_per_user'] = {
+        'mean': float(np.average(per_user_ms, weights=sizes)),
+        'p50': float(np.percentile(per_user_ms, 50)),
+        'p99': float(np.percentile(per_user_ms, 99)),
+    }
+    if wall_seconds is not None:
+        summary['wall_seconds'] = wall_seconds
+        summary['users_per_second'] = summary['users_evaluated'] / wall_seconds if wall_seconds > 0 else 0.0
+    return summary
+
+def parse_ks(value):
+    return sorted({int(k) for k in value.split(',')})
+
+def load_model():
+    """Load the serving model through app.py (CSV files or MODEL_SNAPSHOT)"""
+    import app
+    if not app.load_model_artifacts():
+        return None
+    return app
+
+def serving_profile(app):
+    """Profile settings app.py is configured with"""
+    return {'min_rating': app.PROFILE_MIN_RATING, 'weighting': app.PROFILE_WEIGHTING,
+            'half_life_days': app.PROFILE_HALF_LIFE_DAYS}
+
+def evaluate(args):
+    app = load_model()
+    if app is None:
+        print("Cannot evaluate: model artifacts failed to load.")
+        return None
+
+    profile = serving_profile(app)
+    split = temporal_split(app.ratings_index, args.holdout, args.min_ratings, args.seed)
+    positions, user_stats = eligible_users(split, profile['min_rating'])
+    if args.max_users and len(positions) > args.max_users:
+        rng = np.random.default_rng(args.seed)
+        positions = np.sort(rng.choice(positions, size=args.max_users, replace=False))
+    if len(positions) == 0:
+        print("No users have both liked training ratings and relevant held-out ratings.")
+        return None
+
+    n_items = app.content_tfidf_matrix.shape[0]
+    print(f"Evaluating model {app.model_version}: {n_items} items, {len(positions)} users, "
+          f"K={','.join(map(str, args.k))}, {args.workers} workers, blocks of {args.block_size}")
+
+    with shared_workspace(app.content_tfidf_matrix, split) as workspace_path:
+        start = time.perf_counter()
+        results = run_blocks(workspace_path, blocks_of(positions, args.block_size), args.k, args.workers, profile)
+        wall_seconds = time.perf_counter() - start
+
+    report = {
+        'model_version': app.model_version,
+        'feature_mode': app.FEATURE_MODE,
+        'n_items': int(n_items),
+        'ks': args.k,
+        'split': dict(user_stats, holdout_fraction=args.holdout, min_user_ratings=args.min_ratings,
+                      temporal='timestamps' in app.ratings_index),
+        'profile': profile,
+        'metrics': summarize(results, args.k, n_items, wall_seconds),
+        'settings': {'workers': args.workers, 'block_size': args.block_size, 'seed': args.seed},
+    }
+    return report
+
+def print_report(report):
+    metrics = report['metrics']
+    latency = metrics['latency_ms_per_user']
+    print(f"\n=== Model {report['model_version']} ({report['feature_mode']}) ===")
+    print(f"  users evaluated      {metrics['users_evaluated']} "
+          f"(skipped: {report['split']['without_profile']} without profile, "
+          f"{report['split']['without_relevant']} without relevant held-out items)")
+    for k in report['ks']:
+        for name in (f'precision@{k}', f'recall@{k}', f'ndcg@{k}', f'coverage@{k}'):
+            print(f"  {name:20} {metrics[name]:.4f}")
+    print(f"  latency ms/user      mean {latency['mean']:.3f}  p50 {latency['p50']:.3f}  p99 {latency['p99']:.3f}")
+    print(f"  wall time            {metrics['wall_seconds']:.1f}s ({metrics['users_per_second']:.0f} users/s)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--k', type=parse_ks, default=[DEFAULT_K], help='recommendations per user, e.g. 5,10,20')
+    parser.add_argument('--holdout', type=float, default=HOLDOUT_FRACTION, help='share of latest ratings held out')
+    parser.add_argument('--min-ratings', type=int, default=MIN_USER_RATINGS, help='ratings a user needs to be split')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE, help='users scored per block')
+    parser.add_argument('--max-users', type=int, default=None, help='evaluate a seeded sample of users')
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--json', default=None, help='report path (default: evaluation_<model version>.json)')
+    args = parser.parse_args()
+
+    report = evaluate(args)
+    if report is None:
+        return False
+    print_report(report)
+
+    path = args.json or f"evaluation_{report['model_version']}.json"
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {path}")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Explanations
+"Because you liked" attributions for recommended items. An item's score is
+the cosine between its content row and the user's profile, a weighted sum
+of the liked rows, so it splits exactly into one contribution per liked
+item (weight * item . liked / |profile|) and one per shared term
+(item[t] * profile[t] / |profile|).
+
+Both come from the returned rows and the liked rows only, compacted to the
+terms they use: one sparse (K x terms) @ (terms x liked) product and one
+elementwise product with the profile, with no catalog rescoring.
+
+With latent scoring (LATENT_DIM) the ranking score is the cosine in the
+embedding space, so liked items are attributed there instead; latent
+dimensions are not terms, and those explanations list no shared terms.
+"""
+
+import numpy as np
+from scipy import sparse
+
+TOP_LIKED = 3      # liked items listed per recommendation
+TOP_TERMS = 5      # shared terms listed per recommendation
+
+def attribute_scores(content_matrix, item_rows, liked_rows, weights):
+    """Score contributions of each liked item (dense K x liked) and each term (sparse K x terms).
+
+    weights are the normalized profile weights of liked_rows; every row of
+    either result sums to the item's score.
+    """
+    # Both blocks come from one row slice, compacted to the terms they use so that
+    # no product runs over the full vocabulary
+    k = len(item_rows)
+    block = content_matrix[np.concatenate([item_rows, liked_rows])]
+    terms, columns = np.unique(block.indices, return_inverse=True)
+    columns = columns.ravel()
+    split = block.indptr[k]
+    items = sparse.csr_matrix((block.data[:split], columns[:split], block.indptr[:k + 1]), shape=(k, len(terms)))
+    liked = sparse.csr_matrix((block.data[split:], columns[split:], block.indptr[k:] - split),
+                              shape=(len(liked_rows), len(terms)))
+
+    profile = np.bincount(columns[split:], weights=block.data[split:] * np.repeat(weights, np.diff(liked.indptr)),
+                          minlength=len(terms))
+    norm = np.linalg.norm(profile)
+    scale = 1.0 / norm if norm > 0 else 1.0
+
+    by_liked = (items @ liked.T).toarray() * (weights * scale)
+    by_term = sparse.csr_matrix((block.data[:split] * profile[columns[:split]] * scale, block.indices[:split],
+                                 block.indptr[:k + 1]), shape=(k, content_matrix.shape[1]))
+    return by_liked, by_term
+
+def attribute_latent_scores(vectors, norms, item_rows, liked_rows, weights):
+    """Latent score contributions of each liked item (dense K x liked).
+
+    The latent profile is the liked vectors weighted by weights * norms (see
+    embeddings.embedding_profile), so every row sums to the item's latent score.
+    """
+    liked_weights = (weights * norms[liked_rows]).astype(np.float32)
+    liked = vectors[liked_rows]
+    norm = np.linalg.norm(liked_weights @ liked)
+    scale = 1.0 / norm if norm > 0 else 1.0
+    return (vectors[item_rows] @ liked.T).astype(np.float64) * (liked_weights * scale)
+
+def _top(values, top_n):
+    """Positions of the top_n positive values, largest first"""
+    top = np.flatnonzero(values > 0)
+    return top[np.argsort(-values[top], kind='stable')][:top_n]
+
+def explain_items(by_liked, by_term, liked_item, term_name, top_liked=TOP_LIKED, top_terms=TOP_TERMS):
+    """Explanation dict per item from attribute_scores results.
+
+    liked_item(position) describes a liked row as a dict; term_name(item,
+    column) names a term column of an item, or returns None to leave it out.
+    by_term is None for latent attributions, which have no terms.
+    """
+    explanations = []
+    for item in range(by_liked.shape[0]):
+        liked = [dict(liked_item(position), contribution=float(by_liked[item, position]))
+                 for position in _top(by_liked[item], top_liked)]
+
+        terms = []
+        if by_term is None:
+            explanations.append({'because_you_liked': liked, 'shared_terms': terms})
+            continue
+        start, end = by_term.indptr[item], by_term.indptr[item + 1]
+        columns, values = by_term.indices[start:end], by_term.data[start:end]
+        for position in _top(values, len(values)):
+            name = term_name(item, int(columns[position]))
+            if name is not None:
+                terms.append({'term': name, 'contribution': float(values[position])})
+                if len(terms) == top_terms:
+                    break
+
+        explanations.append({'because_you_liked': liked, 'shared_terms': terms})
+    return explanations
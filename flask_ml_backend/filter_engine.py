@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Filter Engine
+Precomputed bitsets per content type, genre and release-year bucket.
+Request filters are combined into a single boolean mask that is applied
+before top-K selection instead of skipping items after a full sort.
+"""
+
+import re
+import numpy as np
+
+# Release year appended to titles, e.g. "Toy Story (1995)" or "Big Bang Theory, The (2007-)"
+YEAR_PATTERN = re.compile(r'\((\d{4})')
+YEAR_BUCKET_SIZE = 10
+
+# Filters selecting at most this fraction of the catalog score only the selected rows
+NARROW_FILTER_FRACTION = 0.05
+
+FILTER_OPERATORS = ('and', 'or')
+GENRE_MATCH_MODES = ('any', 'all')
+
+def parse_release_years(titles):
+    """Release year parsed from each title, 0 when the title has none"""
+    years = np.zeros(len(titles), dtype=np.int16)
+    for i, title in enumerate(titles):
+        found = YEAR_PATTERN.findall(title) if isinstance(title, str) else None
+        if found:
+            years[i] = int(found[-1])
+    return years
+
+# Number of set bits in every byte value
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def _pack(mask):
+    return np.packbits(mask)
+
+def build_filter_index(type_codes, content_types, genre_matrix, genre_names, years, bucket_size=YEAR_BUCKET_SIZE):
+    """Precompute packed bitsets for every content type, genre and year bucket"""
+    n_items = len(type_codes)
+    csc = genre_matrix.tocsc()
+
+    genre_bits = {}
+    for col, name in enumerate(genre_names):
+        mask = np.zeros(n_items, dtype=bool)
+        mask[csc.indices[csc.indptr[col]:csc.indptr[col + 1]]] = True
+        genre_bits[name] = _pack(mask)
+
+    buckets = (years // bucket_size) * bucket_size
+    year_bits = {int(bucket): _pack(buckets == bucket) for bucket in np.unique(buckets[years > 0])}
+
+    return {
+        'n_items': n_items,
+        'content_type': {ct: _pack(type_codes == i) for i, ct in enumerate(content_types)},
+        'genre': genre_bits,
+        'year_bucket': year_bits,
+        'bucket_size': bucket_size,
+        'years': years,
+    }
+
+def _combine(bitsets, operator):
+    result = bitsets[0].copy()
+    for bits in bitsets[1:]:
+        if operator == 'and':
+            np.bitwise_and(result, bits, out=result)
+        else:
+            np.bitwise_or(result, bits, out=result)
+    return result
+
+def _empty_bits(filter_index):
+    return np.zeros((filter_index['n_items'] + 7) // 8, dtype=np.uint8)
+
+def _year_bits(filter_index, year_from, year_to):
+    years = filter_index['years']
+    size = filter_index['bucket_size']
+    low = year_from if year_from is not None else 1
+    high = year_to if year_to is not None else np.iinfo(years.dtype).max
+
+    # Whole buckets come straight from the bitsets; partial edge buckets are refined below
+    bucket_bits = [bits for bucket, bits in filter_index['year_bucket'].items()
+                   if bucket + size - 1 >= low and bucket <= high]
+    if not bucket_bits:
+        return _empty_bits(filter_index)
+    bits = _combine(bucket_bits, 'or')
+
+    aligned = (year_from is None or year_from % size == 0) and (year_to is None or (year_to + 1) % size == 0)
+    if not aligned:
+        exact = (years >= low) & (years <= high)
+        np.bitwise_and(bits, _pack(exact), out=bits)
+    return bits
+
+def build_filter_mask(filter_index, content_types=None, genres=None, genre_match='any',
+                      year_from=None, year_to=None, operator='and'):
+    """Combine the requested filters into packed bits, or None when nothing is filtered.
+
+    Values within one filter are OR'ed (genres may use genre_match='all'); the
+    content type, genre and year groups are combined with operator.
+    """
+    if operator not in FILTER_OPERATORS:
+        raise ValueError(f"operator must be one of {list(FILTER_OPERATORS)}")
+    if genre_match not in GENRE_MATCH_MODES:
+        raise ValueError(f"genreMatch must be one of {list(GENRE_MATCH_MODES)}")
+
+    groups = []
+    if content_types:
+        groups.append(_combine([filter_index['content_type'][ct] for ct in content_types], 'or'))
+    if genres:
+        # Unknown genres match nothing
+        genre_bits = [filter_index['genre'].get(g, _empty_bits(filter_index)) for g in genres]
+        groups.append(_combine(genre_bits, 'and' if genre_match == 'all' else 'or'))
+    if year_from is not None or year_to is not None:
+        groups.append(_year_bits(filter_index, year_from, year_to))
+
+    if not groups:
+        return None
+    return _combine(groups, operator)
+
+def intersect(bits, other):
+    """AND two optional packed masks, where None means 'everything'"""
+    if bits is None:
+        return other
+    if other is None:
+        return bits
+    return np.bitwise_and(bits, other)
+
+def count_selected(bits):
+    """Number of catalog items selected by packed bits"""
+    return int(_POPCOUNT[bits].sum(dtype=np.int64))
+
+def unpack_mask(filter_index, bits):
+    """Boolean mask over the catalog for packed bits"""
+    return np.unpackbits(bits, count=filter_index['n_items']).view(bool)
+
+def rows_selected(bits, rows):
+    """Boolean mask over the given rows for packed bits, without unpacking the whole catalog"""
+    rows = np.asarray(rows, dtype=np.int64)
+    # np.packbits stores the first row of each byte in its high bit
+    return ((bits[rows >> 3] >> (7 - (rows & 7))) & 1).astype(bool)
+
+def choose_strategy(selected_count, n_items, narrow_fraction=NARROW_FILTER_FRACTION):
+    """'subset' scores only the filtered rows, 'mask' masks a full score vector"""
+    if n_items and selected_count <= narrow_fraction * n_items:
+        return 'subset'
+    return 'mask'
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Genre Index
+Sparse item x genre multi-hot matrix and vectorized content type codes,
+built once at load time so user statistics never walk DataFrame rows.
+"""
+
+import numpy as np
+from scipy import sparse
+
+def split_genres(genres):
+    """Split '|' separated genre strings, treating missing values as no genres"""
+    return [g.split('|') if isinstance(g, str) and g else [] for g in genres]
+
+def build_genre_matrix(genres, genre_names=None):
+    """Build a CSR multi-hot matrix (items x genres) and the matching genre names.
+
+    When genre_names is not given the vocabulary is every genre seen, sorted
+    alphabetically. Genres outside a given vocabulary are ignored.
+    """
+    split = split_genres(genres)
+    if genre_names is None:
+        genre_names = sorted({name for names in split for name in names})
+    lookup = {name: i for i, name in enumerate(genre_names)}
+
+    indptr = np.zeros(len(split) + 1, dtype=np.int64)
+    indices = []
+    for row, names in enumerate(split):
+        indices.extend(sorted({lookup[name] for name in names if name in lookup}))
+        indptr[row + 1] = len(indices)
+
+    indices = np.asarray(indices, dtype=np.int32)
+    data = np.ones(len(indices), dtype=np.float32)
+    matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(split), len(genre_names)))
+    return matrix, np.asarray(genre_names, dtype=object)
+
+def content_type_codes(genres, content_types, keyword_rules, default_type='movies'):
+    """Vectorized equivalent of applying the keyword rules to every genre string.
+
+    keyword_rules is an ordered list of (content_type, keywords); the first rule
+    with a keyword contained in the lowercased genre string wins. Returns int8
+    codes indexing into content_types.
+    """
+    lowered = np.char.lower(np.asarray([g if isinstance(g, str) else '' for g in genres], dtype=str))
+    codes = np.full(len(lowered), content_types.index(default_type), dtype=np.int8)
+    assigned = np.zeros(len(lowered), dtype=bool)
+
+    for content_type, keywords in keyword_rules:
+        hit = np.zeros(len(lowered), dtype=bool)
+        for keyword in keywords:
+            hit |= np.char.find(lowered, keyword) >= 0
+        hit &= ~assigned
+        codes[hit] = content_types.index(content_type)
+        assigned |= hit
+
+    return codes
+
+def top_genres(genre_matrix, rows, genre_names, top_n=5):
+    """Most frequent genres over the given item rows.
+
+    Counts come from one sparse (1 x items) @ (items x genres) product and the
+    top_n are picked with a partition; ties are broken by genre order.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if rows.size == 0:
+        return []
+
+    selector = sparse.csr_matrix(
+        (np.ones(rows.size, dtype=np.float32), (np.zeros(rows.size, dtype=np.int64), rows)),
+        shape=(1, genre_matrix.shape[0])
+    )
+    counts = np.asarray((selector @ genre_matrix).todense()).ravel()
+
+    k = min(top_n, int(np.count_nonzero(counts)))
+    if k == 0:
+        return []
+
+    top = np.argpartition(-counts, k - 1)[:k]
+    top = top[np.lexsort((top, -counts[top]))]
+    return genre_names[top].tolist()
+
+def type_breakdown(type_codes, content_types):
+    """Count items per content type with a single bincount"""
+    counts = np.bincount(np.asarray(type_codes, dtype=np.int64), minlength=len(content_types))
+    return {content_type: int(counts[i]) for i, content_type in enumerate(content_types)}
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Hashing Features
+Stateless TF-IDF feature extraction: tokens are hashed into a fixed number of
+columns and weighted by IDF values stored in a plain array, so there is no
+vocabulary to unpickle and catalog chunks can be transformed in parallel.
+"""
+
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+HASHING_N_FEATURES = 2 ** 18
+
+# Same tokenization as the scikit-learn TfidfVectorizer the pickle was built with
+TOKEN_PATTERN = re.compile(r'(?u)\b\w\w+\b')
+
+# Catalog chunk size used when transforming across processes
+TRANSFORM_CHUNK_SIZE = 20000
+
+def _hashed_counts(texts, n_features, stop_words):
+    """Raw term counts per text as a CSR matrix over the hashed columns"""
+    indptr = [0]
+    indices = []
+    for text in texts:
+        tokens = TOKEN_PATTERN.findall(text.lower()) if isinstance(text, str) else []
+        indices.extend(zlib.crc32(token.encode('utf-8')) % n_features
+                       for token in tokens if token not in stop_words)
+        indptr.append(len(indices))
+
+    counts = sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.float64), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(texts), n_features)
+    )
+    counts.sum_duplicates()
+    return counts
+
+def fit_idf(texts, n_features=HASHING_N_FEATURES, stop_words=()):
+    """Smoothed IDF per hashed column, matching TfidfVectorizer(smooth_idf=True)"""
+    stop_words = frozenset(stop_words)
+    counts = _hashed_counts(texts, n_features, stop_words)
+    document_frequency = np.bincount(counts.indices, minlength=n_features)
+    n_documents = counts.shape[0]
+    return (np.log((1 + n_documents) / (1 + document_frequency)) + 1).astype(np.float32)
+
+def transform(texts, features):
+    """TF-IDF rows (L2-normalized) for texts using stored hashing features"""
+    counts = _hashed_counts(texts, features['n_features'], features['stop_words'])
+    weighted = counts.multiply(features['idf']).tocsr()
+
+    norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(sparse.diags(1.0 / norms) @ weighted)
+
+def hashed_terms(texts, n_features):
+    """Token behind each hashed column used by texts, as {column: token}.
+
+    There is no vocabulary to invert, so a few rows' columns are named by
+    re-tokenizing their own text; on a collision the first token wins.
+    """
+    names = {}
+    for text in texts:
+        for token in TOKEN_PATTERN.findall(text.lower()) if isinstance(text, str) else []:
+            names.setdefault(zlib.crc32(token.encode('utf-8')) % n_features, token)
+    return names
+
+def _transform_chunk(args):
+    texts, features = args
+    return transform(texts, features)
+
+def transform_parallel(texts, features, workers=None, chunk_size=TRANSFORM_CHUNK_SIZE):
+    """Transform texts in chunks across a process pool; small inputs stay in-process"""
+    texts = list(texts)
+    if workers == 1 or len(texts) <= chunk_size:
+        return transform(texts, features)
+
+    chunks = [(texts[i:i + chunk_size], features) for i in range(0, len(texts), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return sparse.vstack(list(pool.map(_transform_chunk, chunks)), format='csr')
+
+def save_hashing_features(path, idf, stop_words):
+    """Store the IDF array and stop words; the column count is the IDF length"""
+    np.savez(path, idf=np.asarray(idf, dtype=np.float32), stop_words=np.asarray(sorted(stop_words), dtype=str))
+
+def load_hashing_features(path):
+    """Load features saved by save_hashing_features"""
+    with np.load(path) as stored:
+        idf = stored['idf']
+        return {
+            'idf': idf,
+            'n_features': len(idf),
+            'stop_words': frozenset(stored['stop_words'].tolist()),
+        }
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Import Time Report
+Runs `python -X importtime -c "import app"` in a fresh interpreter and breaks
+the startup cost down by top-level package, so import regressions (such as
+pandas or scikit-learn creeping back into the serving path) are easy to spot.
+
+Usage:
+    python importtime_report.py [--module app] [--runs 3] [--json report.json]
+                                [--compare previous.json] [--budget-ms 800]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+# Heavy packages that only offline tools may import
+FORBIDDEN_PACKAGES = ['pandas', 'sklearn', 'joblib']
+
+LINE_PATTERN = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)$')
+
+def measure_imports(module, env=None):
+    """Per-module (self_us, cumulative_us, depth) from one -X importtime run"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = LINE_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules[name] = (int(self_us), int(cumulative_us), (len(indent) - 1) // 2)
+    return modules
+
+def summarize(runs, module):
+    """Best-of-N totals per top-level package"""
+    best = {}
+    for modules in runs:
+        packages = defaultdict(int)
+        for name, (self_us, _, _) in modules.items():
+            packages[name.split('.')[0]] += self_us
+        for package, self_us in packages.items():
+            best[package] = min(best.get(package, self_us), self_us)
+
+    totals = [modules[module][1] for modules in runs if module in modules]
+    return {
+        'module': module,
+        'total_ms': min(totals) / 1000 if totals else None,
+        'packages_ms': {p: us / 1000 for p, us in sorted(best.items(), key=lambda item: -item[1])},
+        'forbidden_imported': sorted(p for p in FORBIDDEN_PACKAGES if p in best),
+    }
+
+def print_report(report, top, previous=None):
+    print(f"\n=== Import time for '{report['module']}': {report['total_ms']:.1f} ms ===")
+    header = f"{'package':32}{'ms':>10}"
+    if previous:
+        header += f"{'previous':>12}{'delta':>10}"
+    print(header)
+    for package, ms in list(report['packages_ms'].items())[:top]:
+        line = f"{package:32}{ms:>10.1f}"
+        if previous:
+            before = previous['packages_ms'].get(package, 0.0)
+            line += f"{before:>12.1f}{ms - before:>+10.1f}"
+        print(line)
+    if previous and previous.get('total_ms') is not None:
+        print(f"\nTotal: {report['total_ms']:.1f} ms (previous {previous['total_ms']:.1f} ms, "
+              f"{report['total_ms'] - previous['total_ms']:+.1f} ms)")
+    if report['forbidden_imported']:
+        print(f"\nWARNING: heavy packages imported at startup: {', '.join(report['forbidden_imported'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='app', help='module to import (default: app)')
+    parser.add_argument('--runs', type=int, default=3, help='runs; the fastest time per package is kept')
+    parser.add_argument('--top', type=int, default=20, help='packages to list')
+    parser.add_argument('--json', help='write the report to this JSON file')
+    parser.add_argument('--compare', help='previous JSON report to compare against')
+    parser.add_argument('--budget-ms', type=float, help='exit non-zero when the total exceeds this budget')
+    args = parser.parse_args()
+
+    runs = [measure_imports(args.module) for _ in range(args.runs)]
+    report = summarize(runs, args.module)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_report(report, args.top, previous)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json}")
+
+    ok = not report['forbidden_imported']
+    if args.budget_ms is not None and report['total_ms'] > args.budget_ms:
+        print(f"\nFAIL: {report['total_ms']:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        ok = False
+    return ok
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
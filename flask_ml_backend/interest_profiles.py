@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Interest Profiles
+Per-genre centroid vectors in the normalized content space, built once at
+load time, for users known only by their category/genre interests (no
+ratings yet). Their profile is the mean of their genres' centroids.
+
+A single-genre profile is answered from a precomputed candidate list
+without scoring at all; a multi-genre profile scores the catalog with one
+sparse mat-vec against its mean centroid, so no genres x items score matrix
+is kept in memory.
+"""
+
+import numpy as np
+from scipy import sparse
+
+from top_k import top_k_positions
+
+CANDIDATES_PER_GENRE = 200
+
+def build_genre_centroids(content_matrix, genre_matrix):
+    """Sparse genres x terms matrix: the L2-normalized mean content row of each genre"""
+    sums = (genre_matrix.T.tocsr().astype(content_matrix.dtype) @ content_matrix).tocsr()
+    norms = np.sqrt(np.asarray(sums.multiply(sums).sum(axis=1)).ravel())
+    scale = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    return (sparse.diags(scale) @ sums).tocsr()
+
+def build_interest_index(content_matrix, genre_matrix, k=CANDIDATES_PER_GENRE):
+    """Genre centroids and the top-k catalog rows and scores of each genre.
+
+    Candidates use the serving top-K selection, so each list is exactly the
+    head of the full catalog ranking for that genre. A genre's full score
+    vector only exists while its candidates are picked.
+    """
+    centroids = build_genre_centroids(content_matrix, genre_matrix)
+    n_genres, n_items = centroids.shape[0], content_matrix.shape[0]
+    k = min(k, n_items)
+
+    candidate_rows = np.empty((n_genres, k), dtype=np.int64)
+    candidate_scores = np.empty((n_genres, k), dtype=np.float64)
+    for genre in range(n_genres):
+        scores = content_matrix @ centroids[genre].toarray().ravel()
+        candidate_rows[genre] = top_k_positions(scores, k)
+        candidate_scores[genre] = scores[candidate_rows[genre]]
+
+    return {
+        'centroids': centroids,
+        'candidate_rows': candidate_rows,
+        'candidate_scores': candidate_scores,
+    }
+
+def interest_scores(index, content_matrix, genres):
+    """Cosine similarity of every catalog row to the mean centroid of the given genre columns"""
+    genres = np.asarray(genres, dtype=np.int64)
+    profile = np.asarray(index['centroids'][genres].mean(axis=0)).ravel()
+    scores = content_matrix @ profile
+    norm = np.linalg.norm(profile)
+    return scores / norm if norm > 0 else scores
+
+def match_interests(interests, genre_lookup):
+    """Genre columns named by a userInterests payload, and the genre names not in the catalog.
+
+    interests is a list of {"category": ..., "genre": ...} objects (the
+    backend's Interest model) or plain genre names; matching ignores case.
+    Only the genre is used: an interest's category is ignored, and content
+    types are restricted by the request's categoryFilter/contentType instead.
+    Raises ValueError for anything else.
+    """
+    if not isinstance(interests, list):
+        raise ValueError("userInterests must be a list")
+
+    columns, unmatched = [], []
+    for interest in interests:
+        genre = interest.get('genre') if isinstance(interest, dict) else interest
+        if not isinstance(genre, str):
+            raise ValueError("each interest must be a genre name or an object with a 'genre' string")
+        column = genre_lookup.get(genre.strip().lower())
+        if column is None:
+            unmatched.append(genre)
+        elif column not in columns:
+            columns.append(column)
+    return np.asarray(columns, dtype=np.int64), unmatched
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Inverted Index
+Term-at-a-time scoring engine (SCORING_ENGINE=inverted in app.py). The
+normalized catalog is also stored as posting lists, one per term (the CSC
+arrays: item rows in ascending order and their weights), with each term's
+largest weight. A query reads only the posting lists of the profile's
+nonzero terms, so its cost follows their lengths instead of the catalog
+size.
+
+MaxScore pruning keeps the top-K exact. Terms are taken in decreasing order
+of their score bound (profile value x largest posting weight) and added to
+a per-thread accumulator in batches of 1, 2, 4, ... terms. After each batch
+the best partial candidates are scored in full, and once the k-th of those
+scores exceeds the bounds of all remaining terms combined, no unseen item
+can reach the top-K. The remaining terms are non-essential: they only add
+to candidates that can still make it, merged in one batch for short lists
+and by binary search per candidate for lists longer than the candidate
+set. Survivors are re-scored from their CSR rows, as app.score_items scores
+them, and selected with the same tie-break, so results match the matrix
+engine. Weights must be non-negative (TF-IDF and hashed features are).
+
+Merging postings in NumPy costs several times more per entry than one
+fused sparse product, so choose_engine sends a query to the index only
+when its lists hold a small share of the catalog nonzeros.
+
+Usage (both engines on a synthetic or saved catalog):
+    python inverted_index.py [--items 1000000] [--liked 1,5,20] [--queries 50] [--k 10] [--zipf 0]
+    python inverted_index.py --catalog hashed_content_matrix.npz
+"""
+
+import argparse
+import sys
+import threading
+import time
+
+import numpy as np
+from scipy import sparse
+
+from filter_engine import rows_selected
+from top_k import top_k_positions
+
+SCORING_ENGINES = ('matrix', 'inverted')
+PRUNE_TOLERANCE = 1e-9     # relative slack on thresholds, for summation order differences between engines
+# The index answers a query when its posting lists hold at most this share of the catalog nonzeros;
+# past that, one fused sparse product over the whole matrix is faster than merging postings in NumPy
+INDEX_POSTINGS_FRACTION = 0.05
+
+_local = threading.local()  # per-thread score accumulator, see _accumulator
+
+# --- Index ---
+def build_inverted_index(content_matrix):
+    """Posting lists (CSC arrays) of a normalized catalog and the largest weight of each term"""
+    postings = sparse.csc_matrix(content_matrix)
+    postings.eliminate_zeros()
+    postings.sort_indices()
+    max_weights = np.zeros(postings.shape[1])
+    nonempty = np.flatnonzero(np.diff(postings.indptr))
+    if len(nonempty):
+        max_weights[nonempty] = np.maximum.reduceat(postings.data, postings.indptr[nonempty])
+    return {'indptr': postings.indptr, 'rows': postings.indices, 'weights': postings.data,
+            'max_weights': max_weights, 'n_items': postings.shape[0]}
+
+def posting_count(index, terms):
+    """Total length of the posting lists of terms"""
+    return int((index['indptr'][terms + 1] - index['indptr'][terms]).sum())
+
+def choose_engine(index, terms, fraction=INDEX_POSTINGS_FRACTION):
+    """'inverted' when the query's posting lists are short enough to beat scoring every row, else 'matrix'"""
+    return 'inverted' if posting_count(index, terms) <= fraction * len(index['rows']) else 'matrix'
+
+def _posting(index, term):
+    start, end = index['indptr'][term], index['indptr'][term + 1]
+    return index['rows'][start:end], index['weights'][start:end]
+
+def _allowed(rows, excluded, bits):
+    """Mask of the rows neither excluded nor outside the packed selection"""
+    keep = np.ones(len(rows), dtype=bool)
+    if excluded is not None and len(excluded):
+        keep &= ~np.isin(rows, excluded)
+    if bits is not None:
+        keep &= rows_selected(bits, rows)
+    return keep
+
+def _kth_score(scores, k):
+    """k-th highest score, or 0 with fewer than k (rows outside the postings score 0)"""
+    if len(scores) < k:
+        return 0.0
+    return np.partition(scores, len(scores) - k)[len(scores) - k]
+
+def _gather(index, terms, values):
+    """Concatenated posting rows of terms and their contributions (weight x profile value)"""
+    postings = [_posting(index, term) for term in terms]
+    rows = np.concatenate([rows for rows, _ in postings])
+    contributions = np.concatenate([weights * value for (_, weights), value in zip(postings, values)])
+    return rows, contributions
+
+def _seed_threshold(content_matrix, profile, rows, partial, k):
+    """k-th highest full score among the k best partial scores: a lower bound on the final k-th
+    score that is much tighter than the partial one"""
+    if len(rows) < k:
+        return 0.0
+    seeds = rows[np.argpartition(partial, len(rows) - k)[len(rows) - k:]]
+    return (content_matrix[seeds] @ profile).min()
+
+def _accumulator(n_items):
+    """This thread's score buffer over the catalog, all zero between queries"""
+    buffer = getattr(_local, 'accumulator', None)
+    if buffer is None or len(buffer) != n_items:
+        buffer = _local.accumulator = np.zeros(n_items)
+    return buffer
+
+# --- Query ---
+def inverted_top_k(index, content_matrix, profile, k, excluded=None, bits=None, terms=None):
+    """(rows, scores, postings read) of the top k catalog rows for a dense profile, best first.
+
+    excluded holds rows to leave out and bits is a packed catalog selection
+    (filter_engine), as for the matrix engine. terms are the profile's nonzero
+    columns when the caller knows them (the liked rows' terms), which saves a
+    scan of the whole vocabulary.
+    """
+    if terms is None:
+        terms = np.flatnonzero(profile)
+    values = profile[terms]
+    terms, values = terms[values > 0], values[values > 0]
+    bounds = values * index['max_weights'][terms]
+    order = np.argsort(-bounds, kind='stable')
+    terms, values, bounds = terms[order], values[order], bounds[order]
+    # remaining[j]: the most the terms from j on can add to any score
+    remaining = np.append(np.cumsum(bounds[::-1])[::-1], 0.0)
+
+    # Essential terms: the fewest leading terms whose candidates' k-th score beats every remaining
+    # bound, accumulated into the dense buffer in batches ending after 1, 2, 4, ... terms
+    accumulator = _accumulator(index['n_items'])
+    touched = []
+    rows = np.empty(0, dtype=index['rows'].dtype)
+    essential, threshold, read = 0, 0.0, 0
+    try:
+        while essential < len(terms):
+            end = min(max(1, 2 * essential), len(terms))
+            posting_rows, contributions = _gather(index, terms[essential:end], values[essential:end])
+            new_rows = posting_rows[accumulator[posting_rows] == 0]
+            touched.append(new_rows)
+            # Deduplicate without sorting: the last write of each row's position wins
+            positions = np.arange(1, len(new_rows) + 1, dtype=np.float64)
+            accumulator[new_rows] = positions
+            new_rows = new_rows[accumulator[new_rows] == positions]
+            accumulator[new_rows] = 0
+            np.add.at(accumulator, posting_rows, contributions)
+            read += len(posting_rows)
+            essential = end
+
+            rows = np.concatenate([rows, new_rows[_allowed(new_rows, excluded, bits)]])
+            threshold = max(threshold, _seed_threshold(content_matrix, profile, rows, accumulator[rows], k))
+            if remaining[essential] < threshold * (1 - PRUNE_TOLERANCE):
+                break
+        rows = np.sort(rows)
+        partial = accumulator[rows]
+    finally:
+        for seen in touched:
+            accumulator[seen] = 0
+
+    # Non-essential terms only add to candidates that can still make the top k. Lists shorter than
+    # the candidate set are merged in one batch; longer ones are searched for each survivor.
+    floor = threshold * (1 - PRUNE_TOLERANCE)
+    rest = np.arange(essential, len(terms))
+    alive = partial + remaining[essential] >= floor
+    rows, partial = rows[alive], partial[alive]
+    lengths = index['indptr'][terms[rest] + 1] - index['indptr'][terms[rest]]
+    short, long = rest[lengths <= len(rows)], rest[lengths > len(rows)]
+    if len(short) and len(rows):
+        posting_rows, contributions = _gather(index, terms[short], values[short])
+        positions = np.minimum(np.searchsorted(rows, posting_rows), len(rows) - 1)
+        found = rows[positions] == posting_rows
+        partial += np.bincount(positions[found], weights=contributions[found], minlength=len(rows))
+        read += len(posting_rows)
+        threshold = max(threshold, _kth_score(partial, k))
+        floor = threshold * (1 - PRUNE_TOLERANCE)
+
+    bound = bounds[long].sum()
+    for j in long:
+        alive = partial + bound >= floor
+        rows, partial = rows[alive], partial[alive]
+        posting_rows, weights = _posting(index, terms[j])
+        positions = np.minimum(np.searchsorted(posting_rows, rows), len(posting_rows) - 1)
+        found = posting_rows[positions] == rows
+        partial[found] += values[j] * weights[positions[found]]
+        read += len(rows)
+        bound -= bounds[j]
+        threshold = max(threshold, _kth_score(partial, k))
+        floor = threshold * (1 - PRUNE_TOLERANCE)
+    rows = rows[partial >= floor]
+
+    # Exact scores of the survivors, summed as the matrix engine sums them
+    scores = content_matrix[rows] @ profile
+    norm = np.linalg.norm(profile)
+    if norm > 0:
+        scores = scores / norm
+    top = top_k_positions(scores, k)
+    top_rows, top_scores = rows[top], scores[top]
+    if len(top_rows) < k:
+        filler = zero_score_rows(index['n_items'], k - len(top_rows), rows, excluded, bits)
+        top_rows = np.concatenate([top_rows, filler])
+        top_scores = np.concatenate([top_scores, np.zeros(len(filler))])
+    return top_rows, top_scores, read
+
+def zero_score_rows(n_items, count, scored, excluded=None, bits=None):
+    """The last count allowed rows outside scored, highest first: the rows the matrix engine ranks
+    after every positive score (rare, reads the whole catalog)"""
+    rows = np.arange(n_items - 1, -1, -1)
+    skipped = scored if excluded is None else np.union1d(scored, np.asarray(excluded, dtype=np.int64))
+    rows = rows[_allowed(rows, skipped, bits)]
+    return rows[:count]
+
+# --- Benchmark ---
+def idf_weighted(matrix):
+    """Rows reweighted by smoothed IDF and renormalized, so frequent terms weigh little as in TF-IDF"""
+    n_items = matrix.shape[0]
+    idf = np.log((1 + n_items) / (1 + np.bincount(matrix.indices, minlength=matrix.shape[1]))) + 1
+    weighted = sparse.csr_matrix((matrix.data * idf[matrix.indices], matrix.indices, matrix.indptr), shape=matrix.shape)
+    norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+    weighted = (sparse.diags(1.0 / np.maximum(norms, 1e-12)) @ weighted).tocsr()
+    weighted.sort_indices()
+    return weighted
+
+def matrix_top_k(content_matrix, profile, k, excluded):
+    """Reference matrix engine: score every row, mask, select (app.rank_recommendations)"""
+    scores = content_matrix @ profile
+    norm = np.linalg.norm(profile)
+    scores = scores / norm if norm > 0 else scores
+    scores[excluded] = -np.inf
+    top = top_k_positions(scores, k)
+    return top, scores[top]
+
+def run_benchmark(matrix, liked_counts, n_queries, k, seed=42):
+    """Latency of both engines and the postings read, for profiles built from 1, 5, ... liked rows"""
+    from sharded_scoring import random_queries
+    start = time.perf_counter()
+    index = build_inverted_index(matrix)
+    build_seconds = time.perf_counter() - start
+    index_mb = sum(index[name].nbytes for name in ('indptr', 'rows', 'weights', 'max_weights')) / 2 ** 20
+
+    print(f"=== Inverted index vs matrix scoring, {matrix.shape[0]} items x {matrix.shape[1]} terms, "
+          f"{matrix.nnz} nonzeros, top {k} ===")
+    print(f"  index built in {build_seconds:.1f}s, {index_mb:.1f} MB")
+    print(f"  {'liked':>6}{'terms':>7}{'postings':>10}{'read':>9}{'matrix ms':>11}{'inverted ms':>13}{'speedup':>9}"
+          f"{'chosen':>10}")
+    matches = True
+    for liked in liked_counts:
+        queries, excluded = random_queries(matrix, n_queries, liked_per_query=liked, seed=seed)
+        matrix_latencies, inverted_latencies, terms, postings, read, engines = [], [], [], [], [], []
+        for profile, rows in zip(queries, excluded):
+            start = time.perf_counter()
+            want_rows, want_scores = matrix_top_k(matrix, profile, k, rows)
+            matrix_latencies.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            # The profile's terms come from its liked rows, as in app.py
+            query_terms = np.unique(matrix[rows].indices)
+            got_rows, got_scores, got_read = inverted_top_k(index, matrix, profile, k, rows, terms=query_terms)
+            inverted_latencies.append(time.perf_counter() - start)
+
+            matches &= np.array_equal(got_rows, want_rows) and np.array_equal(got_scores, want_scores)
+            terms.append(len(query_terms))
+            postings.append(posting_count(index, query_terms))
+            read.append(got_read)
+            engines.append(choose_engine(index, query_terms))
+        matrix_ms, inverted_ms = np.median(matrix_latencies) * 1000, np.median(inverted_latencies) * 1000
+        print(f"  {liked:>6}{np.median(terms):>7.0f}{np.median(postings):>10.0f}{np.median(read):>9.0f}"
+              f"{matrix_ms:>11.3f}{inverted_ms:>13.3f}{matrix_ms / inverted_ms:>9.2f}"
+              f"{max(set(engines), key=engines.count):>10}")
+    print("  postings: lengths of the query terms' lists; read: entries scored or looked up (medians);")
+    print(f"  chosen: the engine choose_engine picks for most queries (index up to "
+          f"{INDEX_POSTINGS_FRACTION:.0%} of the nonzeros)")
+    print(f"  results identical to matrix scoring: {matches}")
+    return matches
+
+def main():
+    from sharded_scoring import random_catalog
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--catalog', help='saved .npz content matrix (default: synthetic catalog)')
+    parser.add_argument('--items', type=int, default=1_000_000, help='synthetic catalog rows')
+    parser.add_argument('--terms', type=int, default=2 ** 18, help='synthetic catalog columns')
+    parser.add_argument('--terms-per-item', type=int, default=12, help='nonzeros per synthetic row')
+    parser.add_argument('--zipf', type=float, default=1.3, help='synthetic term skew, 0 for uniform terms')
+    parser.add_argument('--liked', default='1,5,20', help='liked rows per profile, compared in turn')
+    parser.add_argument('--queries', type=int, default=50, help='timed profiles per row')
+    parser.add_argument('--k', type=int, default=10, help='recommendations per profile')
+    args = parser.parse_args()
+
+    if args.catalog:
+        matrix = sparse.load_npz(args.catalog).tocsr()
+        matrix.sort_indices()
+    else:
+        matrix = idf_weighted(random_catalog(args.items, args.terms, args.terms_per_item, zipf=args.zipf))
+    return run_benchmark(matrix, [int(liked) for liked in args.liked.split(',')], args.queries, args.k)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
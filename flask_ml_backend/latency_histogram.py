@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Latency Histogram
+HDR-style log-linear histogram of integer microsecond latencies: values are
+bucketed with a fixed relative precision (about 1.6% with the default 7
+sub-bucket bits), so percentiles stay accurate from microseconds to minutes
+in a few kilobytes, and histograms from different threads can be merged.
+"""
+
+import math
+
+SUB_BUCKET_BITS = 7
+
+# Percentiles printed by percentile_distribution, HDR style
+DISTRIBUTION_PERCENTILES = [0.0, 50.0, 75.0, 90.0, 95.0, 99.0, 99.9, 99.99, 100.0]
+
+class LatencyHistogram:
+    """Counts of microsecond values in log-linear buckets (not thread-safe; merge per-thread copies)"""
+
+    def __init__(self, sub_bucket_bits=SUB_BUCKET_BITS):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.half_count = self.sub_bucket_count >> 1
+        self.counts = {}
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        if value < self.sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        return self.sub_bucket_count + (shift - 1) * self.half_count + ((value >> shift) - self.half_count)
+
+    def _highest_equivalent(self, index):
+        """Largest value that falls in a bucket"""
+        if index < self.sub_bucket_count:
+            return index
+        shift, top = divmod(index - self.sub_bucket_count, self.half_count)
+        shift += 1
+        return ((top + self.half_count + 1) << shift) - 1
+
+    def record(self, micros, count=1):
+        value = max(0, int(micros))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        if other.total:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def percentile(self, percent):
+        """Value at a percentile (0-100), reported as the top of its bucket and capped at the max"""
+        if not self.total:
+            return 0
+        target = min(self.total, max(1, math.ceil(self.total * percent / 100.0)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max)
+        return self.max
+
+    def mean(self):
+        return self.sum / self.total if self.total else 0.0
+
+    def percentile_distribution(self, percentiles=DISTRIBUTION_PERCENTILES):
+        """(percentile, value_us) rows for reporting"""
+        return [(p, self.percentile(p)) for p in percentiles]
+
+    def to_dict(self):
+        return {
+            'count': self.total,
+            'min_us': self.min or 0,
+            'mean_us': self.mean(),
+            'max_us': self.max or 0,
+            'percentiles_us': {str(p): v for p, v in self.percentile_distribution()},
+        }
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Load Test
+Concurrent load generator for the recommendation API. Drives the app either
+in-process through its WSGI interface or over HTTP against a running server,
+with a weighted request mix and Zipfian user popularity, and reports
+throughput plus HDR-style latency histograms per endpoint.
+
+Closed loop: each of --concurrency workers sends its next request as soon as
+the previous one completes. Open loop: requests arrive at --rate per second
+(Poisson) whether or not earlier ones finished, and latency is measured from
+the scheduled arrival so queueing delay is included. --sweep repeats the run
+over several concurrency levels (closed) or rates (open) to find the
+saturation point.
+
+Usage:
+    python load_test.py [--target wsgi|http://localhost:5000] [--app app|app_multi_content]
+                        [--mode closed|open] [--concurrency 8] [--rate 200] [--duration 20]
+                        [--mix recommend=60,search=15,popular=15,stats=10] [--zipf 1.1]
+                        [--sweep 1,2,4,8,16] [--json results.json]
+"""
+
+import argparse
+import http.client
+import importlib
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from latency_histogram import LatencyHistogram
+
+DEFAULT_MIX = 'recommend=60,search=15,popular=15,stats=10'
+ENDPOINTS = ['recommend', 'search', 'popular', 'stats']
+SEARCH_TERMS = ['star', 'love', 'war', 'night', 'man', 'city', 'dark', 'story', 'king', 'life']
+CONTENT_TYPES = ['movies', 'tv_shows', 'podcasts', 'books']
+DEFAULT_ZIPF_EXPONENT = 1.1
+DEFAULT_HTTP_USERS = 1000
+HTTP_TIMEOUT_SECONDS = 30
+SEED = 42
+
+# Saturation is reported at the first sweep level that adds less than this much throughput
+SATURATION_GAIN = 0.10
+
+# --- Request Generation ---
+def parse_mix(mix):
+    """'recommend=60,search=15' -> {'recommend': 60.0, 'search': 15.0}"""
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"unknown endpoint '{name}' in mix (expected {', '.join(ENDPOINTS)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+def make_request_generator(mix, user_ids, zipf_exponent, seed):
+    """Function returning (endpoint, method, path, body) for the next request of a worker"""
+    names = list(mix)
+    endpoint_cdf = np.cumsum([mix[name] for name in names])
+    endpoint_cdf /= endpoint_cdf[-1]
+
+    # Zipfian popularity over users, ranks shuffled across ids
+    rng = np.random.default_rng(seed)
+    user_ids = np.asarray(user_ids)[rng.permutation(len(user_ids))]
+    user_cdf = np.cumsum(1.0 / np.arange(1, len(user_ids) + 1) ** zipf_exponent)
+    user_cdf /= user_cdf[-1]
+
+    def next_request(worker_rng):
+        draw, user_draw, pick = worker_rng.random(3)
+        endpoint = names[min(int(np.searchsorted(endpoint_cdf, draw)), len(names) - 1)]
+        user_id = int(user_ids[min(int(np.searchsorted(user_cdf, user_draw)), len(user_ids) - 1)])
+        if endpoint == 'recommend':
+            return endpoint, 'POST', '/recommend', {'userId': user_id, 'numRecommendations': 10}
+        if endpoint == 'search':
+            return endpoint, 'GET', f'/content/search?q={SEARCH_TERMS[int(pick * len(SEARCH_TERMS))]}&limit=10', None
+        if endpoint == 'popular':
+            return endpoint, 'GET', f'/content/popular?type={CONTENT_TYPES[int(pick * len(CONTENT_TYPES))]}&limit=10', None
+        return endpoint, 'GET', f'/user/{user_id}/stats', None
+
+    return next_request
+
+# --- Transports ---
+def load_wsgi_app(module_name):
+    """Import an app module in-process and load its model; returns (module, user ids)"""
+    module = importlib.import_module(module_name)
+    loader = getattr(module, 'load_model_artifacts', None) or getattr(module, 'load_multi_content_artifacts')
+    if not loader():
+        raise RuntimeError(f"{module_name} failed to load its model")
+    return module, module.ratings_index['user_ids']
+
+def wsgi_sender(module):
+    """Per-thread send(method, path, body) -> status through the Flask test client"""
+    client = module.app.test_client()
+
+    def send(method, path, body):
+        response = client.open(path, method=method, json=body)
+        response.close()
+        return response.status_code
+
+    return send
+
+def http_sender(base_url):
+    """Per-thread send(method, path, body) -> status over a keep-alive HTTP connection"""
+    url = urlsplit(base_url)
+    state = {'connection': None}
+
+    def send(method, path, body):
+        if state['connection'] is None:
+            state['connection'] = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=HTTP_TIMEOUT_SECONDS)
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        try:
+            state['connection'].request(method, path, body=payload, headers=headers)
+            response = state['connection'].getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            state['connection'].close()
+            state['connection'] = None
+            raise
+
+    return send
+
+# --- Load Generation ---
+def _worker_result():
+    return {'histograms': {}, 'errors': {}}
+
+def _record(result, endpoint, latency_ns, failed):
+    histogram = result['histograms'].get(endpoint)
+    if histogram is None:
+        histogram = result['histograms'][endpoint] = LatencyHistogram()
+    histogram.record(latency_ns // 1000)
+    if failed:
+        result['errors'][endpoint] = result['errors'].get(endpoint, 0) + 1
+
+def _send(send, method, path, body):
+    """True when the request failed (exception or 5xx)"""
+    try:
+        return send(method, path, body) >= 500
+    except Exception:
+        return True
+
+def run_closed_loop(make_sender, next_request, concurrency, duration):
+    deadline = time.perf_counter() + duration
+    results = [_worker_result() for _ in range(concurrency)]
+
+    def worker(index):
+        send = make_sender()
+        rng = np.random.default_rng(SEED + index)
+        while time.perf_counter() < deadline:
+            endpoint, method, path, body = next_request(rng)
+            start = time.perf_counter_ns()
+            failed = _send(send, method, path, body)
+            _record(results[index], endpoint, time.perf_counter_ns() - start, failed)
+
+    return _run_workers(worker, concurrency), results
+
+def run_open_loop(make_sender, next_request, concurrency, duration, rate):
+    """Poisson arrivals at `rate`; latency includes time spent waiting for a free worker"""
+    rng = np.random.default_rng(SEED)
+    offsets = np.cumsum(rng.exponential(1.0 / rate, size=int(rate * duration * 1.2) + 1))
+    offsets = offsets[offsets < duration]
+    start = time.perf_counter() + 0.1
+
+    arrivals = queue.Queue()
+    for offset in offsets.tolist():
+        arrivals.put(start + offset)
+    results = [_worker_result() for _ in range(concurrency)]
+
+    def worker(index):
+        send = make_sender()
+        worker_rng = np.random.default_rng(SEED + index)
+        while True:
+            try:
+                scheduled = arrivals.get_nowait()
+            except queue.Empty:
+                return
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            endpoint, method, path, body = next_request(worker_rng)
+            failed = _send(send, method, path, body)
+            latency_ns = int((time.perf_counter() - scheduled) * 1e9)
+            _record(results[index], endpoint, latency_ns, failed)
+
+    return _run_workers(worker, concurrency), results
+
+def _run_workers(worker, concurrency):
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+def summarize(elapsed, worker_results, mode, concurrency, rate):
+    """Merge per-worker histograms into per-endpoint and overall summaries"""
+    histograms = {}
+    errors = {}
+    for result in worker_results:
+        for endpoint, histogram in result['histograms'].items():
+            histograms.setdefault(endpoint, LatencyHistogram()).merge(histogram)
+        for endpoint, count in result['errors'].items():
+            errors[endpoint] = errors.get(endpoint, 0) + count
+
+    overall = LatencyHistogram()
+    for histogram in histograms.values():
+        overall.merge(histogram)
+
+    return {
+        'mode': mode,
+        'concurrency': concurrency,
+        'rate': rate,
+        'elapsed_seconds': elapsed,
+        'requests': overall.total,
+        'errors': sum(errors.values()),
+        'throughput': overall.total / elapsed if elapsed else 0.0,
+        'latency': overall.to_dict(),
+        'endpoints': {
+            endpoint: {
+                'requests': histogram.total,
+                'errors': errors.get(endpoint, 0),
+                'throughput': histogram.total / elapsed if elapsed else 0.0,
+                'latency': histogram.to_dict(),
+            }
+            for endpoint, histogram in sorted(histograms.items())
+        },
+        '_histogram': overall,
+    }
+
+# --- Reporting ---
+def _ms(micros):
+    return micros / 1000.0
+
+def print_summary(summary):
+    level = f"rate {summary['rate']}/s, " if summary['mode'] == 'open' else ''
+    print(f"\n=== {summary['mode']} loop, {level}concurrency {summary['concurrency']}: "
+          f"{summary['requests']} requests in {summary['elapsed_seconds']:.1f}s, "
+          f"{summary['throughput']:.1f} req/s, {summary['errors']} errors ===")
+    print(f"{'endpoint':12}{'requests':>10}{'req/s':>10}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}"
+          f"{'p99 ms':>10}{'p99.9 ms':>10}{'max ms':>10}")
+    rows = list(summary['endpoints'].items()) + [('all', {
+        'requests': summary['requests'], 'throughput': summary['throughput'],
+        'errors': summary['errors'], 'latency': summary['latency']
+    })]
+    for endpoint, stats in rows:
+        p = stats['latency']['percentiles_us']
+        print(f"{endpoint:12}{stats['requests']:>10}{stats['throughput']:>10.1f}{stats['errors']:>8}"
+              f"{_ms(p['50.0']):>10.2f}{_ms(p['90.0']):>10.2f}"
+              f"{_ms(p['99.0']):>10.2f}{_ms(p['99.9']):>10.2f}{_ms(stats['latency']['max_us']):>10.2f}")
+
+    print("\nLatency distribution (all requests):")
+    print(f"{'percentile':>12}{'value ms':>12}")
+    for percent, value in summary['_histogram'].percentile_distribution():
+        print(f"{percent:>12.2f}{_ms(value):>12.2f}")
+
+def print_sweep(summaries):
+    key = 'rate' if summaries[0]['mode'] == 'open' else 'concurrency'
+    print(f"\n=== Sweep over {key} ===")
+    print(f"{key:>12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    saturated = None
+    for previous, summary in zip([None] + summaries[:-1], summaries):
+        p = summary['latency']['percentiles_us']
+        print(f"{summary[key]:>12}{summary['throughput']:>10.1f}{_ms(p['50.0']):>10.2f}{_ms(p['99.0']):>10.2f}"
+              f"{summary['errors']:>8}")
+        if (saturated is None and previous is not None
+                and summary['throughput'] < previous['throughput'] * (1 + SATURATION_GAIN)):
+            saturated = previous[key]
+    if saturated is not None:
+        print(f"\nThroughput stops scaling after {key} {saturated}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', default='wsgi', help="'wsgi' (in-process) or a server URL")
+    parser.add_argument('--app', default='app', help='app module for the wsgi target (app or app_multi_content)')
+    parser.add_argument('--mode', choices=['closed', 'open'], default='closed')
+    parser.add_argument('--concurrency', type=int, default=8, help='worker threads')
+    parser.add_argument('--rate', type=float, default=200.0, help='open loop arrivals per second')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds per run')
+    parser.add_argument('--warmup', type=float, default=2.0, help='closed loop warm-up seconds (not reported)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='endpoint weights')
+    parser.add_argument('--zipf', type=float, default=DEFAULT_ZIPF_EXPONENT, help='Zipf exponent of user popularity')
+    parser.add_argument('--users', type=int, default=DEFAULT_HTTP_USERS, help='user id range for the http target')
+    parser.add_argument('--sweep', help='comma separated concurrency levels (closed) or rates (open)')
+    parser.add_argument('--json', help='write results to this JSON file')
+    parser.add_argument('--with-logging', action='store_true', help='keep the app INFO logging in wsgi mode')
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.target == 'wsgi':
+        if not args.with_logging:
+            logging.disable(logging.INFO)
+        module, user_ids = load_wsgi_app(args.app)
+        make_sender = lambda: wsgi_sender(module)
+    else:
+        user_ids = np.arange(1, args.users + 1)
+        make_sender = lambda: http_sender(args.target)
+    next_request = make_request_generator(mix, user_ids, args.zipf, SEED)
+
+    if args.warmup > 0:
+        run_closed_loop(make_sender, next_request, args.concurrency, args.warmup)
+
+    levels = [float(v) for v in args.sweep.split(',')] if args.sweep else [None]
+    summaries = []
+    for level in levels:
+        if args.mode == 'open':
+            rate = level or args.rate
+            elapsed, results = run_open_loop(make_sender, next_request, args.concurrency, args.duration, rate)
+            summary = summarize(elapsed, results, 'open', args.concurrency, rate)
+        else:
+            concurrency = int(level or args.concurrency)
+            elapsed, results = run_closed_loop(make_sender, next_request, concurrency, args.duration)
+            summary = summarize(elapsed, results, 'closed', concurrency, None)
+        print_summary(summary)
+        summaries.append(summary)
+
+    if len(summaries) > 1:
+        print_sweep(summaries)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'target': args.target, 'app': args.app, 'mix': mix, 'zipf': args.zipf,
+                       'runs': [{k: v for k, v in s.items() if k != '_histogram'} for s in summaries]}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    return all(s['errors'] == 0 for s in summaries)
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
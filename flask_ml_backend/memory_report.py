@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Memory Report
+Bytes held by each loaded model structure, for sizing containers. Every
+structure is walked deeply: DataFrames per column (object columns
+included), sparse matrices per data/indices/indptr array, dicts of arrays
+per key, and caches through their containers. Arrays backed by a memory
+map (snapshot serving) are reported as mapped bytes, which are shared
+between workers on a host, rather than as heap. Objects reachable from
+several structures are counted once, under the first structure listed.
+
+The process side comes from /proc/self/smaps_rollup: RSS, PSS and the
+shared and private pages, so the report shows how much of RSS the listed
+structures explain.
+
+GET /debug/memory returns the report as JSON; like /debug/profile it is
+disabled unless ADMIN_TOKEN is set (sent in the X-Admin-Token header).
+
+Usage (the same report without starting the server):
+    python memory_report.py [model_snapshot] [--json memory.json]
+"""
+
+import argparse
+import hmac
+import json
+import mmap
+import sys
+import types
+
+import numpy as np
+from scipy import sparse
+
+from flask import jsonify, request
+from sampling_profiler import ADMIN_TOKEN, ADMIN_TOKEN_HEADER
+
+SMAPS_ROLLUP_PATH = '/proc/self/smaps_rollup'
+# smaps_rollup fields reported, in kB in the file
+SMAPS_FIELDS = {'Rss': 'rss', 'Pss': 'pss', 'Shared_Clean': 'shared_clean', 'Shared_Dirty': 'shared_dirty',
+                'Private_Clean': 'private_clean', 'Private_Dirty': 'private_dirty', 'Anonymous': 'anonymous'}
+SKIPPED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+# --- Deep Sizes ---
+def _buffer_owner(array):
+    """Array owning the memory behind a view, and whether that memory is a memory map"""
+    owner = array
+    while isinstance(owner.base, np.ndarray):
+        owner = owner.base
+    return owner, isinstance(owner, np.memmap) or isinstance(owner.base, mmap.mmap)
+
+def _array_size(array, seen):
+    """(heap bytes, mapped bytes) of an array's buffer, counted once per owning array"""
+    owner, mapped = _buffer_owner(array)
+    if id(owner) in seen:
+        return 0, 0
+    seen.add(id(owner))
+    size = owner.nbytes
+    if array.dtype == object:
+        size += sum(deep_size(value, seen)[0] for value in array.ravel().tolist())
+    return (0, size) if mapped else (size, 0)
+
+def deep_size(obj, seen):
+    """(heap bytes, mapped bytes) held by an object and everything it references that is not in seen"""
+    if isinstance(obj, np.ndarray):
+        return _array_size(obj, seen)
+    if obj is None or isinstance(obj, SKIPPED_TYPES) or id(obj) in seen:
+        return 0, 0
+    seen.add(id(obj))
+
+    heap, mapped = sys.getsizeof(obj), 0
+    if isinstance(obj, dict):
+        children = [value for item in obj.items() for value in item]
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        children = list(obj)
+    elif isinstance(obj, (str, bytes, bytearray, int, float, bool)):
+        children = []
+    else:
+        children = list(getattr(obj, '__dict__', {}).values())
+        children += [getattr(obj, slot) for slot in getattr(type(obj), '__slots__', ()) if hasattr(obj, slot)]
+    for child in children:
+        child_heap, child_mapped = deep_size(child, seen)
+        heap += child_heap
+        mapped += child_mapped
+    return heap, mapped
+
+def _parts(obj):
+    """Named components of a structure worth listing on their own"""
+    if sparse.issparse(obj) and hasattr(obj, 'indptr'):
+        return {'data': obj.data, 'indices': obj.indices, 'indptr': obj.indptr}
+    if isinstance(obj, dict) and obj and all(isinstance(key, str) for key in obj):
+        return obj
+    return None
+
+def structure_report(name, obj, seen):
+    """Size entry of one structure, with a per-component breakdown where it has one"""
+    entry = {'name': name, 'type': type(obj).__name__, 'bytes': 0, 'mapped_bytes': 0}
+    if type(obj).__name__ == 'DataFrame' and hasattr(obj, 'memory_usage'):
+        # pandas counts the strings of object columns with deep=True
+        usage = obj.memory_usage(index=True, deep=True)
+        entry['parts'] = {str(column): int(size) for column, size in usage.items()}
+        entry['bytes'] = int(usage.sum())
+        seen.add(id(obj))
+        # Strings of object and string columns are often shared with catalog arrays; count them here only
+        for column in obj.columns:
+            if obj[column].dtype.kind == 'O':
+                seen.update(id(value) for value in obj[column].to_numpy().tolist())
+        return entry
+
+    parts = _parts(obj)
+    if parts is None:
+        entry['bytes'], entry['mapped_bytes'] = deep_size(obj, seen)
+        return entry
+    seen.add(id(obj))
+    entry['parts'] = {}
+    for part_name, part in parts.items():
+        heap, mapped = deep_size(part, seen)
+        entry['parts'][part_name] = heap + mapped
+        entry['bytes'] += heap
+        entry['mapped_bytes'] += mapped
+    return entry
+
+# --- Process Memory ---
+def process_memory(path=SMAPS_ROLLUP_PATH):
+    """RSS, PSS and shared/private page totals of this process in bytes (RSS only off Linux)"""
+    try:
+        with open(path) as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line and not line.startswith(' '))
+        memory = {key: int(fields[field].split()[0]) * 1024 for field, key in SMAPS_FIELDS.items() if field in fields}
+        memory['shared'] = memory.get('shared_clean', 0) + memory.get('shared_dirty', 0)
+        memory['private'] = memory.get('private_clean', 0) + memory.get('private_dirty', 0)
+        return memory
+    except (OSError, ValueError):
+        import resource
+        # ru_maxrss is the peak, in kB on Linux and bytes on macOS
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return {'max_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale}
+
+def memory_report(structures):
+    """Report for a dict of structure name -> object (None entries are skipped), largest first"""
+    seen = set()
+    entries = [structure_report(name, obj, seen) for name, obj in structures.items() if obj is not None]
+    entries.sort(key=lambda entry: entry['bytes'] + entry['mapped_bytes'], reverse=True)
+    return {
+        'structures': entries,
+        'total_bytes': sum(entry['bytes'] for entry in entries),
+        'total_mapped_bytes': sum(entry['mapped_bytes'] for entry in entries),
+        'process': process_memory(),
+    }
+
+# --- Endpoint ---
+def register_memory_endpoint(app, structures):
+    """Add the admin-only GET /debug/memory endpoint; structures() returns the loaded structures by name"""
+
+    @app.route('/debug/memory', methods=['GET'])
+    def debug_memory():
+        """Deep size of every loaded model structure and the process memory"""
+        if not ADMIN_TOKEN:
+            return jsonify({"error": "Memory reports are disabled. Set ADMIN_TOKEN to enable them."}), 403
+        if not hmac.compare_digest(request.headers.get(ADMIN_TOKEN_HEADER, ''), ADMIN_TOKEN):
+            return jsonify({"error": "Forbidden"}), 403
+        return jsonify(memory_report(structures()))
+
+    return app
+
+# --- CLI ---
+def _mb(size):
+    return f"{size / 2 ** 20:.1f}"
+
+def print_report(report, max_parts=8):
+    print(f"  {'structure':<28}{'type':<16}{'heap MB':>10}{'mapped MB':>11}")
+    for entry in report['structures']:
+        print(f"  {entry['name']:<28}{entry['type']:<16}{_mb(entry['bytes']):>10}{_mb(entry['mapped_bytes']):>11}")
+        parts = sorted(entry.get('parts', {}).items(), key=lambda part: part[1], reverse=True)
+        for part_name, size in parts[:max_parts]:
+            print(f"    {part_name:<40}{_mb(size):>10}")
+        if len(parts) > max_parts:
+            print(f"    ... {len(parts) - max_parts} more")
+    print(f"  {'total':<44}{_mb(report['total_bytes']):>10}{_mb(report['total_mapped_bytes']):>11}")
+    print("  process: " + ", ".join(f"{key} {_mb(size)} MB" for key, size in report['process'].items()))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('snapshot', nargs='?', help='model snapshot directory (default: the CSV files, as app.py)')
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+
+    import app
+    loaded = app.load_snapshot_artifacts(args.snapshot) if args.snapshot else app.load_model_artifacts()
+    if not loaded:
+        print("Model failed to load.")
+        return False
+
+    report = memory_report(app.model_structures())
+    print(f"=== Memory, model {app.model_version or args.snapshot} ===")
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
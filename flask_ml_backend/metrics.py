@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Metrics
+Prometheus-compatible runtime telemetry: counters and latency histograms are
+kept in per-thread stores that only their own thread writes to, so the hot
+path takes no locks; stores are summed when /metrics is scraped. Gauges
+(model version, load time, RSS) are read from callbacks at scrape time.
+
+Each request also carries a trace of its stage timings and item counts. It
+is returned as a Server-Timing header when asked for (X-Debug-Timings
+header, or SERVER_TIMING=1 for every request), and requests slower than
+SLOW_REQUEST_MS are logged with the breakdown. A sample of requests (and
+every 5xx) gets a structured request log line through async_logging.
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, request
+
+from async_logging import REQUEST_LOG_SAMPLE_RATE, dropped_records, log_request, queued_records, sample_request
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRIC_PREFIX = 'recommender_'
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUESTS = METRIC_PREFIX + 'http_requests_total'
+HTTP_DURATION = METRIC_PREFIX + 'http_request_duration_seconds'
+STAGE_DURATION = METRIC_PREFIX + 'stage_duration_seconds'
+CACHE_REQUESTS = METRIC_PREFIX + 'cache_requests_total'
+CACHE_HIT_RATIO = METRIC_PREFIX + 'cache_hit_ratio'
+LOG_RECORDS_DROPPED = METRIC_PREFIX + 'log_records_dropped_total'
+LOG_QUEUE_DEPTH = METRIC_PREFIX + 'log_queue_depth'
+
+# Stores of finished threads are folded together once there are this many
+MAX_LIVE_STORES = 256
+
+# Request tracing
+TIMINGS_HEADER = 'X-Debug-Timings'
+SERVER_TIMING_ALWAYS = os.environ.get('SERVER_TIMING', '') == '1'
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '1000'))
+
+METRIC_HELP = {
+    HTTP_REQUESTS: ('counter', 'HTTP requests by route, method and status'),
+    HTTP_DURATION: ('histogram', 'HTTP request latency by route and method'),
+    STAGE_DURATION: ('histogram', 'Latency of recommendation pipeline stages'),
+    CACHE_REQUESTS: ('counter', 'Cache lookups by cache and result'),
+    CACHE_HIT_RATIO: ('gauge', 'Cache hits over lookups since start'),
+}
+
+_local = threading.local()
+_stores = []
+_stores_lock = threading.Lock()
+_retired = {'counters': {}, 'histograms': {}, 'thread': None}
+_gauges = {}
+
+logger = logging.getLogger(__name__)
+
+# --- Recording (hot path, lock-free) ---
+def _store():
+    try:
+        return _local.store
+    except AttributeError:
+        store = _local.store = {'counters': {}, 'histograms': {}, 'thread': threading.current_thread()}
+        with _stores_lock:
+            _stores.append(store)
+            if len(_stores) > MAX_LIVE_STORES:
+                _fold_finished_threads()
+        return store
+
+def inc(name, labels=(), value=1):
+    """Add to a counter; labels is a tuple of (key, value) pairs"""
+    counters = _store()['counters']
+    key = (name, labels)
+    counters[key] = counters.get(key, 0) + value
+
+def observe(name, seconds, labels=()):
+    """Record one latency observation in a histogram"""
+    histograms = _store()['histograms']
+    key = (name, labels)
+    histogram = histograms.get(key)
+    if histogram is None:
+        histogram = histograms[key] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0]
+    histogram[0][bisect_left(LATENCY_BUCKETS, seconds)] += 1
+    histogram[1] += seconds
+
+def observe_stage(stage, seconds):
+    """Record a pipeline stage duration in the stage histogram and the current request trace"""
+    observe(STAGE_DURATION, seconds, (('stage', stage),))
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace['stages'][stage] = trace['stages'].get(stage, 0.0) + seconds
+
+def record_stage(stage, start):
+    """Observe the time since start for a pipeline stage and return the current time for chaining"""
+    now = time.perf_counter()
+    observe_stage(stage, now - start)
+    return now
+
+def record_count(name, value):
+    """Add an item count (candidates scored, filtered, returned...) to the current request trace"""
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace['counts'][name] = trace['counts'].get(name, 0) + int(value)
+
+def record_cache(cache, hit):
+    """Count a cache lookup, and note its result in the current request trace"""
+    result = 'hit' if hit else 'miss'
+    inc(CACHE_REQUESTS, (('cache', cache), ('result', result)))
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace['caches'][cache] = result
+
+def register_gauge(name, help_text, read, metric_type='gauge'):
+    """Gauge read at scrape time; read() returns a number, a {labels: number} dict, or None to skip.
+    Totals kept elsewhere can be exposed the same way with metric_type='counter'."""
+    METRIC_HELP[name] = (metric_type, help_text)
+    _gauges[name] = read
+
+# --- Aggregation (scrape time) ---
+def _merge(target, store):
+    for key, value in list(store['counters'].items()):
+        target['counters'][key] = target['counters'].get(key, 0) + value
+    for key, (counts, total) in list(store['histograms'].items()):
+        merged = target['histograms'].get(key)
+        if merged is None:
+            merged = target['histograms'][key] = [[0] * len(counts), 0.0]
+        merged[0] = [a + b for a, b in zip(merged[0], counts)]
+        merged[1] += total
+
+def _fold_finished_threads():
+    """Move stores of finished threads into the retired store (caller holds _stores_lock)"""
+    for store in [s for s in _stores if not s['thread'].is_alive()]:
+        _merge(_retired, store)
+        _stores.remove(store)
+
+def snapshot():
+    """Counters and histograms summed over all threads"""
+    totals = {'counters': {}, 'histograms': {}}
+    with _stores_lock:
+        _fold_finished_threads()
+        _merge(totals, _retired)
+        for store in _stores:
+            _merge(totals, store)
+    return totals
+
+def process_rss_bytes():
+    """Current resident set size (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return None
+
+# --- Request Tracing ---
+def start_trace():
+    _local.trace = {'start': time.perf_counter(), 'stages': {}, 'counts': {}, 'caches': {}}
+
+def end_trace():
+    trace = getattr(_local, 'trace', None)
+    _local.trace = None
+    return trace
+
+def trace_summary(trace=None):
+    """Stage timings (ms), item counts and cache results of the current request so far"""
+    trace = trace or getattr(_local, 'trace', None)
+    if trace is None:
+        return None
+    return {
+        'elapsed_ms': round((time.perf_counter() - trace['start']) * 1000, 3),
+        'stages_ms': {stage: round(seconds * 1000, 3) for stage, seconds in trace['stages'].items()},
+        'counts': dict(trace['counts']),
+        'caches': dict(trace['caches']),
+    }
+
+def timings_requested():
+    """True when the client opted into timing details for this request"""
+    return SERVER_TIMING_ALWAYS or bool(request.headers.get(TIMINGS_HEADER)) or bool(g.get('debug_timings'))
+
+def server_timing_header(trace, total_ms):
+    parts = [f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in trace['stages'].items()]
+    parts += [f'{name};desc="{value}"' for name, value in trace['counts'].items()]
+    parts += [f'{cache};desc="{result}"' for cache, result in trace['caches'].items()]
+    parts.append(f"total;dur={total_ms:.3f}")
+    return ', '.join(parts)
+
+def _request_fields(route, status, elapsed_ms, trace):
+    """Structured request log fields; handlers add their own through g.log_fields"""
+    fields = {
+        'method': request.method,
+        'route': route,
+        'path': request.path,
+        'status': status,
+        'duration_ms': round(elapsed_ms, 3),
+        'stages_ms': {stage: round(seconds * 1000, 3) for stage, seconds in trace['stages'].items()},
+        'counts': trace['counts'],
+        'caches': trace['caches'],
+    }
+    fields.update(g.get('log_fields') or {})
+    return fields
+
+def _describe_trace(trace):
+    stages = ' '.join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in trace['stages'].items())
+    counts = ' '.join(f"{name}={value}" for name, value in trace['counts'].items())
+    caches = ' '.join(f"{cache}={result}" for cache, result in trace['caches'].items())
+    return f"{stages} {counts} {caches}".strip()
+
+# --- Exposition ---
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+def render():
+    """Prometheus text exposition format (0.0.4)"""
+    totals = snapshot()
+    families = {}
+    for (name, labels), value in totals['counters'].items():
+        families.setdefault(name, []).append(f"{name}{_labels(labels)} {value}")
+
+    for (name, labels), (counts, total) in totals['histograms'].items():
+        lines = families.setdefault(name, [])
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {total}")
+        lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+
+    # Hit ratio per cache from the lookup counters
+    lookups = {}
+    for (name, labels), value in totals['counters'].items():
+        if name == CACHE_REQUESTS:
+            labels = dict(labels)
+            hits, count = lookups.get(labels['cache'], (0, 0))
+            lookups[labels['cache']] = (hits + (value if labels['result'] == 'hit' else 0), count + value)
+    for cache, (hits, count) in lookups.items():
+        families.setdefault(CACHE_HIT_RATIO, []).append(f"{CACHE_HIT_RATIO}{_labels((('cache', cache),))} {hits / count}")
+
+    for name, read in _gauges.items():
+        value = read()
+        if value is None:
+            continue
+        samples = value.items() if isinstance(value, dict) else [((), value)]
+        families[name] = [f"{name}{_labels(labels)} {sample}" for labels, sample in samples]
+
+    output = []
+    for name in sorted(families):
+        metric_type, help_text = METRIC_HELP.get(name, ('untyped', ''))
+        output.append(f"# HELP {name} {help_text}")
+        output.append(f"# TYPE {name} {metric_type}")
+        output.extend(sorted(families[name]) if metric_type != 'histogram' else families[name])
+    return '\n'.join(output) + '\n'
+
+# --- Flask Integration ---
+def instrument_app(app):
+    """Count, time and trace every request by route, and serve /metrics"""
+    register_gauge('process_resident_memory_bytes', 'Resident memory size in bytes', process_rss_bytes)
+    register_gauge(LOG_RECORDS_DROPPED, 'Log records dropped because the log queue was full', dropped_records, 'counter')
+    register_gauge(LOG_QUEUE_DEPTH, 'Log records waiting to be written', queued_records)
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+        start_trace()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.get('metrics_start')
+        trace = end_trace()
+        if start is None:
+            return response
+
+        elapsed = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        observe(HTTP_DURATION, elapsed, (('route', route), ('method', request.method)))
+        inc(HTTP_REQUESTS, (('route', route), ('method', request.method), ('status', str(response.status_code))))
+
+        if trace is not None:
+            elapsed_ms = elapsed * 1000
+            if timings_requested():
+                response.headers['Server-Timing'] = server_timing_header(trace, elapsed_ms)
+            if elapsed_ms >= SLOW_REQUEST_MS:
+                logger.warning(f"Slow request {request.method} {request.full_path.rstrip('?')} took "
+                               f"{elapsed_ms:.1f}ms: {_describe_trace(trace)}")
+            failed = response.status_code >= 500
+            if failed or sample_request():
+                log_request(_request_fields(route, response.status_code, elapsed_ms, trace),
+                            sample_rate=1.0 if failed else REQUEST_LOG_SAMPLE_RATE,
+                            level=logging.ERROR if failed else logging.INFO)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        """Prometheus scrape endpoint"""
+        return Response(render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    return app
@@ -3,15 +3,95 @@
 Multi-Content Data Generator
 Creates mock datasets for TV shows, podcasts, and books to demonstrate
 a real multi-content recommendation system.
+
+Catalog size, user count, rating density, Zipfian popularity skew, seed and
+time span are parameters; ratings are sampled with vectorized NumPy draws and
+streamed in chunks to CSV or the binary snapshot format, so datasets with
+millions of users and items can be generated for load and scaling tests.
+Snapshots use build_snapshot.py's layout with hashing features, so
+MODEL_SNAPSHOT=<output> python app.py serves them directly; --check does
+that in-process after writing.
+
+Usage:
+    python multi_content_data_generator.py [--users 50] [--items 15] [--density D]
+        [--zipf 1.0] [--seed 42] [--start 2015-01-01] [--end 2024-01-01]
+        [--format csv|snapshot] [--output DIR] [--check] [--movies-catalog processed_movies.csv]
 """
 
+import argparse
+import os
+import sys
+import time
+
 import pandas as pd
 import numpy as np
-import json
-from datetime import datetime
 
-def generate_tv_shows_data():
-    """Generate mock TV shows dataset"""
+from filter_engine import parse_release_years
+from genre_index import build_genre_matrix
+from hashing_features import HASHING_N_FEATURES, fit_idf, transform_parallel
+
+CONTENT_TYPES = ['tv_shows', 'podcasts', 'books']
+
+# Content type order of the server's item_type_codes (app.CONTENT_TYPE_CODES)
+SERVING_TYPE_CODES = ['movies'] + CONTENT_TYPES
+
+# Chance that a user rates any given item, per content type
+DEFAULT_DENSITY = {'tv_shows': 0.3, 'podcasts': 0.25, 'books': 0.2, 'movies': 0.01}
+DEFAULT_ZIPF_EXPONENT = 1.0
+DEFAULT_SEED = 42
+DEFAULT_START = '2015-01-01'
+DEFAULT_END = '2024-01-01'
+
+RATING_VALUES = np.array([1, 2, 3, 4, 5], dtype=np.int8)
+RATING_PROBABILITIES = [0.1, 0.15, 0.25, 0.3, 0.2]
+
+# Items are drawn with replacement and de-duplicated; oversampling makes up for the repeats
+RATING_OVERSAMPLE = 1.5
+
+# Approximate number of rating rows held in memory per chunk
+CHUNK_ROWS = 1_000_000
+
+# Vocabulary for synthetic items beyond the curated ones
+TITLE_WORDS = ['Silent', 'Golden', 'Hidden', 'Broken', 'Last', 'Midnight', 'Wild', 'Lost', 'Electric',
+               'Crimson', 'Distant', 'Secret', 'Burning', 'Frozen', 'Endless', 'Northern', 'Little', 'Dark']
+TITLE_NOUNS = ['Empire', 'River', 'Signal', 'Garden', 'Machine', 'Kingdom', 'Harbor', 'Code', 'Frontier',
+               'Archive', 'Voices', 'Mountain', 'City', 'Dream', 'Echo', 'Island', 'Mirror', 'Storm']
+TYPE_NOUNS = {'tv_shows': 'series', 'podcasts': 'podcast', 'books': 'book'}
+
+def _id_block(n_items):
+    """Id range per content type: 10000 for the demo sizes, the next power of ten above n_items otherwise"""
+    return max(10000, 10 ** len(str(n_items)))
+
+def _finish_catalog(curated_df, content_type, n_items=None, rng=None):
+    """Trim or pad a curated catalog to n_items and add combined_features"""
+    n_items = len(curated_df) if n_items is None else n_items
+    rng = rng if rng is not None else np.random.default_rng(DEFAULT_SEED)
+    df = curated_df.head(n_items).copy()
+
+    extra = n_items - len(df)
+    if extra > 0:
+        genre_vocab = np.array(sorted({g for genres in curated_df['genres'] for g in genres.split('|')}))
+        words = rng.integers(0, [len(TITLE_WORDS), len(TITLE_NOUNS)], size=(extra, 2))
+        picks = genre_vocab[rng.integers(0, len(genre_vocab), size=(extra, 3))]
+        n_genres = rng.integers(1, 4, size=extra)
+        numbers = np.arange(len(df) + 1, n_items + 1)
+        titles = [f"{TITLE_WORDS[a]} {TITLE_NOUNS[b]} {n}" for (a, b), n in zip(words.tolist(), numbers.tolist())]
+        genres = ['|'.join(dict.fromkeys(row[:k])) for row, k in zip(picks.tolist(), n_genres.tolist())]
+        noun = TYPE_NOUNS[content_type]
+        descriptions = [f"A {g.split('|')[0].lower()} {noun} about the {TITLE_NOUNS[b].lower()}"
+                        for g, (_, b) in zip(genres, words.tolist())]
+        df = pd.concat([df, pd.DataFrame({
+            'title': titles, 'genres': genres, 'type': content_type, 'description': descriptions
+        })], ignore_index=True)
+
+    # Ids stay 10001.., 20001.., 30001.. for the demo sizes
+    block = _id_block(n_items)
+    df['id'] = (CONTENT_TYPES.index(content_type) + 1) * block + 1 + np.arange(len(df))
+    df['combined_features'] = df['title'] + ' ' + df['genres'] + ' ' + df['description']
+    return df
+
+def generate_tv_shows_data(n_items=None, rng=None):
+    """Generate mock TV shows dataset, padded with synthetic items up to n_items"""
     tv_shows = [
         {"id": 10001, "title": "Breaking Bad", "genres": "Crime|Drama|Thriller", "type": "tv_shows", "description": "A high school chemistry teacher turned methamphetamine manufacturer"},
         {"id": 10002, "title": "Game of Thrones", "genres": "Action|Adventure|Drama|Fantasy", "type": "tv_shows", "description": "Nine noble families fight for control over the lands of Westeros"},
@@ -30,12 +110,10 @@ def generate_tv_shows_data():
         {"id": 10015, "title": "The Great British Bake Off", "genres": "Game-Show|Reality-TV", "type": "tv_shows", "description": "Bakers compete against each other in a series of challenges"}
     ]
     
-    df = pd.DataFrame(tv_shows)
-    df['combined_features'] = df['title'] + ' ' + df['genres'] + ' ' + df['description']
-    return df
+    return _finish_catalog(pd.DataFrame(tv_shows), 'tv_shows', n_items, rng)
 
-def generate_podcasts_data():
-    """Generate mock podcasts dataset"""
+def generate_podcasts_data(n_items=None, rng=None):
+    """Generate mock podcasts dataset, padded with synthetic items up to n_items"""
     podcasts = [
         {"id": 20001, "title": "The Joe Rogan Experience", "genres": "Talk-Show|Comedy|News", "type": "podcasts", "description": "Long form conversations with guests from various fields"},
         {"id": 20002, "title": "Serial", "genres": "Crime|Documentary|Mystery", "type": "podcasts", "description": "Investigative journalism podcast that tells one story over multiple episodes"},
@@ -54,12 +132,10 @@ def generate_podcasts_data():
         {"id": 20015, "title": "Hidden Brain", "genres": "Psychology|Science|Education", "type": "podcasts", "description": "Explores the unconscious patterns that drive human behavior"}
     ]
     
-    df = pd.DataFrame(podcasts)
-    df['combined_features'] = df['title'] + ' ' + df['genres'] + ' ' + df['description']
-    return df
+    return _finish_catalog(pd.DataFrame(podcasts), 'podcasts', n_items, rng)
 
-def generate_books_data():
-    """Generate mock books dataset"""
+def generate_books_data(n_items=None, rng=None):
+    """Generate mock books dataset, padded with synthetic items up to n_items"""
     books = [
         {"id": 30001, "title": "To Kill a Mockingbird", "genres": "Classic|Drama|Fiction", "type": "books", "description": "Harper Lee's classic novel about racial injustice in the American South"},
         {"id": 30002, "title": "1984", "genres": "Dystopian|Fiction|Political", "type": "books", "description": "George Orwell's dystopian novel about totalitarian surveillance society"},
@@ -78,94 +154,225 @@ def generate_books_data():
         {"id": 30015, "title": "Thinking, Fast and Slow", "genres": "Psychology|Science|Non-fiction", "type": "books", "description": "Daniel Kahneman's exploration of the two systems that drive the way we think"}
     ]
     
-    df = pd.DataFrame(books)
-    df['combined_features'] = df['title'] + ' ' + df['genres'] + ' ' + df['description']
-    return df
+    return _finish_catalog(pd.DataFrame(books), 'books', n_items, rng)
 
-def generate_ratings_data():
-    """Generate mock ratings data for all content types"""
-    ratings = []
-    
-    # Generate ratings for TV shows (IDs 10001-10015)
-    for user_id in range(1, 51):  # 50 users
-        for show_id in range(10001, 10016):
-            if np.random.random() < 0.3:  # 30% chance of rating
-                rating = np.random.choice([1, 2, 3, 4, 5], p=[0.1, 0.15, 0.25, 0.3, 0.2])
-                ratings.append({
-                    'userId': user_id,
-                    'contentId': show_id,
-                    'contentType': 'tv_shows',
-                    'rating': rating,
-                    'timestamp': datetime.now().isoformat()
-                })
-    
-    # Generate ratings for podcasts (IDs 20001-20015)
-    for user_id in range(1, 51):
-        for podcast_id in range(20001, 20016):
-            if np.random.random() < 0.25:  # 25% chance of rating
-                rating = np.random.choice([1, 2, 3, 4, 5], p=[0.1, 0.15, 0.25, 0.3, 0.2])
-                ratings.append({
-                    'userId': user_id,
-                    'contentId': podcast_id,
-                    'contentType': 'podcasts',
-                    'rating': rating,
-                    'timestamp': datetime.now().isoformat()
-                })
-    
-    # Generate ratings for books (IDs 30001-30015)
-    for user_id in range(1, 51):
-        for book_id in range(30001, 30016):
-            if np.random.random() < 0.2:  # 20% chance of rating
-                rating = np.random.choice([1, 2, 3, 4, 5], p=[0.1, 0.15, 0.25, 0.3, 0.2])
-                ratings.append({
-                    'userId': user_id,
-                    'contentId': book_id,
-                    'contentType': 'books',
-                    'rating': rating,
-                    'timestamp': datetime.now().isoformat()
-                })
-    
-    return pd.DataFrame(ratings)
+def item_popularity(n_items, zipf_exponent, rng):
+    """Zipfian sampling probabilities over items; popularity ranks are shuffled across ids"""
+    weights = 1.0 / np.arange(1, n_items + 1, dtype=np.float64) ** zipf_exponent
+    weights = weights[rng.permutation(n_items)]
+    return weights / weights.sum()
+
+def sample_ratings(n_users, n_items, density, popularity, rng):
+    """(user positions, item positions, ratings) for a block of users, drawn without per-cell loops.
+
+    Each user rates Binomial(n_items, density) distinct items chosen by popularity.
+    """
+    counts = rng.binomial(n_items, density, size=n_users)
+    draws = np.ceil(counts * RATING_OVERSAMPLE).astype(np.int64) + np.where(counts > 0, 8, 0)
+    users = np.repeat(np.arange(n_users, dtype=np.int64), draws)
+    items = rng.choice(n_items, size=len(users), p=popularity)
+
+    # First occurrence of each (user, item) pair, in draw order, capped at the user's count
+    _, first = np.unique(users * n_items + items, return_index=True)
+    first.sort()
+    users, items = users[first], items[first]
+    rank = np.arange(len(users)) - np.searchsorted(users, users, side='left')
+    keep = rank < counts[users]
+    users, items = users[keep], items[keep]
+
+    ratings = rng.choice(RATING_VALUES, size=len(users), p=RATING_PROBABILITIES)
+    return users, items, ratings
 
-def create_multi_content_datasets():
+def generate_ratings_chunks(n_users, catalogs, density=None, zipf_exponent=DEFAULT_ZIPF_EXPONENT,
+                            seed=DEFAULT_SEED, start=DEFAULT_START, end=DEFAULT_END, chunk_rows=CHUNK_ROWS):
+    """Yield rating chunks as dicts of arrays (userId, contentId, typeCode, rating, timestamp).
+
+    catalogs maps content type -> array of content ids. Chunks cover consecutive
+    user ranges, so rows come out grouped by user. Output is deterministic for
+    the same parameters and seed.
+    """
+    rng = np.random.default_rng(seed)
+    names = list(catalogs)
+    densities = {t: density if density is not None else DEFAULT_DENSITY.get(t, 0.1) for t in names}
+    popularity = {t: item_popularity(len(catalogs[t]), zipf_exponent, rng) for t in names}
+    start_s = int(pd.Timestamp(start).timestamp())
+    end_s = int(pd.Timestamp(end).timestamp())
+
+    expected_per_user = sum(len(catalogs[t]) * densities[t] for t in names)
+    users_per_chunk = max(1, int(chunk_rows // max(expected_per_user, 1)))
+
+    for first_user in range(1, n_users + 1, users_per_chunk):
+        block = min(users_per_chunk, n_users + 1 - first_user)
+        parts = []
+        for code, content_type in enumerate(names):
+            ids = np.asarray(catalogs[content_type])
+            users, items, ratings = sample_ratings(block, len(ids), densities[content_type], popularity[content_type], rng)
+            parts.append((users, ids[items], np.full(len(users), code, dtype=np.int8), ratings))
+
+        users = np.concatenate([p[0] for p in parts])
+        order = np.argsort(users, kind='stable')
+        yield {
+            'userId': (users[order] + first_user).astype(np.int64),
+            'contentId': np.concatenate([p[1] for p in parts])[order],
+            'typeCode': np.concatenate([p[2] for p in parts])[order],
+            'rating': np.concatenate([p[3] for p in parts])[order],
+            'timestamp': rng.integers(start_s, end_s, size=len(users), dtype=np.int64),
+        }
+
+def write_ratings_csv(chunks, path, content_types, movies_format=False):
+    """Stream rating chunks to CSV; movies_format writes rating.csv columns (userId, movieId, rating, timestamp)"""
+    names = np.array(content_types)
+    n_rows = 0
+    with open(path, 'w', newline='') as f:
+        for i, chunk in enumerate(chunks):
+            columns = {'userId': chunk['userId']}
+            if movies_format:
+                columns['movieId'] = chunk['contentId']
+            else:
+                columns['contentId'] = chunk['contentId']
+                columns['contentType'] = names[chunk['typeCode']]
+            columns['rating'] = chunk['rating']
+            columns['timestamp'] = chunk['timestamp'].astype('datetime64[s]')
+            pd.DataFrame(columns).to_csv(f, header=(i == 0), index=False)
+            n_rows += len(chunk['userId'])
+    return n_rows
+
+def write_catalog_snapshot(catalog, writer, n_features=HASHING_N_FEATURES):
+    """Write the catalog arrays and content/genre matrices in build_snapshot.py's layout (hashing features)"""
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+    texts = catalog['combined_features'].tolist()
+    features = {'idf': fit_idf(texts, n_features, ENGLISH_STOP_WORDS), 'n_features': n_features,
+                'stop_words': frozenset(ENGLISH_STOP_WORDS)}
+    titles = catalog['title'].to_numpy(dtype=object)
+    genres = catalog['genres'].to_numpy(dtype=object)
+    genre_matrix, genre_names = build_genre_matrix(genres)
+
+    writer.add_matrix('content', transform_parallel(texts, features))
+    writer.add_matrix('genre', genre_matrix)
+    writer.add_strings('genre_names', genre_names)
+    writer.add_array('item_movie_ids', catalog['id'].to_numpy(dtype=np.int64))
+    writer.add_strings('item_titles', titles)
+    writer.add_strings('item_genres', genres)
+    writer.add_array('item_years', parse_release_years(titles))
+    writer.add_array('item_type_codes', catalog['type'].map(SERVING_TYPE_CODES.index).to_numpy(np.int8))
+    writer.metadata.update(feature_mode='hashing', n_items=len(catalog), n_features=n_features)
+
+def write_ratings_snapshot(chunks, writer, item_ids):
+    """Stream rating chunks into a SnapshotWriter as the server's ratings_* index arrays"""
+    catalog_rows = pd.Index(item_ids)
+    n_rows = n_users = 0
+    for chunk in chunks:
+        # Chunks cover consecutive user ranges sorted by user, so each one extends the index as-is
+        users = chunk['userId']
+        starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+        writer.append('ratings_user_ids', users[starts])
+        writer.append('ratings_offsets', (starts + n_rows).astype(np.int64))
+        writer.append('ratings_item_rows', catalog_rows.get_indexer(chunk['contentId']).astype(np.int64))
+        writer.append('ratings_ratings', chunk['rating'].astype(np.float32))
+        writer.append('ratings_timestamps', chunk['timestamp'].astype(np.int64))
+        n_rows += len(users)
+        n_users += len(starts)
+    writer.append('ratings_offsets', np.array([n_rows], dtype=np.int64))
+    writer.metadata.update(n_ratings=n_rows, n_users=n_users)
+    return n_rows
+
+def check_snapshot(path, user_id=1):
+    """Serve a generated snapshot in-process and request recommendations; True when it answers"""
+    os.environ['MODEL_SNAPSHOT'] = path
+    import app
+
+    if not app.load_model_artifacts():
+        return False
+    response = app.app.test_client().post('/recommend', json={'userId': user_id, 'numRecommendations': 5})
+    body = response.get_json()
+    print(f"MODEL_SNAPSHOT={path}: /recommend for user {user_id} -> {response.status_code}, "
+          f"{body.get('count', body.get('error'))} recommendations")
+    return response.status_code == 200 and body['count'] > 0
+
+def generate_ratings_data(n_users=50, catalogs=None, **options):
+    """Generate mock ratings data for all content types as one DataFrame (small datasets only)"""
+    if catalogs is None:
+        catalogs = {'tv_shows': generate_tv_shows_data()['id'],
+                    'podcasts': generate_podcasts_data()['id'],
+                    'books': generate_books_data()['id']}
+    chunks = list(generate_ratings_chunks(n_users, catalogs, **options))
+    names = np.array(list(catalogs))
+    return pd.DataFrame({
+        'userId': np.concatenate([c['userId'] for c in chunks]),
+        'contentId': np.concatenate([c['contentId'] for c in chunks]),
+        'contentType': names[np.concatenate([c['typeCode'] for c in chunks])],
+        'rating': np.concatenate([c['rating'] for c in chunks]),
+        'timestamp': np.concatenate([c['timestamp'] for c in chunks]).astype('datetime64[s]'),
+    })
+
+def create_multi_content_datasets(n_users=50, n_items=15, density=None, zipf_exponent=DEFAULT_ZIPF_EXPONENT,
+                                  seed=DEFAULT_SEED, start=DEFAULT_START, end=DEFAULT_END,
+                                  output_format='csv', output_dir='.', chunk_rows=CHUNK_ROWS):
     """Create all multi-content datasets"""
     print("🎬 Generating Multi-Content Datasets...")
-    
-    # Generate datasets
-    tv_shows_df = generate_tv_shows_data()
-    podcasts_df = generate_podcasts_data()
-    books_df = generate_books_data()
-    ratings_df = generate_ratings_data()
-    
-    # Save datasets
-    tv_shows_df.to_csv('tv_shows.csv', index=False)
-    podcasts_df.to_csv('podcasts.csv', index=False)
-    books_df.to_csv('books.csv', index=False)
-    ratings_df.to_csv('multi_content_ratings.csv', index=False)
-    
-    # Create combined content dataset
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+
+    # Generate catalogs
+    tv_shows_df = generate_tv_shows_data(n_items, rng)
+    podcasts_df = generate_podcasts_data(n_items, rng)
+    books_df = generate_books_data(n_items, rng)
     combined_content = pd.concat([
         tv_shows_df,
         podcasts_df,
         books_df
     ], ignore_index=True)
-    combined_content.to_csv('combined_content.csv', index=False)
-    
-    print("✅ Datasets created successfully!")
+    catalogs = {'tv_shows': tv_shows_df['id'].to_numpy(),
+                'podcasts': podcasts_df['id'].to_numpy(),
+                'books': books_df['id'].to_numpy()}
+    chunks = generate_ratings_chunks(n_users, catalogs, density, zipf_exponent, seed + 1, start, end, chunk_rows)
+
+    os.makedirs(output_dir, exist_ok=True)
+    if output_format == 'snapshot':
+        from snapshot import SnapshotWriter
+
+        metadata = {'n_items_per_type': n_items, 'density': density,
+                    'zipf_exponent': zipf_exponent, 'seed': seed, 'start': start, 'end': end}
+        with SnapshotWriter(output_dir, metadata=metadata) as writer:
+            write_catalog_snapshot(combined_content, writer)
+            n_ratings = write_ratings_snapshot(chunks, writer, combined_content['id'].to_numpy())
+    else:
+        tv_shows_df.to_csv(os.path.join(output_dir, 'tv_shows.csv'), index=False)
+        podcasts_df.to_csv(os.path.join(output_dir, 'podcasts.csv'), index=False)
+        books_df.to_csv(os.path.join(output_dir, 'books.csv'), index=False)
+        combined_content.to_csv(os.path.join(output_dir, 'combined_content.csv'), index=False)
+        n_ratings = write_ratings_csv(chunks, os.path.join(output_dir, 'multi_content_ratings.csv'), CONTENT_TYPES)
+
+    print(f"✅ Datasets created successfully in {time.perf_counter() - started:.1f}s!")
     print(f"   TV Shows: {len(tv_shows_df)} items")
     print(f"   Podcasts: {len(podcasts_df)} items")
     print(f"   Books: {len(books_df)} items")
-    print(f"   Ratings: {len(ratings_df)} ratings")
+    print(f"   Ratings: {n_ratings} ratings from {n_users} users")
     print(f"   Combined Content: {len(combined_content)} items")
-    
+
     return {
         'tv_shows': tv_shows_df,
         'podcasts': podcasts_df,
         'books': books_df,
-        'ratings': ratings_df,
+        'n_ratings': n_ratings,
         'combined': combined_content
     }
 
+def create_movie_ratings(movies_catalog, n_users, density=None, zipf_exponent=DEFAULT_ZIPF_EXPONENT,
+                         seed=DEFAULT_SEED, start=DEFAULT_START, end=DEFAULT_END,
+                         output_dir='.', chunk_rows=CHUNK_ROWS):
+    """Write rating.csv for an existing movies catalog (the single-content app's format)"""
+    movie_ids = pd.read_csv(movies_catalog, usecols=['movieId'])['movieId'].to_numpy()
+    chunks = generate_ratings_chunks(n_users, {'movies': movie_ids}, density, zipf_exponent, seed, start, end, chunk_rows)
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, 'rating.csv')
+    started = time.perf_counter()
+    n_ratings = write_ratings_csv(chunks, path, ['movies'], movies_format=True)
+    print(f"✅ Wrote {n_ratings} ratings from {n_users} users over {len(movie_ids)} movies "
+          f"to {path} in {time.perf_counter() - started:.1f}s")
+    return n_ratings
+
 def create_sample_queries():
     """Create sample API queries for testing"""
     queries = {
@@ -192,12 +399,44 @@ def create_sample_queries():
         for query in queries_list:
             print(f"   {query}")
 
-if __name__ == "__main__":
-    datasets = create_multi_content_datasets()
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50, help='number of users')
+    parser.add_argument('--items', type=int, default=15, help='items per content type')
+    parser.add_argument('--density', type=float, default=None,
+                        help='chance a user rates an item (default: per-type values in DEFAULT_DENSITY)')
+    parser.add_argument('--zipf', type=float, default=DEFAULT_ZIPF_EXPONENT,
+                        help='Zipf exponent of item popularity (0 = uniform)')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='random seed')
+    parser.add_argument('--start', default=DEFAULT_START, help='earliest rating timestamp')
+    parser.add_argument('--end', default=DEFAULT_END, help='latest rating timestamp')
+    parser.add_argument('--format', choices=['csv', 'snapshot'], default='csv', help='output format')
+    parser.add_argument('--output', default=None, help='output directory (default: . for csv, synthetic_dataset for snapshot)')
+    parser.add_argument('--check', action='store_true',
+                        help='with --format snapshot, serve the written snapshot in-process and request recommendations')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='rating rows generated per chunk')
+    parser.add_argument('--movies-catalog', default=None,
+                        help='write rating.csv for this movies catalog (e.g. processed_movies.csv) instead')
+    args = parser.parse_args()
+
+    options = dict(density=args.density, zipf_exponent=args.zipf, seed=args.seed,
+                   start=args.start, end=args.end, chunk_rows=args.chunk_rows)
+    if args.movies_catalog:
+        create_movie_ratings(args.movies_catalog, args.users, output_dir=args.output or '.', **options)
+        return True
+
+    output_dir = args.output or ('synthetic_dataset' if args.format == 'snapshot' else '.')
+    create_multi_content_datasets(args.users, args.items, output_format=args.format, output_dir=output_dir, **options)
+    if args.check and args.format == 'snapshot':
+        return check_snapshot(output_dir)
     create_sample_queries()
-    
+
     print("\n🎉 Multi-content datasets ready for integration!")
     print("\nNext steps:")
     print("1. Integrate these datasets into your Flask app")
     print("2. Update the content type determination logic")
-    print("3. Test with the new multi-content data") 
\ No newline at end of file
+    print("3. Test with the new multi-content data")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
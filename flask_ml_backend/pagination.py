@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Pagination
+Opaque cursors and a short-lived cache of ranked results for infinite
+scroll. The first page of a request ranks a few pages deeper than asked
+and caches the sorted head; follow-up pages are slices of it. When the
+entry has expired or the client scrolls past it, the ranking is recomputed
+deterministically (the same scores and tie-break give the same order).
+
+A cursor is URL-safe base64 of the request parameters and the next
+offset, so any worker can serve it without shared state.
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import record_cache
+
+PAGE_CACHE_TTL = float(os.environ.get('PAGE_CACHE_TTL', '300'))         # seconds
+PAGE_CACHE_SIZE = int(os.environ.get('PAGE_CACHE_SIZE', '10000'))       # cached rankings
+PREFETCH_PAGES = 5                # pages ranked and cached ahead of the requested one
+PREFETCH_MAX_ROWS = 500           # cap on rows ranked ahead, for large pages
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '500'))             # largest numRecommendations
+
+# --- Cursors ---
+def encode_cursor(state):
+    """Opaque cursor string for a JSON-serializable state dict"""
+    raw = json.dumps(state, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+def decode_cursor(cursor):
+    """State dict of a cursor; raises ValueError when it is malformed"""
+    if not isinstance(cursor, str) or not cursor:
+        raise ValueError("cursor must be a non-empty string")
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        state = json.loads(raw)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("cursor is not valid") from None
+    if not isinstance(state, dict):
+        raise ValueError("cursor is not valid")
+    return state
+
+def parse_page_size(value, default=5, maximum=MAX_PAGE_SIZE):
+    """numRecommendations as a positive int up to maximum; raises ValueError otherwise.
+
+    Integral floats and numeric strings ("5", 5.0) are accepted, as they always were.
+    """
+    if value is None:
+        return default
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif isinstance(value, str):
+        try:
+            value = int(value.strip())
+        except ValueError:
+            raise ValueError("numRecommendations must be an integer") from None
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError("numRecommendations must be an integer")
+    if not 1 <= value <= maximum:
+        raise ValueError(f"numRecommendations must be between 1 and {maximum}")
+    return value
+
+def request_key(*parts):
+    """Hashable cache key for request parameters (dicts compared by content)"""
+    return json.dumps(parts, separators=(',', ':'), sort_keys=True, default=str)
+
+def prefetch_depth(offset, count):
+    """Rows to rank for a page at offset, including the pages cached ahead"""
+    return offset + count + min(count * PREFETCH_PAGES, PREFETCH_MAX_ROWS)
+
+# --- Ranked Page Cache ---
+class PageCache:
+    """Ranked rows and scores per request key, kept ttl seconds and at most max_entries
+    (least recently used dropped first)"""
+
+    def __init__(self, name, ttl=PAGE_CACHE_TTL, max_entries=PAGE_CACHE_SIZE):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, end):
+        """Entry covering rows [0, end), or None (a miss) when absent, expired or too short"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and now - entry['created'] > self.ttl:
+                del self.entries[key]
+                entry = None
+            if entry is not None and (end <= len(entry['rows']) or entry['complete']):
+                self.entries.move_to_end(key)
+            else:
+                entry = None
+        record_cache(self.name, entry is not None)
+        return entry
+
+    def put(self, key, rows, scores, complete):
+        """Cache a ranking head; complete means no rows follow it"""
+        entry = {'rows': rows, 'scores': scores, 'complete': complete, 'created': time.monotonic()}
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+def ranked_page(cache, key, rank, offset, count):
+    """Rows and scores at [offset, offset + count) of a ranking, and whether more rows follow.
+
+    rank(depth) returns the first depth rows and scores of the ranking, best
+    first; it is only called on a cache miss.
+    """
+    end = offset + count
+    entry = cache.get(key, end)
+    if entry is None:
+        depth = prefetch_depth(offset, count)
+        rows, scores = rank(depth)
+        entry = cache.put(key, rows, scores, complete=len(rows) < depth)
+    more = end < len(entry['rows']) or not entry['complete']
+    return entry['rows'][offset:end], entry['scores'][offset:end], more
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Sampling Profiler
+On-demand stack sampler for live workers. POST /debug/profile?seconds=N
+starts a background thread that snapshots the Python stacks of every other
+thread (sys._current_frames) at a fixed rate for N seconds and returns them
+in collapsed-stack format, ready for flamegraph.pl or speedscope.
+
+Nothing runs until a profile is requested, one profile runs at a time, and
+the endpoint is disabled unless ADMIN_TOKEN is set (callers send it in the
+X-Admin-Token header).
+
+    curl -X POST -H "X-Admin-Token: $ADMIN_TOKEN" \
+        "http://localhost:5000/debug/profile?seconds=10" -o profile.folded
+    flamegraph.pl profile.folded > profile.svg
+"""
+
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import Response, jsonify, request
+
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+ADMIN_TOKEN_HEADER = 'X-Admin-Token'
+
+DEFAULT_SECONDS = 10.0
+MAX_SECONDS = 120.0
+DEFAULT_HZ = 100.0
+MAX_HZ = 1000.0
+
+# Leaf frames (file name, function) of threads blocked waiting rather than working, e.g. an
+# idle worker in queue.py:get; an application function named get still counts as work
+IDLE_FRAMES = frozenset([
+    ('threading.py', 'wait'), ('threading.py', '_wait_for_tstate_lock'),
+    ('queue.py', 'get'), ('selectors.py', 'select'), ('socketserver.py', 'serve_forever'),
+    ('socket.py', 'accept'), ('socket.py', 'readinto'), ('ssl.py', 'recv_into'), ('ssl.py', 'read'),
+    ('connection.py', 'poll'), ('connection.py', 'wait'), ('thread.py', '_worker'),
+])
+
+_profile_lock = threading.Lock()
+_labels = {}
+
+def _frame_label(code):
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename.replace('\\', '/').split('/')
+        label = f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})".replace(';', ':')
+        _labels[code] = label
+    return label
+
+def _collapse(frame):
+    """Root-first ';' joined stack of a frame, plus its leaf (file name, function)"""
+    labels = []
+    leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ';'.join(labels), leaf
+
+def sample_stacks(seconds, hz=DEFAULT_HZ, include_idle=False, skip_thread_ids=()):
+    """Sample all other threads for `seconds` from a background thread.
+
+    Returns (Counter of collapsed stacks, stats dict).
+    """
+    counts = Counter()
+    stats = {'samples': 0, 'idle_samples': 0, 'ticks': 0, 'seconds': seconds, 'hz': hz}
+    interval = 1.0 / hz
+    skip = set(skip_thread_ids)
+
+    def run():
+        skip.add(threading.get_ident())
+        deadline = time.perf_counter() + seconds
+        next_tick = time.perf_counter()
+        while next_tick < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id in skip:
+                    continue
+                stack, leaf = _collapse(frame)
+                if not include_idle and leaf in IDLE_FRAMES:
+                    stats['idle_samples'] += 1
+                    continue
+                counts[stack] += 1
+                stats['samples'] += 1
+            stats['ticks'] += 1
+            next_tick += interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    sampler = threading.Thread(target=run, name='sampling-profiler', daemon=True)
+    sampler.start()
+    sampler.join()
+    return counts, stats
+
+def collapsed_output(counts):
+    """Brendan Gregg collapsed-stack text: 'frame;frame;frame count' per line"""
+    return ''.join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+def register_profiler_endpoint(app):
+    """Add the admin-only POST /debug/profile endpoint"""
+
+    @app.route('/debug/profile', methods=['POST'])
+    def debug_profile():
+        """Sample all request threads for N seconds and return collapsed stacks"""
+        if not ADMIN_TOKEN:
+            return jsonify({"error": "Profiling is disabled. Set ADMIN_TOKEN to enable it."}), 403
+        if not hmac.compare_digest(request.headers.get(ADMIN_TOKEN_HEADER, ''), ADMIN_TOKEN):
+            return jsonify({"error": "Forbidden"}), 403
+
+        try:
+            seconds = float(request.args.get('seconds', DEFAULT_SECONDS))
+            hz = float(request.args.get('hz', DEFAULT_HZ))
+        except ValueError:
+            return jsonify({"error": "seconds and hz must be numbers"}), 400
+        if not 0 < seconds <= MAX_SECONDS or not 0 < hz <= MAX_HZ:
+            return jsonify({"error": f"seconds must be in (0, {MAX_SECONDS:g}] and hz in (0, {MAX_HZ:g}]"}), 400
+        include_idle = request.args.get('idle', '').lower() in ('1', 'true', 'yes')
+
+        if not _profile_lock.acquire(blocking=False):
+            return jsonify({"error": "A profile is already running"}), 409
+        try:
+            counts, stats = sample_stacks(seconds, hz, include_idle, skip_thread_ids=[threading.get_ident()])
+        finally:
+            _profile_lock.release()
+
+        filename = time.strftime('profile-%Y%m%d-%H%M%S.folded')
+        return Response(collapsed_output(counts), mimetype='text/plain', headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Profile-Samples': str(stats['samples']),
+            'X-Profile-Idle-Samples': str(stats['idle_samples']),
+            'X-Profile-Ticks': str(stats['ticks']),
+        })
+
+    return app
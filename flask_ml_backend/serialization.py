@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Serialization
+JSON encoding for API responses. Uses orjson when it is installed and the
+standard library otherwise; NumPy arrays and scalars are encoded directly
+by both, so handlers do not need per-field float()/int() casts.
+
+Large recommendation lists are assembled from cached per-item JSON
+fragments (every field except the score, encoded once per catalog row), so
+a response only formats the scores and joins bytes.
+
+Usage (encoder comparison on 1k-item responses):
+    python serialization.py [--items 1000] [--iterations 200]
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+
+import numpy as np
+from flask import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_MIMETYPE = 'application/json'
+
+# --- Encoding ---
+def _default(obj):
+    """NumPy values the standard library encoder does not know about"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+if orjson is not None:
+    ENCODER = 'orjson'
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj):
+        """JSON bytes for obj"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+else:
+    ENCODER = 'json'
+    _encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(',', ':'))
+
+    def dumps(obj):
+        """JSON bytes for obj"""
+        return _encoder.encode(obj).encode('utf-8')
+
+def json_response(body, status=200, raw=None):
+    """Flask response for body; raw maps extra top-level keys to already encoded JSON bytes"""
+    payload = dumps(body)
+    if raw:
+        fields = b','.join(dumps(key) + b':' + value for key, value in raw.items())
+        payload = b'{' + fields + (b',' + payload[1:] if len(payload) > 2 else b'}')
+    return Response(payload, status=status, mimetype=JSON_MIMETYPE)
+
+# --- Precomputed Item Fragments ---
+def _score_fields(scores):
+    """Encoded scores, one bytes value per score; non-finite scores become null"""
+    scores = np.asarray(scores, dtype=np.float64)
+    if orjson is None:
+        # The standard library would write NaN/Infinity, which is not valid JSON
+        scores = [score if math.isfinite(score) else None for score in scores.tolist()]
+    # One encode of the whole array is much cheaper than repr() per float
+    return dumps(scores)[1:-1].split(b',')
+
+class FragmentCache:
+    """Per-row JSON fragments of catalog items, encoded on first use.
+
+    build(row) returns the item dict without its score; the fragment is that
+    object left open so the score field can be appended.
+    """
+
+    def __init__(self, n_rows, build, score_key='similarity_score'):
+        self.build = build
+        self.score_key = score_key
+        self.fragments = [None] * n_rows
+
+    def fragment(self, row):
+        fragment = self.fragments[row]
+        if fragment is None:
+            item = self.build(row)
+            item[self.score_key] = 0
+            # Strip the placeholder score, keeping '..."similarity_score":'
+            fragment = dumps(item)[:-2]
+            self.fragments[row] = fragment
+        return fragment
+
+    def array(self, rows, scores, extras=None):
+        """JSON array of items with their scores, as bytes; extras optionally holds a dict of
+        additional fields per item"""
+        if len(rows) == 0:
+            return b'[]'
+        rows = rows.tolist() if isinstance(rows, np.ndarray) else rows
+        if extras is None:
+            return b'[' + b','.join(self.fragment(row) + score + b'}'
+                                    for row, score in zip(rows, _score_fields(scores))) + b']'
+        return b'[' + b','.join(self.fragment(row) + score + (b',' + dumps(extra)[1:-1] if extra else b'') + b'}'
+                                for row, score, extra in zip(rows, _score_fields(scores), extras)) + b']'
+
+# --- Benchmark ---
+def _sample_catalog(n_items):
+    ids = np.array([str(i) for i in range(1, n_items + 1)], dtype=object)
+    titles = np.array([f"Title {i} (19{i % 100:02d})" for i in range(n_items)], dtype=object)
+    genres = np.array(['Adventure, Animation, Children, Comedy, Fantasy'] * n_items, dtype=object)
+    return ids, titles, genres
+
+def run_benchmark(n_items, iterations):
+    """Encode n_items recommendations per response with each method and print throughput"""
+    from flask import Flask, jsonify
+
+    rng = np.random.default_rng(42)
+    ids, titles, genres = _sample_catalog(n_items)
+    rows = rng.permutation(n_items)
+    scores = rng.random(n_items)
+
+    def item(row):
+        return {'id': ids[row], 'title': titles[row], 'category': 'Movies', 'content_type': 'movies',
+                'genre': genres[row], 'description': f"Genres: {genres[row]}"}
+
+    def dict_list():
+        return [dict(item(row), similarity_score=float(score)) for row, score in zip(rows, scores)]
+
+    fragments = FragmentCache(n_items, item)
+    app = Flask(__name__)
+    cases = [
+        ('jsonify(dicts)', lambda: jsonify({'recommendations': dict_list(), 'count': n_items}).get_data()),
+        (f'{ENCODER} dumps(dicts)', lambda: json_response({'recommendations': dict_list(), 'count': n_items}).get_data()),
+        ('fragments', lambda: json_response({'count': n_items},
+                                            raw={'recommendations': fragments.array(rows, scores)}).get_data()),
+    ]
+
+    print(f"=== {n_items}-item responses, {iterations} iterations ({ENCODER} encoder) ===")
+    print(f"  {'method':28}{'ms/response':>14}{'responses/sec':>16}{'bytes':>10}")
+    with app.app_context():
+        reference = json.loads(cases[0][1]())
+        for name, encode in cases:
+            payload = encode()
+            if json.loads(payload) != reference:
+                print(f"  {name}: output differs from jsonify")
+                return False
+            start = time.perf_counter()
+            for _ in range(iterations):
+                encode()
+            per_call = (time.perf_counter() - start) / iterations
+            print(f"  {name:28}{per_call * 1000:>14.3f}{1 / per_call:>16.1f}{len(payload):>10}")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare JSON encoders on large recommendation responses')
+    parser.add_argument('--items', type=int, default=1000, help='items per response')
+    parser.add_argument('--iterations', type=int, default=200, help='encodes per method')
+    args = parser.parse_args()
+    return run_benchmark(args.items, args.iterations)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
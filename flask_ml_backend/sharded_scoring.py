@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Sharded Scoring
+Scatter-gather scoring of the catalog across a process pool, for catalogs
+where a single sparse mat-vec on one core sets the latency floor. The
+normalized content matrix is stored once in shared memory (the model
+snapshot itself, or a copy written to /dev/shm) and memory-mapped by every
+worker; a shard is a contiguous row range viewed without copying.
+
+A query sends only the profile's nonzero terms to every shard. Each shard
+scores and masks its rows and returns its local top-K, and the coordinator
+merges the shard heads. Scores are computed as app.score_items computes
+them, and ties are broken the same way (later rows first), so the result
+matches in-process scoring exactly.
+
+Usage (latency as workers are added, on a synthetic or saved catalog):
+    python sharded_scoring.py [--items 1000000] [--workers 1,2,4,8] [--queries 50] [--k 10]
+    python sharded_scoring.py --catalog hashed_content_matrix.npz
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+from snapshot import SnapshotWriter, load_matrix
+from top_k import top_k_positions
+
+MATRIX_NAME = 'content'     # matrix name in the model snapshot and in scoring workspaces
+SHARD_ALIGNMENT = 8         # rows per byte of packed filter bits, so shards slice bitsets directly
+SEED = 42
+
+_matrix = None              # worker-side memory-mapped content matrix
+_dense = None               # worker-side profile buffer over all terms, zero between queries
+
+# --- Worker Side ---
+def _init_worker(path):
+    global _matrix
+    _matrix = load_matrix(path, MATRIX_NAME)
+
+def shard_bounds(n_items, shards, alignment=SHARD_ALIGNMENT):
+    """Row boundaries of contiguous shards, on multiples of alignment (empty shards dropped)"""
+    bounds = np.linspace(0, n_items, shards + 1).astype(np.int64) // alignment * alignment
+    bounds[-1] = n_items
+    return np.unique(bounds)
+
+def row_range(matrix, start, end):
+    """Rows [start, end) of a CSR matrix as a view over its arrays"""
+    indptr = matrix.indptr[start:end + 1]
+    first, last = indptr[0], indptr[-1]
+    return sparse.csr_matrix((matrix.data[first:last], matrix.indices[first:last], indptr - first),
+                             shape=(end - start, matrix.shape[1]), copy=False)
+
+def score_shard(start, end, queries, k, bits=None):
+    """Catalog rows and scores of the local top-k of every query within rows [start, end).
+
+    queries are (terms, values, norm, excluded) tuples: the profile's nonzero
+    terms and values, its norm and the excluded catalog rows in the shard.
+    bits is the shard's slice of a packed selection, or None.
+    """
+    global _dense
+    matrix = row_range(_matrix, start, end)
+    if _dense is None:
+        _dense = np.zeros(matrix.shape[1])
+    selected = None if bits is None else np.unpackbits(bits, count=end - start).view(bool)
+
+    results = []
+    for terms, values, norm, excluded in queries:
+        _dense[terms] = values
+        scores = matrix @ _dense
+        _dense[terms] = 0
+        if norm > 0:
+            scores = scores / norm
+        if selected is not None:
+            scores[~selected] = -np.inf
+        scores[excluded - start] = -np.inf
+        top = top_k_positions(scores, k)
+        results.append((top + start, scores[top]))
+    return results
+
+# --- Coordinator ---
+class ShardedScorer:
+    """Row-sharded catalog scored by a pool of worker processes.
+
+    snapshot_path reuses a model snapshot that holds the matrix as 'content';
+    otherwise the matrix is written to shared memory and removed by close().
+    """
+
+    def __init__(self, content_matrix, workers, shards=None, snapshot_path=None):
+        self.n_items, self.n_terms = content_matrix.shape
+        self.bounds = shard_bounds(self.n_items, shards or workers)
+        self.workspace = None
+        if not snapshot_path:
+            root = '/dev/shm' if os.path.isdir('/dev/shm') else None
+            self.workspace = tempfile.mkdtemp(prefix='scoring-', dir=root)
+            with SnapshotWriter(self.workspace, version='scoring') as writer:
+                writer.add_matrix(MATRIX_NAME, content_matrix)
+            snapshot_path = self.workspace
+
+        # Spawned workers start clean (no inherited threads or model state) and only map the matrix
+        context = multiprocessing.get_context('spawn')
+        self.pool = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                        initargs=(snapshot_path,))
+        # Start the workers now rather than on the first request
+        self.top_k_batch([], 1)
+
+    def top_k_batch(self, profiles, k, excluded=None, bits=None):
+        """(rows, scores) of the top k, best first, for each dense profile vector.
+
+        excluded holds the rows to leave out for each profile; bits is a packed
+        catalog selection (filter_engine) applied to every profile.
+        """
+        queries = []
+        for i, profile in enumerate(profiles):
+            terms = np.flatnonzero(profile)
+            rows = np.sort(np.asarray(excluded[i], dtype=np.int64)) if excluded is not None else np.empty(0, np.int64)
+            queries.append((terms, profile[terms], np.linalg.norm(profile), rows))
+
+        futures = []
+        for start, end in zip(self.bounds[:-1].tolist(), self.bounds[1:].tolist()):
+            shard_queries = [(terms, values, norm, rows[np.searchsorted(rows, start):np.searchsorted(rows, end)])
+                             for terms, values, norm, rows in queries]
+            shard_bits = None if bits is None else bits[start >> 3:(end + 7) >> 3]
+            futures.append(self.pool.submit(score_shard, start, end, shard_queries, k, shard_bits))
+        shard_results = [future.result() for future in futures]
+
+        results = []
+        for i in range(len(queries)):
+            rows = np.concatenate([shard[i][0] for shard in shard_results])
+            scores = np.concatenate([shard[i][1] for shard in shard_results])
+            order = np.lexsort((-rows, -scores))[:k]
+            results.append((rows[order], scores[order]))
+        return results
+
+    def top_k(self, profile, k, excluded=None, bits=None):
+        """(rows, scores) of the top k for one profile, see top_k_batch"""
+        return self.top_k_batch([profile], k, None if excluded is None else [excluded], bits)[0]
+
+    def close(self):
+        self.pool.shutdown()
+        if self.workspace:
+            shutil.rmtree(self.workspace, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+# --- Benchmark ---
+def random_catalog(n_items, n_terms, terms_per_item, seed=SEED, zipf=1.3):
+    """L2-normalized random catalog with a Zipf-like term distribution, like hashed features
+    (zipf=0 draws terms uniformly, like a rich vocabulary of rare terms)"""
+    rng = np.random.default_rng(seed)
+    if zipf:
+        indices = (rng.zipf(zipf, size=n_items * terms_per_item) - 1) % n_terms
+    else:
+        indices = rng.integers(n_terms, size=n_items * terms_per_item)
+    data = rng.random(n_items * terms_per_item)
+    indptr = np.arange(0, n_items * terms_per_item + 1, terms_per_item)
+    matrix = sparse.csr_matrix((data, indices, indptr), shape=(n_items, n_terms))
+    matrix.sum_duplicates()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    matrix = (sparse.diags(1.0 / np.maximum(norms, 1e-12)) @ matrix).tocsr()
+    matrix.sort_indices()
+    return matrix
+
+def random_queries(matrix, n_queries, liked_per_query=20, seed=SEED):
+    """Profiles averaging random catalog rows, each excluding the rows it was built from"""
+    rng = np.random.default_rng(seed + 1)
+    liked = [rng.choice(matrix.shape[0], size=liked_per_query, replace=False) for _ in range(n_queries)]
+    return [matrix[rows].T @ np.full(len(rows), 1.0 / len(rows)) for rows in liked], liked
+
+def in_process_top_k(matrix, profile, k, excluded):
+    """Reference single-core scoring, as app.rank_recommendations without filters"""
+    scores = matrix @ profile
+    norm = np.linalg.norm(profile)
+    scores = scores / norm if norm > 0 else scores
+    scores[excluded] = -np.inf
+    top = top_k_positions(scores, k)
+    return top, scores[top]
+
+def time_queries(func, queries, excluded):
+    latencies = []
+    for profile, rows in zip(queries, excluded):
+        start = time.perf_counter()
+        func(profile, rows)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+def run_benchmark(matrix, worker_counts, n_queries, k):
+    """Per-query latency and batch throughput of in-process and sharded scoring"""
+    queries, excluded = random_queries(matrix, n_queries)
+    expected = [in_process_top_k(matrix, profile, k, rows) for profile, rows in zip(queries, excluded)]
+    base_p50, base_p99 = time_queries(lambda profile, rows: in_process_top_k(matrix, profile, k, rows),
+                                      queries, excluded)
+
+    print(f"=== Sharded scoring, {matrix.shape[0]} items x {matrix.shape[1]} terms, {matrix.nnz} nonzeros, "
+          f"top {k}, {os.cpu_count()} CPUs ===")
+    print(f"  {'workers':>8}{'p50 ms':>9}{'p99 ms':>9}{'speedup':>9}{'batch q/s':>11}")
+    print(f"  {'inline':>8}{base_p50:>9.2f}{base_p99:>9.2f}{1.0:>9.2f}{1000 / base_p50:>11.1f}")
+    matches = True
+    for workers in worker_counts:
+        with ShardedScorer(matrix, workers) as scorer:
+            results = scorer.top_k_batch(queries, k, excluded)
+            matches &= all(np.array_equal(rows, want_rows) and np.array_equal(scores, want_scores)
+                           for (rows, scores), (want_rows, want_scores) in zip(results, expected))
+            p50, p99 = time_queries(lambda profile, rows: scorer.top_k(profile, k, rows), queries, excluded)
+            start = time.perf_counter()
+            scorer.top_k_batch(queries, k, excluded)
+            throughput = len(queries) / (time.perf_counter() - start)
+        print(f"  {workers:>8}{p50:>9.2f}{p99:>9.2f}{base_p50 / p50:>9.2f}{throughput:>11.1f}")
+    print(f"  results identical to in-process scoring: {matches}")
+    return matches
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--catalog', help='saved .npz content matrix (default: synthetic catalog)')
+    parser.add_argument('--items', type=int, default=1_000_000, help='synthetic catalog rows')
+    parser.add_argument('--terms', type=int, default=2 ** 18, help='synthetic catalog columns')
+    parser.add_argument('--terms-per-item', type=int, default=12, help='nonzeros per synthetic row')
+    parser.add_argument('--workers', default='1,2,4,8', help='worker counts to compare')
+    parser.add_argument('--queries', type=int, default=50, help='timed profiles')
+    parser.add_argument('--k', type=int, default=10, help='recommendations per profile')
+    args = parser.parse_args()
+
+    if args.catalog:
+        matrix = sparse.load_npz(args.catalog).tocsr()
+        # Snapshots store sorted indices; sorting here too keeps summation order, and scores, identical
+        matrix.sort_indices()
+    else:
+        matrix = random_catalog(args.items, args.terms, args.terms_per_item)
+    return run_benchmark(matrix, [int(w) for w in args.workers.split(',')], args.queries, args.k)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
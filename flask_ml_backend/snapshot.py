@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Model Snapshot
+Directory format for precompiled serving data: every array is a raw binary
+file described by manifest.json, so a snapshot loads with NumPy/SciPy only
+and is memory-mapped (pages are shared between workers on the same host).
+
+    manifest.json            format version, model version, metadata, array specs
+    <array>.bin              raw array bytes
+    <matrix>.data/.indices/.indptr.bin   CSR components
+    <strings>.bytes/.offsets.bin         UTF-8 blob plus offsets
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+from scipy import sparse
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+class SnapshotWriter:
+    """Writes arrays, CSR matrices and string lists into a snapshot directory.
+
+    Arrays can be written whole with add_array or streamed with append; the
+    manifest is written by close().
+    """
+
+    def __init__(self, path, version=None, metadata=None):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.version = version or time.strftime('%Y%m%d%H%M%S')
+        self.metadata = dict(metadata or {})
+        self.arrays = {}
+        self.matrices = {}
+        self.strings = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+    def append(self, name, chunk):
+        """Append a chunk to a (possibly new) array; chunks must share dtype and trailing shape"""
+        chunk = np.ascontiguousarray(np.atleast_1d(chunk))
+        spec = self.arrays.get(name)
+        if spec is None:
+            spec = {'dtype': chunk.dtype.str, 'shape': [0] + list(chunk.shape[1:])}
+            self.arrays[name] = spec
+            mode = 'wb'
+        else:
+            if chunk.dtype.str != spec['dtype'] or list(chunk.shape[1:]) != spec['shape'][1:]:
+                raise ValueError(f"chunk for '{name}' does not match {spec}")
+            mode = 'ab'
+        with open(os.path.join(self.path, f'{name}.bin'), mode) as f:
+            f.write(chunk.tobytes())
+        spec['shape'][0] += chunk.shape[0]
+
+    def add_array(self, name, array):
+        self.arrays.pop(name, None)
+        self.append(name, np.asarray(array))
+
+    def add_matrix(self, name, matrix):
+        matrix = sparse.csr_matrix(matrix)
+        matrix.sort_indices()
+        self.add_array(f'{name}.data', matrix.data)
+        # Matching index dtypes let SciPy wrap the memory maps without copying
+        index_dtype = np.int32 if matrix.nnz < 2 ** 31 else np.int64
+        self.add_array(f'{name}.indices', matrix.indices.astype(index_dtype))
+        self.add_array(f'{name}.indptr', matrix.indptr.astype(index_dtype))
+        self.matrices[name] = {'shape': list(matrix.shape)}
+
+    def add_strings(self, name, values):
+        encoded = [str(v).encode('utf-8') for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        self.add_array(f'{name}.bytes', np.frombuffer(b''.join(encoded), dtype=np.uint8))
+        self.add_array(f'{name}.offsets', offsets)
+        if name not in self.strings:
+            self.strings.append(name)
+
+    def close(self):
+        manifest = {
+            'format_version': SNAPSHOT_FORMAT_VERSION,
+            'version': self.version,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'metadata': self.metadata,
+            'arrays': self.arrays,
+            'matrices': self.matrices,
+            'strings': self.strings,
+        }
+        with open(os.path.join(self.path, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format_version')} in {path}")
+    return manifest
+
+def _read_array(path, name, spec, mmap):
+    dtype = np.dtype(spec['dtype'])
+    shape = tuple(spec['shape'])
+    file_path = os.path.join(path, f'{name}.bin')
+    if mmap and shape[0] > 0:
+        return np.memmap(file_path, dtype=dtype, mode='r', shape=shape)
+    return np.fromfile(file_path, dtype=dtype).reshape(shape)
+
+def load_snapshot(path, mmap=True):
+    """Load a snapshot as {'manifest', 'arrays', 'matrices', 'strings'}.
+
+    With mmap=True arrays are read-only memory maps; matrices are CSR views
+    over them and string lists are decoded into Python lists.
+    """
+    manifest = read_manifest(path)
+    arrays = {name: _read_array(path, name, spec, mmap) for name, spec in manifest['arrays'].items()}
+
+    matrices = {}
+    for name, spec in manifest['matrices'].items():
+        matrices[name] = sparse.csr_matrix(
+            (arrays.pop(f'{name}.data'), arrays.pop(f'{name}.indices'), arrays.pop(f'{name}.indptr')),
+            shape=tuple(spec['shape']), copy=False
+        )
+
+    strings = {}
+    for name in manifest['strings']:
+        blob = arrays.pop(f'{name}.bytes').tobytes()
+        bounds = arrays.pop(f'{name}.offsets').tolist()
+        strings[name] = [blob[start:end].decode('utf-8') for start, end in zip(bounds[:-1], bounds[1:])]
+
+    return {'manifest': manifest, 'arrays': arrays, 'matrices': matrices, 'strings': strings}
+
+def load_matrix(path, name, mmap=True):
+    """Load one CSR matrix of a snapshot without reading anything else"""
+    manifest = read_manifest(path)
+    data, indices, indptr = (_read_array(path, f'{name}.{part}', manifest['arrays'][f'{name}.{part}'], mmap)
+                             for part in ('data', 'indices', 'indptr'))
+    return sparse.csr_matrix((data, indices, indptr), shape=tuple(manifest['matrices'][name]['shape']), copy=False)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Profile Settings Sweep
+Evaluates a grid of user profile settings (liked-rating threshold,
+weighting scheme, recency half-life) on the temporal holdout of
+evaluate_model.py at several K, and prints a quality-vs-latency table to
+pick PROFILE_MIN_RATING / PROFILE_WEIGHTING / PROFILE_HALF_LIFE_DAYS for
+app.py.
+
+All grid points share one workspace (the split and a float32 content
+matrix memory-mapped from shared memory) and run in parallel, one grid
+point per worker process. Each setting is ranked once at the largest K;
+smaller K values reuse the same ranking.
+
+Early stopping: every setting is first evaluated on a sample of users and
+settings scoring below --keep-within of the best NDCG are dropped before
+the full run. All settings are evaluated on the same users (those with a
+liked rating under the lowest threshold), so a stricter threshold that
+leaves a user without a profile counts as a miss.
+
+Usage:
+    python sweep_profiles.py [--min-rating 3.5,4.0,4.5] [--weighting rating,uniform,squared]
+                             [--half-life none,30,365] [--k 5,10,20] [--workers 4]
+                             [--screen-users 2000] [--keep-within 0.8] [--json sweep.json]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import evaluate_model
+from evaluate_model import (DEFAULT_BLOCK_SIZE, DEFAULT_K, SEED, blocks_of, eligible_users, evaluate_block,
+                            load_model, serving_profile, shared_workspace, summarize, temporal_split, worker_pool)
+from ratings_index import WEIGHTING_SCHEMES
+
+DEFAULT_MIN_RATINGS = '3.5,4.0,4.5'
+DEFAULT_WEIGHTINGS = ','.join(WEIGHTING_SCHEMES)
+DEFAULT_HALF_LIVES = 'none,30,365'
+DEFAULT_KS = '5,10,20'
+SCREEN_USERS = 2000      # users in the screening round
+KEEP_WITHIN = 0.8        # settings below this fraction of the best screening NDCG are dropped
+
+# --- Grid ---
+def parse_list(value, convert):
+    return [convert(item.strip()) for item in value.split(',') if item.strip()]
+
+def parse_half_life(value):
+    return None if value.lower() in ('none', '0') else float(value)
+
+def profile_grid(min_ratings, weightings, half_lives):
+    return [{'min_rating': min_rating, 'weighting': weighting, 'half_life_days': half_life}
+            for min_rating, weighting, half_life in itertools.product(min_ratings, weightings, half_lives)]
+
+def describe(profile):
+    half_life = 'none' if profile['half_life_days'] is None else f"{profile['half_life_days']:g}d"
+    return f"min {profile['min_rating']:g}, {profile['weighting']}, half-life {half_life}"
+
+# --- Evaluation ---
+def evaluate_profile(profile, positions, ks, block_size):
+    """Summary metrics of one setting over the given users (runs in a worker)"""
+    workspace = evaluate_model._workspace
+    results = [evaluate_block(block, ks, profile, workspace=workspace) for block in blocks_of(positions, block_size)]
+    return summarize(results, ks, workspace['content'].shape[0])
+
+def run_round(pool, profiles, positions, ks, block_size):
+    """Evaluate settings in parallel, one per worker, returning summaries in grid order"""
+    args = ([positions] * len(profiles), [ks] * len(profiles), [block_size] * len(profiles))
+    if pool is None:
+        return [evaluate_profile(profile, *rest) for profile, *rest in zip(profiles, *args)]
+    return list(pool.map(evaluate_profile, profiles, *args))
+
+def sweep(args):
+    app = load_model()
+    if app is None:
+        print("Cannot sweep: model artifacts failed to load.")
+        return None
+
+    temporal = 'timestamps' in app.ratings_index
+    half_lives = args.half_life if temporal else [None]
+    if not temporal and any(args.half_life):
+        print("Ratings have no timestamps, skipping recency decay settings")
+    profiles = profile_grid(args.min_rating, args.weighting, half_lives)
+
+    split = temporal_split(app.ratings_index, args.holdout, seed=args.seed)
+    positions, user_stats = eligible_users(split, min(args.min_rating))
+    if args.max_users and len(positions) > args.max_users:
+        positions = np.sort(np.random.default_rng(args.seed).choice(positions, size=args.max_users, replace=False))
+    if len(positions) == 0:
+        print("No users have both liked training ratings and relevant held-out ratings.")
+        return None
+
+    rank_k = DEFAULT_K if DEFAULT_K in args.k else args.k[0]
+    print(f"Sweeping {len(profiles)} settings for model {app.model_version} on {len(positions)} users, "
+          f"K={','.join(map(str, args.k))}, {args.workers} workers (ranked by NDCG@{rank_k})")
+
+    entries = [{'profile': profile} for profile in profiles]
+    start = time.perf_counter()
+    with shared_workspace(app.content_tfidf_matrix, split) as workspace_path:
+        pool = worker_pool(workspace_path, args.workers) if args.workers > 1 else None
+        if pool is None:
+            evaluate_model._init_worker(workspace_path)
+        try:
+            candidates = entries
+            if args.screen_users and args.screen_users < len(positions):
+                screen_positions = np.sort(np.random.default_rng(args.seed + 1).choice(
+                    positions, size=args.screen_users, replace=False))
+                screened = run_round(pool, [e['profile'] for e in entries], screen_positions, args.k, args.block_size)
+                best = max(s[f'ndcg@{rank_k}'] for s in screened)
+                for entry, summary in zip(entries, screened):
+                    entry['screening'] = summary
+                candidates = [e for e in entries if e['screening'][f'ndcg@{rank_k}'] >= args.keep_within * best]
+                print(f"Screening on {args.screen_users} users kept {len(candidates)} of {len(entries)} settings "
+                      f"(NDCG@{rank_k} >= {args.keep_within:g} x best {best:.4f})")
+
+            full = run_round(pool, [e['profile'] for e in candidates], positions, args.k, args.block_size)
+            for entry, summary in zip(candidates, full):
+                entry['metrics'] = summary
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    return {
+        'model_version': app.model_version,
+        'feature_mode': app.FEATURE_MODE,
+        'ks': args.k,
+        'rank_k': rank_k,
+        'serving_profile': serving_profile(app),
+        'users': int(len(positions)),
+        'split': user_stats,
+        'wall_seconds': time.perf_counter() - start,
+        'results': sorted(entries, key=lambda e: ('metrics' not in e,
+                                                  -e.get('metrics', e.get('screening'))[f'ndcg@{rank_k}'])),
+    }
+
+# --- Reporting ---
+def print_table(report):
+    ks, rank_k = report['ks'], report['rank_k']
+    header = f"  {'setting':38}" + ''.join(f"{f'P@{k}':>8}{f'R@{k}':>8}{f'NDCG@{k}':>9}" for k in ks)
+    print(f"\n=== Profile settings, best NDCG@{rank_k} first (* = current PROFILE_* settings) ===")
+    print(header + f"{f'cov@{rank_k}':>9}{'ms/user':>9}")
+    for entry in report['results']:
+        marker = '*' if entry['profile'] == report['serving_profile'] else ' '
+        metrics = entry.get('metrics')
+        if metrics is None:
+            screening = entry['screening']
+            print(f" {marker}{describe(entry['profile']):38}  dropped after screening "
+                  f"(NDCG@{rank_k} {screening[f'ndcg@{rank_k}']:.4f})")
+            continue
+        row = ''.join(f"{metrics[f'precision@{k}']:>8.4f}{metrics[f'recall@{k}']:>8.4f}{metrics[f'ndcg@{k}']:>9.4f}"
+                      for k in ks)
+        print(f" {marker}{describe(entry['profile']):38}{row}{metrics[f'coverage@{rank_k}']:>9.4f}"
+              f"{metrics['latency_ms_per_user']['mean']:>9.3f}")
+    print(f"\n{report['users']} users, {report['wall_seconds']:.1f}s")
+
+    best = report['results'][0]['profile']
+    print("Best settings for app.py:")
+    print(f"  PROFILE_MIN_RATING={best['min_rating']:g} PROFILE_WEIGHTING={best['weighting']} "
+          f"PROFILE_HALF_LIFE_DAYS={best['half_life_days'] or 0:g}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--min-rating', default=DEFAULT_MIN_RATINGS, help='liked-rating thresholds')
+    parser.add_argument('--weighting', default=DEFAULT_WEIGHTINGS, help=f'weighting schemes ({DEFAULT_WEIGHTINGS})')
+    parser.add_argument('--half-life', default=DEFAULT_HALF_LIVES, help="recency half-lives in days ('none' = no decay)")
+    parser.add_argument('--k', default=DEFAULT_KS, help='recommendation list lengths')
+    parser.add_argument('--holdout', type=float, default=evaluate_model.HOLDOUT_FRACTION)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE, help='users scored per block')
+    parser.add_argument('--max-users', type=int, default=None, help='evaluate a seeded sample of users')
+    parser.add_argument('--screen-users', type=int, default=SCREEN_USERS, help='users in the screening round (0 = off)')
+    parser.add_argument('--keep-within', type=float, default=KEEP_WITHIN, help='screening cut, fraction of best NDCG')
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--json', default=None, help='save the full report as JSON')
+    args = parser.parse_args()
+
+    args.min_rating = parse_list(args.min_rating, float)
+    args.weighting = parse_list(args.weighting, str)
+    args.half_life = parse_list(args.half_life, parse_half_life)
+    args.k = sorted(set(parse_list(args.k, int)))
+    unknown = [w for w in args.weighting if w not in WEIGHTING_SCHEMES]
+    if unknown:
+        parser.error(f"unknown weighting schemes {unknown}, expected {list(WEIGHTING_SCHEMES)}")
+
+    report = sweep(args)
+    if report is None:
+        return False
+    print_table(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.json}")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
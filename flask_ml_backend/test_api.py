@@ -59,6 +59,32 @@ def test_recommendations():
         print(f"❌ Error testing recommendations: {e}")
         return False
 
+def test_filtered_recommendations():
+    """Test recommendations with genre and release-year filters"""
+    print("\nTesting filtered recommendations...")
+    
+    test_data = {
+        "userId": 1,
+        "numRecommendations": 5,
+        "filters": {"genres": ["Comedy", "Romance"], "genreMatch": "all", "yearFrom": 1990, "yearTo": 1999}
+    }
+    
+    try:
+        response = requests.post(f"{BASE_URL}/recommend", json=test_data)
+        if response.status_code == 200:
+            data = response.json()
+            print(f"✅ Filtered recommendations generated: {data['count']} items")
+            for rec in data['recommendations'][:2]:
+                print(f"   Example: {rec['title']} ({rec['genre']})")
+            return True
+        else:
+            print(f"❌ Filtered recommendations failed: {response.status_code}")
+            print(f"   Response: {response.text}")
+            return False
+    except Exception as e:
+        print(f"❌ Error testing filtered recommendations: {e}")
+        return False
+
 def test_user_stats():
     """Test the user stats endpoint"""
     print("\nTesting user stats endpoint...")
@@ -87,7 +113,7 @@ def test_movie_search():
     print("\nTesting movie search endpoint...")
     
     try:
-        response = requests.get(f"{BASE_URL}/movies/search?q=batman&limit=3")
+        response = requests.get(f"{BASE_URL}/content/search?q=batman&type=movies&limit=3")
         if response.status_code == 200:
             data = response.json()
             print(f"✅ Movie search successful:")
@@ -111,15 +137,15 @@ def test_popular_movies():
     print("\nTesting popular movies endpoint...")
     
     try:
-        response = requests.get(f"{BASE_URL}/movies/popular?limit=3")
+        response = requests.get(f"{BASE_URL}/content/popular?type=movies&limit=3")
         if response.status_code == 200:
             data = response.json()
             print(f"✅ Popular movies retrieved successfully:")
             print(f"   Count: {data['count']}")
             
-            if data['popular_movies']:
+            if data['popular_content']:
                 print("   Sample popular movies:")
-                for i, movie in enumerate(data['popular_movies'][:2], 1):
+                for i, movie in enumerate(data['popular_content'][:2], 1):
                     print(f"     {i}. {movie['title']} (Rating: {movie['avg_rating']:.2f}, Votes: {movie['rating_count']})")
             return True
         else:
@@ -175,6 +201,7 @@ def run_all_tests():
     tests = [
         ("Health Check", test_health_check),
         ("Recommendations", test_recommendations),
+        ("Filtered Recommendations", test_filtered_recommendations),
         ("User Stats", test_user_stats),
         ("Movie Search", test_movie_search),
         ("Popular Movies", test_popular_movies),
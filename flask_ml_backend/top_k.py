@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Top-K Selection
+The serving top-K selection over a score vector, shared by every scoring
+path (in-process, sharded, inverted index, latent and interest profiles) so
+they all pick the same items in the same order: the k highest finite
+scores, best first, ties broken by later position first.
+"""
+
+import numpy as np
+
+def top_k_positions(scores, k):
+    """Positions of the k highest finite scores, best first (ties: later positions first)"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    kth_score = scores[top].min()
+    if np.isfinite(kth_score):
+        # Pull in every position tied with the k-th score so the tie-break is deterministic
+        top = np.flatnonzero(scores >= kth_score)
+    else:
+        top = top[np.isfinite(scores[top])]
+    return top[np.lexsort((-top, -scores[top]))][:k]